@@ -0,0 +1,13 @@
+"""Entrypoint ASGI (uvicorn/hypercorn).
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+As views continuam WSGI (SQLAlchemy síncrono); o adaptador roda cada
+requisição num pool de threads. Para muitas chamadas simultâneas à Twilio,
+use WHATSAPP_DISPATCHER=asyncio, que não depende do servidor escolhido.
+"""
+from asgiref.wsgi import WsgiToAsgi
+
+from run import app as flask_app
+
+app = WsgiToAsgi(flask_app)
@@ -0,0 +1,264 @@
+"""Carga HTTP nos endpoints quentes: throughput, p50/p95/p99 e SQL por requisição.
+
+Sobe a aplicação num servidor WSGI local (threads) contra um banco descartável
+(SQLite em arquivo temporário por padrão, ou --database-url para um MySQL local),
+aplica as migrações, semeia o volume pedido e dispara cada cenário em cada nível
+de concorrência. Com --baseline compara com um JSON anterior e sai com código 1
+se algum cenário piorar além da tolerância.
+
+    python benchmarks/http_load.py --products 5000 --users 200 --orders-per-user 20 \\
+        --concurrency 1 8 32 --requests 400 --output resultado.json
+    python benchmarks/http_load.py --baseline resultado.json --tolerance 0.2
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CENARIOS = ("produto_lista", "produto_detalhe", "checkout", "historico", "admin_stats", "verifica")
+SENHA = "senha-benchmark"
+
+
+def configurar_ambiente(args):
+    """Variáveis lidas no import da aplicação: precisam estar definidas antes do `import run`."""
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.pop("SKIP_DB_INIT", None)
+    os.environ.setdefault("WHATSAPP_TRANSPORT", "fake")
+    os.environ.setdefault("PASSWORD_HASH_ITERATIONS", str(args.hash_iterations))
+    os.environ.setdefault("MIGRATION_BATCH_PAUSE", "0")
+    return url
+
+
+def semear(app, args):
+    """Produtos, usuários e histórico de pedidos em lote (executemany)."""
+    from src.config.data_base import db
+    from src.config.migration import migrar
+    from src.Infrastructure.Model.produto import Produto
+    from src.Infrastructure.Model.user import User, normalizar_email
+    from src.Infrastructure.Model.order import Order
+    from src.Infrastructure.Model.order_item import OrderItem
+    from src.Application.Service.user_service import hash_senha
+    from src.Application.Service.stats_service import StatsService
+
+    rnd = random.Random(42)
+    with app.app_context():
+        migrar(log=lambda *_: None)
+        # estoque alto: o cenário de checkout não pode esgotar produtos no meio da medição
+        db.session.execute(Produto.__table__.insert(), [
+            {"nome": f"Produto {i}", "preco": round(rnd.uniform(1, 500), 2),
+             "quantidade": 10 ** 9, "status": True, "imagem": None}
+            for i in range(1, args.products + 1)
+        ])
+        senha = hash_senha(SENHA)
+        emails = [f"bench{i}@example.com" for i in range(args.users)]
+        db.session.execute(User.__table__.insert(), [
+            {"name": f"Bench {i}", "email": email, "email_normalizado": normalizar_email(email),
+             "password": senha, "cnpj": f"{i:014d}", "celular": "11999999999", "status": 1}
+            for i, email in enumerate(emails)
+        ])
+        db.session.commit()
+
+        ids_usuarios = [uid for uid, in db.session.query(User.id).filter(User.email.in_(emails))]
+        ids_produtos = [pid for pid, in db.session.query(Produto.id)]
+        agora = datetime.utcnow()
+        for uid in ids_usuarios:
+            for n in range(args.orders_per_user):
+                order = Order(user_id=uid, total=0.0, created_at=agora - timedelta(hours=n))
+                db.session.add(order)
+                db.session.flush()
+                itens = [{"order_id": order.id, "product_id": pid, "product_name": f"Produto {pid}",
+                          "unit_price": 10.0, "quantity": 1, "line_total": 10.0}
+                         for pid in rnd.sample(ids_produtos, min(3, len(ids_produtos)))]
+                order.total = sum(i["line_total"] for i in itens)
+                db.session.execute(OrderItem.__table__.insert(), itens)
+            db.session.commit()
+        StatsService.reconstruir()
+
+        admin = db.session.query(User).filter_by(status=2).first()
+        return {"usuarios": ids_usuarios, "emails": emails, "produtos": ids_produtos, "admin": admin.id}
+
+
+class ContadorSQL:
+    """Conta statements no engine (todas as threads) para calcular SQL por requisição."""
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.total += 1
+
+
+def subir_servidor(app):
+    from werkzeug.serving import make_server
+    servidor = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def requisicoes(cenario, dados, tokens, rnd):
+    """Gera (método, caminho, corpo, token) para o cenário."""
+    usuario = rnd.choice(dados["usuarios"])
+    if cenario == "produto_lista":
+        return "GET", "/produto", None, None
+    if cenario == "produto_detalhe":
+        return "GET", f"/produto/{rnd.choice(dados['produtos'])}", None, None
+    if cenario == "checkout":
+        itens = [{"product_id": pid, "quantity": 1} for pid in rnd.sample(dados["produtos"], 3)]
+        return "POST", "/checkout", {"items": itens}, tokens[usuario]
+    if cenario == "historico":
+        return "GET", "/historico?limit=20", None, tokens[usuario]
+    if cenario == "admin_stats":
+        return "GET", "/admin/stats", None, tokens["admin"]
+    if cenario == "verifica":
+        return "POST", "/verifica", {"email": rnd.choice(dados["emails"]), "password": SENHA}, None
+    raise ValueError(cenario)
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100.0 * (len(ordenados) - 1))))]
+
+
+def rodar(porta, cenario, concorrencia, total, dados, tokens, contador):
+    por_thread = max(1, total // concorrencia)
+
+    def worker(semente):
+        rnd = random.Random(semente)
+        conn = http.client.HTTPConnection("127.0.0.1", porta, timeout=60)
+        latencias, erros = [], 0
+        for _ in range(por_thread):
+            metodo, caminho, corpo, token = requisicoes(cenario, dados, tokens, rnd)
+            headers = {"Content-Type": "application/json"}
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            inicio = time.perf_counter()
+            try:
+                conn.request(metodo, caminho, body=json.dumps(corpo) if corpo is not None else None, headers=headers)
+                resposta = conn.getresponse()
+                resposta.read()
+                if resposta.status >= 400:
+                    erros += 1
+            except (OSError, http.client.HTTPException):
+                erros += 1
+                conn.close()
+            latencias.append(time.perf_counter() - inicio)
+        conn.close()
+        return latencias, erros
+
+    sql_antes = contador.total
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+        resultados = list(pool.map(worker, range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    latencias = sorted(l for ls, _ in resultados for l in ls)
+    erros = sum(e for _, e in resultados)
+    return {
+        "scenario": cenario,
+        "concurrency": concorrencia,
+        "requests": len(latencias),
+        "errors": erros,
+        "throughput_rps": len(latencias) / duracao if duracao else 0.0,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "sql_per_request": (contador.total - sql_antes) / len(latencias) if latencias else 0.0,
+    }
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Regressões em relação ao baseline: p95 maior ou throughput menor que a tolerância."""
+    anteriores = {(r["scenario"], r["concurrency"]): r for r in baseline["results"]}
+    regressoes = []
+    for r in resultados:
+        antes = anteriores.get((r["scenario"], r["concurrency"]))
+        if not antes:
+            continue
+        if r["p95_ms"] > antes["p95_ms"] * (1 + tolerancia):
+            regressoes.append(f"{r['scenario']} c={r['concurrency']}: p95 {antes['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms")
+        if r["throughput_rps"] < antes["throughput_rps"] * (1 - tolerancia):
+            regressoes.append(f"{r['scenario']} c={r['concurrency']}: "
+                              f"{antes['throughput_rps']:.1f} -> {r['throughput_rps']:.1f} req/s")
+        if r["sql_per_request"] > antes["sql_per_request"] + 0.5:
+            regressoes.append(f"{r['scenario']} c={r['concurrency']}: SQL/req "
+                              f"{antes['sql_per_request']:.1f} -> {r['sql_per_request']:.1f}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="padrão: SQLite num arquivo temporário")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--orders-per-user", type=int, default=20)
+    parser.add_argument("--hash-iterations", type=int, default=600000,
+                        help="PASSWORD_HASH_ITERATIONS da execução (domina o custo de /verifica)")
+    parser.add_argument("--scenarios", nargs="+", choices=CENARIOS, default=list(CENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requisições por cenário e nível")
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    url = configurar_ambiente(args)
+    from sqlalchemy import event
+    from flask_jwt_extended import create_access_token
+    from run import app
+    from src.config.data_base import db
+
+    dados = semear(app, args)
+    with app.app_context():
+        tokens = {uid: create_access_token(identity=str(uid)) for uid in dados["usuarios"]}
+        tokens["admin"] = create_access_token(identity=str(dados["admin"]))
+        contador = ContadorSQL()
+        event.listen(db.engine, "before_cursor_execute", contador)
+
+    servidor = subir_servidor(app)
+    resultados = []
+    try:
+        for cenario in args.scenarios:
+            for concorrencia in args.concurrency:
+                r = rodar(servidor.server_port, cenario, concorrencia, args.requests, dados, tokens, contador)
+                resultados.append(r)
+                print(f"{r['scenario']:<16} c={r['concurrency']:<3} {r['throughput_rps']:8.1f} req/s  "
+                      f"p50 {r['p50_ms']:7.1f}  p95 {r['p95_ms']:7.1f}  p99 {r['p99_ms']:7.1f} ms  "
+                      f"SQL/req {r['sql_per_request']:5.1f}  erros {r['errors']}")
+    finally:
+        servidor.shutdown()
+
+    saida = {
+        "created_at": datetime.utcnow().isoformat(),
+        "config": {"database": url.split(":", 1)[0], "products": args.products, "users": args.users,
+                   "orders_per_user": args.orders_per_user, "hash_iterations": args.hash_iterations,
+                   "requests": args.requests},
+        "results": resultados,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(saida, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerance)
+        for linha in regressoes:
+            print(f"REGRESSÃO {linha}")
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Serialização JSON (stdlib x orjson) e bytes trafegados (cru x gzip).
+
+Usa payloads com o formato real de /produto, /admin/stats e /historico.
+
+    python benchmarks/json_serialization.py --products 5000 --orders 500
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def payload_produtos(n):
+    return [{
+        "id": i,
+        "name": f"Produto {i}",
+        "price": round(random.uniform(1, 500), 2),
+        "quantity": random.randint(0, 300),
+        "status": random.random() > 0.1,
+        "image": f"/static/uploads/{random.getrandbits(256):064x}.webp",
+        "description": f"Produto {i}",
+    } for i in range(1, n + 1)]
+
+
+def payload_stats(n_produtos, dias):
+    per_product = [{
+        "id": i, "name": f"Produto {i}", "price": 10.0 + i, "sold_qty": i * 3, "stock_remaining": i % 50,
+        "stock_value": (i % 50) * (10.0 + i), "revenue": i * 3 * (10.0 + i),
+        "percent_of_total_sold": random.random() * 5, "sold_vs_stock_percent": random.random() * 100,
+    } for i in range(1, n_produtos + 1)]
+    inicio = date.today() - timedelta(days=dias)
+    return {
+        "total_revenue": 123456.78, "total_orders": 4321, "total_items_sold": 98765, "stock_total": 5432,
+        "unique_customers": 876, "avg_order_value": 28.57, "total_products": n_produtos,
+        "products_out_of_stock": 12, "low_stock_count": 34,
+        "top_products": [{"name": p["name"], "quantity": p["sold_qty"]} for p in per_product[:5]],
+        "low_stock_list": [{"name": p["name"], "stock": 3} for p in per_product[:10]],
+        "per_product": per_product,
+        "revenue_by_day": [{"date": str(inicio + timedelta(days=d)), "total": random.uniform(100, 5000)}
+                           for d in range(dias)],
+    }
+
+
+def payload_historico(n_pedidos, itens_por_pedido=4):
+    agora = datetime.utcnow()
+    pedidos = []
+    for o in range(1, n_pedidos + 1):
+        itens = [{
+            "id": o * 10 + k, "order_id": o, "product_id": k, "product_name": f"Produto {k}",
+            "unit_price": 9.9 + k, "quantity": 1 + k % 3, "line_total": (9.9 + k) * (1 + k % 3),
+        } for k in range(itens_por_pedido)]
+        pedidos.append({
+            "id": o, "user_id": 1, "total": sum(i["line_total"] for i in itens),
+            "created_at": (agora - timedelta(hours=o)).isoformat(), "items": itens,
+        })
+    return pedidos
+
+
+def cronometrar(fn, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        corpo = fn()
+    return (time.perf_counter() - inicio) / repeticoes * 1000, corpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    random.seed(42)
+    payloads = {
+        "GET /produto": payload_produtos(args.products),
+        "GET /admin/stats": payload_stats(args.products, args.days),
+        "GET /historico": payload_historico(args.orders),
+    }
+    resultados = []
+    for nome, obj in payloads.items():
+        stdlib_ms, corpo = cronometrar(
+            lambda: json.dumps(obj, separators=(",", ":"), sort_keys=True).encode(), args.repeat)
+        linha = {
+            "payload": nome,
+            "stdlib_ms": stdlib_ms,
+            "orjson_ms": None,
+            "bytes": len(corpo),
+            "gzip_bytes": len(gzip.compress(corpo, compresslevel=6)),
+        }
+        if orjson is not None:
+            linha["orjson_ms"], _ = cronometrar(
+                lambda: orjson.dumps(obj, option=orjson.OPT_SORT_KEYS), args.repeat)
+        linha["gzip_ms"], _ = cronometrar(lambda: gzip.compress(corpo, compresslevel=6), args.repeat)
+        resultados.append(linha)
+
+    print(f"{'payload':<18}{'stdlib ms':>11}{'orjson ms':>11}{'gzip ms':>9}{'bytes':>11}{'gzip bytes':>12}")
+    for r in resultados:
+        orj = f"{r['orjson_ms']:.2f}" if r["orjson_ms"] is not None else "n/a"
+        print(f"{r['payload']:<18}{r['stdlib_ms']:>11.2f}{orj:>11}{r['gzip_ms']:>9.2f}"
+              f"{r['bytes']:>11}{r['gzip_bytes']:>12}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
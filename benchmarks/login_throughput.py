@@ -0,0 +1,59 @@
+"""Throughput de login em função do custo do hash de senha.
+
+Mede quantas verificações pbkdf2 (check_password_hash) cabem por segundo em um
+núcleo para cada número de iterações, e o custo do rehash-on-login quando o
+PASSWORD_HASH_ITERATIONS muda.
+
+    python benchmarks/login_throughput.py --iterations 600000 260000 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def medir(iteracoes, repeticoes):
+    metodo = f"pbkdf2:sha256:{iteracoes}"
+    stored = generate_password_hash("senha-de-teste", method=metodo)
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        check_password_hash(stored, "senha-de-teste")
+    verificacao = (time.perf_counter() - inicio) / repeticoes
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        generate_password_hash("senha-de-teste", method=metodo)
+    rehash = (time.perf_counter() - inicio) / repeticoes
+    return {
+        "method": metodo,
+        "verify_ms": verificacao * 1000,
+        "logins_per_second_per_core": 1.0 / verificacao if verificacao else None,
+        "rehash_login_ms": (verificacao + rehash) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, nargs="+",
+                        default=[int(os.environ.get("PASSWORD_HASH_ITERATIONS", 600000)), 260000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    resultados = [medir(n, args.repeat) for n in args.iterations]
+    for r in resultados:
+        print(f"{r['method']:<24} verify {r['verify_ms']:8.1f} ms  "
+              f"~{r['logins_per_second_per_core']:6.1f} logins/s/núcleo  "
+              f"(login com rehash {r['rehash_login_ms']:8.1f} ms)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
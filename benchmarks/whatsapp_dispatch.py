@@ -0,0 +1,75 @@
+"""Vazão do envio de WhatsApp: fila com threads x event loop (asyncio).
+
+Enfileira N mensagens num transporte falso com latência fixa (simulando a API
+da Twilio) e mede o tempo até todas saírem, para a DeliveryQueue com K
+threads e para a AsyncDeliveryQueue com até M envios simultâneos.
+
+    python benchmarks/whatsapp_dispatch.py --messages 2000 --latency 0.25 --workers 2 16 --in-flight 200
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.Infrastructure.http.async_delivery import AsyncDeliveryQueue, AsyncFakeTransport
+from src.Infrastructure.http.whatsapp_delivery import DeliveryQueue, FakeTransport
+
+
+def medir(nome, fila, mensagens):
+    inicio = time.perf_counter()
+    for i in range(mensagens):
+        _, erro = fila.enqueue(f"+55119{i:08d}", "Seu código é 123456")
+        if erro:
+            raise RuntimeError(f"{nome}: enqueue recusado ({erro})")
+    enfileirar = time.perf_counter() - inicio
+    while True:
+        contagem = fila.stats()["status"]
+        if not contagem.get("queued") and not contagem.get("sending"):
+            break
+        time.sleep(0.01)
+    total = time.perf_counter() - inicio
+    return {
+        "dispatcher": nome,
+        "messages": mensagens,
+        "sent": contagem.get("sent", 0),
+        "enqueue_ms": enfileirar * 1000,
+        "drain_s": total,
+        "messages_per_second": mensagens / total if total else None,
+        "threads": threading.active_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.25, help="latência simulada da API (s)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 16])
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[200])
+    parser.add_argument("--output", help="grava o resultado em JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    for workers in args.workers:
+        fila = DeliveryQueue(FakeTransport(latency=args.latency), "+10000000000",
+                             workers=workers, max_queue=args.messages, max_status=args.messages)
+        resultados.append(medir(f"threads x{workers}", fila, args.messages))
+    for em_voo in args.in_flight:
+        fila = AsyncDeliveryQueue(AsyncFakeTransport(latency=args.latency), "+10000000000",
+                                  max_in_flight=em_voo, max_queue=args.messages, max_status=args.messages)
+        resultados.append(medir(f"asyncio x{em_voo}", fila, args.messages))
+
+    for r in resultados:
+        print(f"{r['dispatcher']:<16} {r['sent']:>6}/{r['messages']} enviadas  "
+              f"drain {r['drain_s']:7.2f} s  {r['messages_per_second']:8.1f} msg/s  "
+              f"(enqueue {r['enqueue_ms']:6.1f} ms)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
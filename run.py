@@ -2,19 +2,33 @@ from flask import Flask
 from flask_jwt_extended import JWTManager
 from datetime import timedelta
 from flask_cors import CORS
-from src.config.data_base import init_db, db
+from src.config.data_base import init_db
 from src.routes import init_routes
+from src.commands import init_commands
+from src.Infrastructure.static.assets import init_assets
+from src.config.json_provider import init_json
+from src.config.compression import init_compression
+from src.config.instrumentation import init_instrumentation
+from src.config.log import init_logging
+from src.Infrastructure.jobs.periodic import init_periodic
 from src.Infrastructure.Model.user import User
+import logging
 import os  
 
+logger = logging.getLogger(__name__)
+
 def create_app():
     """
     Cria e configura a aplicação Flask.
     """
     app = Flask(__name__, static_folder="frontend/static", static_url_path="/static")
     app.secret_key = 'sua_chave_secreta_aqui'  # Adicione uma chave secreta para as sessões
+    init_logging(app)
 
     CORS(app)
+    init_json(app)
+    init_compression(app)
+    init_instrumentation(app)
 
     # CORS(app, resources={
     #     r"/*": {
@@ -32,38 +46,29 @@ def create_app():
 
 
     init_routes(app)
+    init_commands(app)
+    init_assets(app)
 
     # Inicialização do banco: permitir pular durante builds (ex.: Vercel) ou
     # falhas de conexão sem quebrar a importação do módulo.
     # Para pular, defina SKIP_DB_INIT=1 nas variáveis de ambiente do build.
     if os.environ.get("SKIP_DB_INIT") == "1":
-        print("SKIP_DB_INIT=1 definido — pulando init_db e create_all")
+        logger.info("SKIP_DB_INIT=1 definido — pulando init_db")
     else:
         try:
+            # Sem DDL no boot: tabelas, índices e o usuário admin vêm de `flask migrate`.
             init_db(app)
 
-            with app.app_context():
-                # Importe TODOS os modelos antes do create_all para que as tabelas sejam criadas
-                try:
-                    from src.Infrastructure.Model.user import User  # noqa: F401
-                    from src.Infrastructure.Model.produto import Produto  # noqa: F401
-                    from src.Infrastructure.Model.order import Order  # noqa: F401
-                    from src.Infrastructure.Model.order_item import OrderItem  # noqa: F401
-                except Exception as e:
-                    print(f"Erro ao importar modelos: {e}")
-
-                db.create_all()
-
-                # Criar usuário admin se não existir
-                from src.Application.Service.user_service import UserService
-                try:
-                    UserService.create_admin_if_not_exists()
-                except Exception as e:
-                    print(f"Aviso: não foi possível criar/validar usuário admin: {e}")
-                print("Tabelas criadas e usuário admin verificado!")
+            from src.Application.Service.cart_service import CartService
+            from src.Application.Service.stock_alert_service import StockAlertService
+            init_periodic(app, [
+                ("liberar-reservas", CartService.liberar_expiradas, float(os.environ.get("CART_SWEEP_INTERVAL", 30))),
+                ("resumo-estoque-baixo", StockAlertService.enviar_resumo,
+                 float(os.environ.get("LOW_STOCK_DIGEST_INTERVAL", 300))),
+            ])
         except Exception as e:
             # Não parar a importação em caso de erro de DB durante build; imprimir aviso.
-            print(f"Aviso: falha ao inicializar o banco de dados durante import: {e}")
+            logger.warning("Falha ao inicializar o banco de dados durante import: %s", e)
 
     return app
 
@@ -1,13 +1,51 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, make_response, Response, stream_with_context
 from flask_jwt_extended import create_access_token
 from src.Infrastructure.Model.produto import Produto
 from src.Application.Service.produto_service import ProdutoService
+from src.Infrastructure.storage.image_store import salvar_imagem, url_variante
+import logging
 import os
+import csv
+import io
+import json
+import hashlib
+from datetime import datetime, timezone
 from werkzeug.utils import secure_filename
 import uuid
 
+logger = logging.getLogger(__name__)
+
 
 class ProdutoController:
+    @staticmethod
+    def _resposta_condicional(etag, atualizado, gerar):
+        """GET condicional: com o ETag (e o Last-Modified `atualizado`) já calculados.
+
+        Se o If-None-Match (ou If-Modified-Since) do cliente ainda vale, responde 304
+        sem montar o corpo; senão chama `gerar()` e anexa ETag/Last-Modified.
+        """
+        if atualizado is not None:
+            atualizado = atualizado.replace(microsecond=0, tzinfo=timezone.utc)
+
+        if request.if_none_match:
+            nao_mudou = request.if_none_match.contains_weak(etag)
+        else:
+            nao_mudou = bool(atualizado and request.if_modified_since and atualizado <= request.if_modified_since)
+
+        if nao_mudou:
+            resposta = make_response("", 304)
+        else:
+            resposta = make_response(gerar())
+            if resposta.status_code != 200:
+                return resposta
+
+        resposta.set_etag(etag, weak=True)
+        if atualizado is not None:
+            resposta.last_modified = atualizado
+        # cache pode guardar, mas sempre revalida (barato: 304 sem corpo)
+        resposta.headers["Cache-Control"] = "public, no-cache"
+        return resposta
+
     @staticmethod
     def register_produto():
         # Verificar se é JSON ou form-data
@@ -37,7 +75,7 @@ class ProdutoController:
                     "description": nome  # Usando nome como descrição
                 }), 201
             except Exception as e:
-                print(f"Erro ao criar produto: {str(e)}")  # Log do erro
+                logger.exception("Erro ao criar produto")
                 return jsonify({"erro": f"Erro ao criar produto: {str(e)}"}), 500
         else:
             # Dados vindos de form-data (mantém compatibilidade)
@@ -51,17 +89,12 @@ class ProdutoController:
                 return jsonify({"erro": "Campos obrigatórios faltando."}), 400
 
             
-            upload_folder = os.path.join(current_app.static_folder, "uploads")
-            os.makedirs(upload_folder, exist_ok=True)
-
             imagem_path = None
             if imagem:
-                filename = secure_filename(imagem.filename)
-                unique = uuid.uuid4().hex
-                safe_name = f"{unique}_{filename}" if filename else unique
-                save_path = os.path.join(upload_folder, safe_name)
-                imagem.save(save_path)
-                imagem_path = f"/static/uploads/{safe_name}"
+                try:
+                    imagem_path = salvar_imagem(imagem)
+                except ValueError as e:
+                    return jsonify({"erro": str(e)}), 400
 
             produto = ProdutoService.criar_produto(nome, preco, quantidade, status, imagem_path)
 
@@ -77,6 +110,19 @@ class ProdutoController:
 
     @staticmethod
     def list_product():
+        # ETag varia com a query string (cada página/filtro tem sua própria versão)
+        chave = hashlib.md5(request.query_string).hexdigest()[:12]
+        versao, atualizado = ProdutoService.versao_catalogo()
+        return ProdutoController._resposta_condicional(
+            f"catalogo-{versao}-lista-{chave}", atualizado, ProdutoController._list_product)
+
+    @staticmethod
+    def _list_product():
+        # Paginação por cursor só quando o cliente pede; sem parâmetros mantém a lista completa
+        parametros = ("limit", "cursor", "fields", "status", "min_quantity", "max_quantity", "prefix")
+        if any(p in request.args for p in parametros):
+            return ProdutoController.list_product_page()
+
         produtos = ProdutoService.listar_produtos()
 
         if produtos:
@@ -88,27 +134,160 @@ class ProdutoController:
                 "quantity": p.quantidade,
                 "status": p.status,
                 "image": p.imagem,
+                "image_thumb": url_variante(p.imagem, "thumb", p.imagem_variantes),
                 "description": p.nome  # Usando nome como descrição por enquanto
             } for p in produtos])
         
         return jsonify([])
     
+    @staticmethod
+    def bulk_import():
+        """POST /produto/bulk: CSV ou NDJSON (arquivo multipart `file` ou corpo cru).
+
+        O formato vem de ?format=csv|ndjson, ou do content-type / extensão do arquivo.
+        """
+        arquivo = request.files.get("file")
+        if arquivo:
+            stream, tipo, nome_arquivo = arquivo.stream, arquivo.mimetype or "", (arquivo.filename or "").lower()
+        else:
+            stream, tipo, nome_arquivo = request.stream, request.mimetype or "", ""
+
+        formato = (request.args.get("format") or "").lower()
+        if not formato:
+            if "csv" in tipo or nome_arquivo.endswith(".csv"):
+                formato = "csv"
+            elif "ndjson" in tipo or "jsonl" in tipo or nome_arquivo.endswith((".ndjson", ".jsonl")):
+                formato = "ndjson"
+        if formato not in ("csv", "ndjson"):
+            return jsonify({"erro": "Formato não suportado; use CSV ou NDJSON (?format=csv|ndjson)."}), 400
+
+        # decodifica linha a linha, sem ler o upload inteiro para a memória
+        texto = (linha.decode("utf-8-sig") for linha in stream)
+        erros_leitura = []
+
+        def linhas_csv():
+            leitor = csv.DictReader(texto)
+            for row in leitor:
+                yield leitor.line_num, row
+
+        def linhas_ndjson():
+            for numero, linha in enumerate(texto, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    row = json.loads(linha)
+                except ValueError as e:
+                    erros_leitura.append({"row": numero, "error": f"JSON inválido: {str(e)}"})
+                    continue
+                if not isinstance(row, dict):
+                    erros_leitura.append({"row": numero, "error": "Cada linha deve ser um objeto JSON."})
+                    continue
+                yield numero, row
+
+        try:
+            inseridos, erros = ProdutoService.importar_lote(
+                linhas_csv() if formato == "csv" else linhas_ndjson()
+            )
+        except (csv.Error, UnicodeDecodeError) as e:
+            return jsonify({"erro": f"Arquivo inválido: {str(e)}"}), 400
+
+        erros = sorted(erros_leitura + erros, key=lambda e: e["row"] or 0)
+        return jsonify({
+            "inserted": inseridos,
+            "error_count": len(erros),
+            "errors": erros[:1000]  # relatório limitado; error_count tem o total
+        }), 200 if inseridos or not erros else 400
+
+    @staticmethod
+    def export():
+        """GET /produto/export?format=csv|ndjson: catálogo em streaming."""
+        formato = (request.args.get("format") or "ndjson").lower()
+        campos = ["id", "nome", "preco", "quantidade", "status", "imagem"]
+
+        if formato == "csv":
+            def gerar():
+                buffer = io.StringIO()
+                escritor = csv.DictWriter(buffer, fieldnames=campos)
+                escritor.writeheader()
+                for i, produto in enumerate(ProdutoService.exportar(), start=1):
+                    escritor.writerow(produto)
+                    if i % 500 == 0:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                yield buffer.getvalue()
+            mimetype = "text/csv"
+        elif formato == "ndjson":
+            def gerar():
+                for produto in ProdutoService.exportar():
+                    yield current_app.json.dumps(produto) + "\n"
+            mimetype = "application/x-ndjson"
+        else:
+            return jsonify({"erro": "Formato não suportado; use csv ou ndjson."}), 400
+
+        resposta = Response(stream_with_context(gerar()), mimetype=mimetype)
+        resposta.headers["Content-Disposition"] = f"attachment; filename=produtos.{formato}"
+        return resposta
+
+    @staticmethod
+    def list_product_page():
+        """GET /produto?limit=&cursor=&status=&min_quantity=&max_quantity=&prefix=&fields="""
+        from src.Application.Service.produto_service import CAMPOS_PRODUTO, LIMITE_PAGINA_PADRAO
+        args = request.args
+        try:
+            limite = int(args.get("limit", LIMITE_PAGINA_PADRAO))
+            apos_id = int(args["cursor"]) if args.get("cursor") else None
+            qtd_min = int(args["min_quantity"]) if args.get("min_quantity") else None
+            qtd_max = int(args["max_quantity"]) if args.get("max_quantity") else None
+        except ValueError:
+            return jsonify({"erro": "limit, cursor, min_quantity e max_quantity devem ser inteiros."}), 400
+
+        campos = None
+        if args.get("fields"):
+            campos = [c.strip() for c in args["fields"].split(",") if c.strip()]
+            invalidos = [c for c in campos if c not in CAMPOS_PRODUTO]
+            if invalidos:
+                return jsonify({"erro": f"Campos inválidos: {', '.join(invalidos)}"}), 400
+
+        itens, proximo = ProdutoService.listar_pagina(
+            apos_id=apos_id,
+            limite=limite,
+            status=args.get("status") or None,
+            qtd_min=qtd_min,
+            qtd_max=qtd_max,
+            prefixo=args.get("prefix"),
+            campos=campos
+        )
+        return jsonify({
+            "items": itens,
+            "next_cursor": proximo
+        }), 200
+
     @staticmethod
     def get_produto(id):
-        from src.Infrastructure.Model.produto import Produto
-        produto = Produto.query.filter_by(id=id).first()
+        # ETag pela versao do próprio produto, lida do mesmo dict (cache) que vira o corpo
+        produto = ProdutoService.obter_produto(id)
         
         if not produto:
             return jsonify({"erro": "Produto não encontrado"}), 404
-        
+
+        atualizado = produto.get("atualizado_em")
+        return ProdutoController._resposta_condicional(
+            f"produto-{id}-{produto.get('versao', 0)}",
+            datetime.fromisoformat(atualizado) if atualizado else None,
+            lambda: ProdutoController._get_produto(produto))
+
+    @staticmethod
+    def _get_produto(produto):
         return jsonify({
-            "id": produto.id,
-            "name": produto.nome,
-            "price": produto.preco,
-            "quantity": produto.quantidade,
-            "status": produto.status,
-            "image": produto.imagem,
-            "description": produto.nome
+            "id": produto["id"],
+            "name": produto["nome"],
+            "price": produto["preco"],
+            "quantity": produto["quantidade"],
+            "status": produto["status"],
+            "image": produto["imagem"],
+            "image_medium": url_variante(produto["imagem"], "medium", produto.get("imagem_variantes")),
+            "description": produto["nome"]
         }), 200
     
 
@@ -128,9 +307,12 @@ class ProdutoController:
             quantidade = request.form.get("quantity") or request.form.get("quantidade")
             imagem = request.files.get("imagem") or request.files.get("image")
 
-        produto = ProdutoService.atualizar_produtos(
-            id, nome=nome, preco=preco, quantidade=quantidade, imagem=imagem
-        )
+        try:
+            produto = ProdutoService.atualizar_produtos(
+                id, nome=nome, preco=preco, quantidade=quantidade, imagem=imagem
+            )
+        except ValueError as e:
+            return jsonify({"erro": str(e)}), 400
 
         if not produto:
             return jsonify({"erro": "Produto não encontrado"}), 404
@@ -159,6 +341,26 @@ class ProdutoController:
             "message": "Venda realizada com sucesso!",
             "produto": produto.to_dict_product()
         }), 200
+
+    @staticmethod
+    def vender_lote(user_id=None):
+        """Venda de balcão de vários produtos: {"itens": [{id, quantidade}], "parcial", "registrar_pedido"}."""
+        data = request.get_json(silent=True) or {}
+        registrar_pedido = bool(data.get("registrar_pedido", False))
+        if registrar_pedido and user_id is None:
+            return jsonify({"error": "registrar_pedido exige login", "code": "AUTH_REQUIRED"}), 401
+
+        itens, order, erro = ProdutoService.vender_lote(
+            data.get("itens"), user_id=user_id if registrar_pedido else None, parcial=bool(data.get("parcial", False))
+        )
+        if erro:
+            return jsonify({**erro, "itens": itens or []}), 400
+
+        return jsonify({
+            "message": "Venda realizada com sucesso!",
+            "itens": itens,
+            "order": order.to_dict() if order else None
+        }), 200
     
 
     @staticmethod
@@ -43,10 +43,12 @@ class UserController:
     @staticmethod
     def validate_code():
         data = request.get_json()
-        cnpj = data.get('cnpj')
+        email = (data.get('email') or '').strip()
         codigo_digitado = data.get('codigo_digitado')
+        if not email:
+            return jsonify({"message": "Email não informado"}), 400
 
-        user,msg = UserService.validar_codigo(cnpj, codigo_digitado)
+        user,msg = UserService.validar_codigo(email, codigo_digitado)
 
         if user:
             access_token = create_access_token(identity=str(user.cnpj))
@@ -62,12 +64,12 @@ class UserController:
     
 
     @staticmethod
-    def verify_user():
+    def verify_user(user=None):
         data = request.get_json()
         email = (data.get('email') or '').strip()
         password = data.get('password')
 
-        user, msg = UserService.verifica_user(email, password)
+        user, msg = UserService.verifica_user(email, password, user=user)
 
         if user:
             # Gera um token JWT e retorna para o cliente
@@ -0,0 +1,236 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import case, select
+from sqlalchemy.exc import IntegrityError
+from src.Infrastructure.Model.produto import Produto, nova_versao
+from src.Infrastructure.Model.stock_reservation import StockReservation
+from src.Application.Service.checkout_service import CheckoutService
+from src.Application.Service.produto_service import ProdutoService
+from src.Application.Service.stock_alert_service import StockAlertService
+from src.config.data_base import db
+
+# tempo (segundos) que o estoque fica separado desde a última alteração do carrinho
+RESERVA_TTL = int(os.environ.get('CART_RESERVATION_TTL', 900))
+LOTE_VARREDURA = int(os.environ.get('CART_SWEEP_BATCH', 500))
+
+
+class CartService:
+    @staticmethod
+    def itens(user_id):
+        """Itens do carrinho com nome/preço atuais do produto."""
+        linhas = (
+            db.session.query(StockReservation, Produto.nome, Produto.preco)
+            .join(Produto, Produto.id == StockReservation.product_id)
+            .filter(StockReservation.user_id == user_id)
+            .order_by(StockReservation.product_id)
+            .all()
+        )
+        agora = datetime.utcnow()
+        return [
+            {**reserva.to_dict(), 'name': nome, 'price': preco, 'expired': reserva.expires_at < agora}
+            for reserva, nome, preco in linhas
+        ]
+
+    @staticmethod
+    def definir_quantidade(user_id, product_id, quantidade):
+        """Ajusta a reserva de `product_id` no carrinho para `quantidade` (0 remove).
+
+        Só a diferença em relação à reserva atual passa pelo estoque, num UPDATE
+        condicional (quantidade >= delta); o TTL de todo o carrinho é renovado.
+        Retorna (itens do carrinho, erro) com erro no formato {'error', 'code'}.
+        """
+        try:
+            quantidade = int(quantidade)
+        except (TypeError, ValueError):
+            return None, {'error': 'quantity inválida', 'code': 'BAD_QUANTITY'}
+        if quantidade < 0:
+            return None, {'error': 'quantity inválida', 'code': 'BAD_QUANTITY'}
+
+        for tentativa in range(2):
+            try:
+                erro = CartService._ajustar_reserva(user_id, product_id, quantidade)
+                if erro:
+                    db.session.rollback()
+                    return None, erro
+                db.session.commit()
+                break
+            except IntegrityError:
+                # mesmo usuário criando a mesma reserva em paralelo: relê e tenta de novo
+                db.session.rollback()
+                if tentativa:
+                    return None, {'error': 'Carrinho alterado em paralelo, tente novamente', 'code': 'CONFLICT'}
+            except Exception:
+                db.session.rollback()
+                raise
+
+        ProdutoService.invalidar_cache(product_id)
+        return CartService.itens(user_id), None
+
+    @staticmethod
+    def _ajustar_reserva(user_id, product_id, quantidade):
+        agora = datetime.utcnow()
+        reserva = (
+            db.session.query(StockReservation)
+            .filter_by(user_id=user_id, product_id=product_id)
+            .with_for_update()
+            .first()
+        )
+        # reserva vencida mas ainda não varrida continua segurando o estoque
+        delta = quantidade - (reserva.quantity if reserva else 0)
+        tabela = Produto.__table__
+
+        if delta > 0:
+            result = db.session.execute(
+                tabela.update()
+                .where(tabela.c.id == product_id, tabela.c.status.is_(True), tabela.c.quantidade >= delta)
+                .values(quantidade=tabela.c.quantidade - delta, **nova_versao())
+            )
+            if not result.rowcount:
+                produto = db.session.get(Produto, product_id)
+                if not produto or not produto.status:
+                    return {'error': f'Produto {product_id} inválido/inativo', 'code': 'PRODUCT_INACTIVE'}
+                return {'error': f'Estoque insuficiente para produto {product_id}', 'code': 'LOW_STOCK'}
+            # reservar também é baixa de estoque: lê o saldo novo pela PK para o alerta
+            nome, nova = db.session.execute(
+                select(tabela.c.nome, tabela.c.quantidade).where(tabela.c.id == product_id)
+            ).one()
+            StockAlertService.registrar_baixas([(product_id, nome, nova + delta, nova)])
+        elif delta < 0:
+            db.session.execute(
+                tabela.update().where(tabela.c.id == product_id)
+                .values(quantidade=tabela.c.quantidade - delta, **nova_versao())
+            )
+
+        if quantidade == 0:
+            if reserva:
+                db.session.delete(reserva)
+        elif reserva:
+            reserva.quantity = quantidade
+        else:
+            db.session.add(StockReservation(user_id=user_id, product_id=product_id, quantity=quantidade,
+                                            expires_at=agora + timedelta(seconds=RESERVA_TTL), created_at=agora))
+        db.session.flush()
+
+        db.session.execute(
+            StockReservation.__table__.update()
+            .where(StockReservation.user_id == user_id)
+            .values(expires_at=agora + timedelta(seconds=RESERVA_TTL))
+        )
+        return None
+
+    @staticmethod
+    def esvaziar(user_id):
+        """Remove todas as reservas do usuário e devolve o estoque."""
+        try:
+            reservas = (
+                db.session.query(StockReservation)
+                .filter_by(user_id=user_id)
+                .order_by(StockReservation.product_id)
+                .with_for_update()
+                .all()
+            )
+            ids = CartService._devolver_estoque(reservas)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        ProdutoService.invalidar_cache(*ids)
+        return len(reservas)
+
+    @staticmethod
+    def _devolver_estoque(reservas):
+        """UPDATE único devolvendo as quantidades reservadas + DELETE das reservas (sem commit)."""
+        if not reservas:
+            return []
+        devolver = {}
+        for reserva in reservas:
+            devolver[reserva.product_id] = devolver.get(reserva.product_id, 0) + reserva.quantity
+        ids = sorted(devolver)
+        db.session.execute(
+            Produto.__table__.update()
+            .where(Produto.id.in_(ids))
+            .values(quantidade=Produto.quantidade + case(devolver, value=Produto.id), **nova_versao())
+        )
+        db.session.execute(
+            StockReservation.__table__.delete().where(StockReservation.id.in_([r.id for r in reservas]))
+        )
+        return ids
+
+    @staticmethod
+    def finalizar(user_id):
+        """Converte as reservas do carrinho em pedido.
+
+        O estoque já foi baixado na reserva: aqui não há UPDATE em produtos, só
+        trava das próprias reservas do usuário, gravação do pedido e remoção das
+        reservas. Reservas vencidas recusam o checkout (o cliente refaz o item).
+        Retorna (order, erro).
+        """
+        try:
+            reservas = (
+                db.session.query(StockReservation)
+                .filter_by(user_id=user_id)
+                .order_by(StockReservation.product_id)
+                .with_for_update()
+                .all()
+            )
+            if not reservas:
+                db.session.rollback()
+                return None, {'error': 'Carrinho vazio', 'code': 'EMPTY_CART'}
+            agora = datetime.utcnow()
+            vencidas = [r.product_id for r in reservas if r.expires_at < agora]
+            if vencidas:
+                db.session.rollback()
+                return None, {'error': 'Reserva expirada para um ou mais produtos', 'code': 'RESERVATION_EXPIRED',
+                              'product_ids': vencidas}
+
+            quantidades = {r.product_id: r.quantity for r in reservas}
+            # produto desativado depois da reserva não pode ser vendido (como em finalizar_compra)
+            por_id = {p.id: p for p in db.session.query(Produto).filter(
+                Produto.id.in_(list(quantidades)), Produto.status.is_(True))}
+            faltando = [pid for pid in quantidades if pid not in por_id]
+            if faltando:
+                db.session.rollback()
+                return None, {'error': f'Produto {faltando[0]} inválido/inativo', 'code': 'PRODUCT_INACTIVE'}
+
+            order = CheckoutService.criar_pedido(user_id, por_id, quantidades)
+            db.session.execute(
+                StockReservation.__table__.delete().where(StockReservation.id.in_([r.id for r in reservas]))
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return order, None
+
+    @staticmethod
+    def consulta_reservas_vencidas(lote):
+        return (
+            db.session.query(StockReservation)
+            .filter(StockReservation.expires_at < datetime.utcnow())
+            .order_by(StockReservation.expires_at)
+            .limit(lote)
+            .with_for_update(skip_locked=True)
+        )
+
+    @staticmethod
+    def liberar_expiradas(lote=None):
+        """Devolve ao estoque as reservas vencidas, em lotes pelo índice de expires_at.
+
+        Usa FOR UPDATE SKIP LOCKED (onde o banco suporta): várias instâncias podem
+        varrer ao mesmo tempo sem disputar as mesmas linhas, e reservas sendo
+        alteradas/finalizadas agora ficam para a próxima rodada. Retorna quantas liberou.
+        """
+        lote = lote or LOTE_VARREDURA
+        total = 0
+        while True:
+            try:
+                reservas = CartService.consulta_reservas_vencidas(lote).all()
+                ids = CartService._devolver_estoque(reservas)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            ProdutoService.invalidar_cache(*ids)
+            total += len(reservas)
+            if len(reservas) < lote:
+                return total
@@ -0,0 +1,149 @@
+from datetime import datetime
+from sqlalchemy import case
+from src.Infrastructure.Model.produto import Produto, nova_versao
+from src.Infrastructure.Model.order import Order
+from src.Infrastructure.Model.order_item import OrderItem
+from src.Infrastructure.Model.counter_sale import CounterSale, CounterSaleItem
+from src.Application.Service.stats_service import StatsService
+from src.Application.Service.stock_alert_service import StockAlertService
+from src.Application.Service.produto_service import ProdutoService
+from src.config.data_base import db
+
+
+class CheckoutService:
+    @staticmethod
+    def agrupar_itens(items):
+        """Valida o payload do carrinho e soma quantidades repetidas do mesmo produto.
+
+        Retorna (dict product_id -> quantidade, erro). O erro segue o formato
+        {'error': ..., 'code': ...} já usado pela rota /checkout.
+        """
+        quantidades = {}
+        for idx, entry in enumerate(items):
+            try:
+                pid = int(entry.get('product_id'))
+            except Exception:
+                return None, {'error': f'product_id inválido no índice {idx}', 'code': 'BAD_PRODUCT_ID'}
+            try:
+                qty = int(entry.get('quantity', 1))
+            except Exception:
+                return None, {'error': f'quantity inválida no índice {idx}', 'code': 'BAD_QUANTITY'}
+            if qty < 1:
+                return None, {'error': f'quantity inválida no índice {idx}', 'code': 'BAD_QUANTITY'}
+            quantidades[pid] = quantidades.get(pid, 0) + qty
+        return quantidades, None
+
+    @staticmethod
+    def _linhas(por_id, quantidades):
+        """Linhas de item (nome/preço atuais do produto) e o total, em ordem de product_id."""
+        linhas = []
+        total = 0.0
+        for pid in sorted(quantidades):
+            produto = por_id[pid]
+            qty = quantidades[pid]
+            linha_total = produto.preco * qty
+            total += linha_total
+            linhas.append({
+                'product_id': produto.id,
+                'product_name': produto.nome,
+                'unit_price': produto.preco,
+                'quantity': qty,
+                'line_total': linha_total,
+            })
+        return linhas, total
+
+    @staticmethod
+    def criar_pedido(user_id, por_id, quantidades):
+        """Grava Order + OrderItem (executemany) e atualiza os agregados de vendas.
+
+        Não mexe em estoque nem faz commit: roda na transação de quem chamou,
+        depois que o estoque de cada produto já foi baixado (ou reservado).
+        `por_id` mapeia product_id -> Produto e `quantidades` product_id -> quantidade.
+        """
+        linhas, total = CheckoutService._linhas(por_id, quantidades)
+        order = Order(user_id=user_id, total=total, created_at=datetime.utcnow())
+        db.session.add(order)
+        db.session.flush()  # precisa do order.id para os itens
+
+        for linha in linhas:
+            linha['order_id'] = order.id
+        db.session.execute(OrderItem.__table__.insert(), linhas)
+        StatsService.registrar_pedido(order, linhas)
+        return order
+
+    @staticmethod
+    def criar_venda_balcao(por_id, quantidades):
+        """Como o criar_pedido, para a venda de balcão sem cliente (CounterSale + itens).
+
+        Mesmas regras: sem commit e depois da baixa de estoque.
+        """
+        linhas, total = CheckoutService._linhas(por_id, quantidades)
+        venda = CounterSale(total=total, created_at=datetime.utcnow())
+        db.session.add(venda)
+        db.session.flush()
+
+        for linha in linhas:
+            linha['sale_id'] = venda.id
+        db.session.execute(CounterSaleItem.__table__.insert(), linhas)
+        StatsService.registrar_venda_balcao(venda, linhas)
+        return venda
+
+    @staticmethod
+    def finalizar_compra(user_id, items):
+        """Cria o pedido e baixa o estoque de todos os itens numa única transação.
+
+        - carrega todos os produtos do carrinho em uma query só;
+        - trava as linhas (SELECT ... FOR UPDATE) sempre em ordem crescente de id,
+          evitando deadlock entre checkouts concorrentes;
+        - baixa o estoque com um único UPDATE condicional (quantidade >= pedido);
+        - insere os OrderItem em lote (executemany);
+        - registra alertas de estoque baixo para os produtos que cruzaram o limite;
+        - atualiza os agregados de vendas antes do commit (a versão do catálogo
+          não muda: cada produto baixado ganha sua própria versao no UPDATE).
+
+        Retorna (order, erro).
+        """
+        quantidades, erro = CheckoutService.agrupar_itens(items)
+        if erro:
+            return None, erro
+
+        ids = sorted(quantidades)
+        try:
+            por_id = {p.id: p for p in ProdutoService.consulta_travar_produtos(ids)}
+
+            for pid in ids:
+                produto = por_id.get(pid)
+                if not produto or not produto.status:
+                    db.session.rollback()
+                    return None, {'error': f'Produto {pid} inválido/inativo', 'code': 'PRODUCT_INACTIVE'}
+                if produto.quantidade < quantidades[pid]:
+                    db.session.rollback()
+                    return None, {'error': f'Estoque insuficiente para produto {pid}', 'code': 'LOW_STOCK'}
+
+            # UPDATE produtos SET quantidade = quantidade - CASE id ... END
+            #  WHERE id IN (...) AND quantidade >= CASE id ... END
+            delta = case(quantidades, value=Produto.id)
+            result = db.session.execute(
+                Produto.__table__.update()
+                .where(Produto.id.in_(ids))
+                .where(Produto.quantidade >= delta)
+                .values(quantidade=Produto.quantidade - delta, **nova_versao())
+            )
+            if result.rowcount != len(ids):
+                db.session.rollback()
+                return None, {'error': 'Estoque insuficiente para um ou mais produtos', 'code': 'LOW_STOCK'}
+            # as linhas estão travadas: quantidade lida - pedido é o estoque novo
+            StockAlertService.registrar_baixas(
+                (pid, por_id[pid].nome, por_id[pid].quantidade, por_id[pid].quantidade - quantidades[pid])
+                for pid in ids
+            )
+
+            order = CheckoutService.criar_pedido(user_id, por_id, quantidades)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # estoque mudou via UPDATE direto: descarta as entradas do cache de produtos
+        ProdutoService.invalidar_cache(*ids)
+        return order, None
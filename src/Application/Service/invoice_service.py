@@ -0,0 +1,143 @@
+import os
+import threading
+from collections import OrderedDict
+from flask import current_app
+from src.Infrastructure.Model.order import Order
+from src.Infrastructure.Model.user import User
+from src.Infrastructure.jobs.job_queue import get_job_queue
+from src.config.data_base import db
+
+# order_id -> job_id do último render enfileirado (limitado, como o registro da fila)
+_MAX_PEDIDOS = 1000
+_jobs_por_pedido = OrderedDict()
+_lock = threading.Lock()
+
+
+class InvoiceService:
+    @staticmethod
+    def caminho_pdf(order_id, static_folder=None):
+        pdf_dir = os.path.join(static_folder or current_app.static_folder, 'invoices')
+        return os.path.join(pdf_dir, f'invoice_{order_id}.pdf')
+
+    @staticmethod
+    def url_pdf(order_id):
+        return f"/static/invoices/invoice_{order_id}.pdf"
+
+    @staticmethod
+    def gerar_pdf(order_id):
+        """Renderiza a nota fiscal do pedido em static/invoices (roda no worker)."""
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import mm
+
+        order = db.session.query(Order).filter_by(id=order_id).first()
+        if not order:
+            raise ValueError(f"Pedido {order_id} não encontrado")
+
+        # Buscar nome do usuário
+        usuario = db.session.query(User).filter_by(id=order.user_id).first()
+        nome_usuario = usuario.name if usuario else f"ID: {order.user_id}"
+
+        pdf_path = InvoiceService.caminho_pdf(order.id)
+        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+        # escreve num arquivo temporário e renomeia: quem baixa nunca vê PDF pela metade
+        tmp_path = f"{pdf_path}.{threading.get_ident()}.tmp"
+        c = canvas.Canvas(tmp_path, pagesize=A4)
+        width, height = A4
+        y = height - 20*mm
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(20*mm, y, f"Nota Fiscal - Pedido #{order.id}")
+        y -= 10*mm
+        c.setFont("Helvetica", 11)
+        c.drawString(20*mm, y, f"Usuário: {nome_usuario}")
+        y -= 6*mm
+        c.drawString(20*mm, y, f"Total: R$ {order.total:.2f}")
+        y -= 10*mm
+        c.setFont("Helvetica-Bold", 12)
+        c.drawString(20*mm, y, "Itens")
+        y -= 8*mm
+        c.setFont("Helvetica", 10)
+        for it in order.items:
+            if y < 20*mm:
+                c.showPage()
+                y = height - 20*mm
+                c.setFont("Helvetica", 10)
+            line = f"{it.product_name} | Qtd: {it.quantity} | Unit: R$ {it.unit_price:.2f} | Total: R$ {it.line_total:.2f}"
+            c.drawString(20*mm, y, line)
+            y -= 6*mm
+        c.showPage()
+        c.save()
+        os.replace(tmp_path, pdf_path)
+        return InvoiceService.url_pdf(order.id)
+
+    @staticmethod
+    def agendar(order_id):
+        """Enfileira a renderização da nota e retorna o id do job."""
+        app = current_app._get_current_object()
+        job_id = get_job_queue().enqueue(app, InvoiceService.gerar_pdf, order_id)
+        with _lock:
+            _jobs_por_pedido[order_id] = job_id
+            _jobs_por_pedido.move_to_end(order_id)
+            while len(_jobs_por_pedido) > _MAX_PEDIDOS:
+                _jobs_por_pedido.popitem(last=False)
+        return job_id
+
+    @staticmethod
+    def pedido_visivel(order_id, user_id):
+        """Order se `user_id` é o dono do pedido ou um admin (status 2); senão None."""
+        order = db.session.get(Order, order_id)
+        if not order:
+            return None
+        if order.user_id != user_id:
+            usuario = db.session.get(User, user_id)
+            if not usuario or usuario.status != 2:
+                return None
+        return order
+
+    @staticmethod
+    def status(order_id, reagendar=True):
+        """Status da nota: 'pending' | 'running' | 'done' | 'failed', ou None se o pedido não existe.
+
+        Sem job nem PDF, agenda o render de novo (só quando `reagendar`): quem
+        chama com reagendar=True já conferiu o dono do pedido.
+        """
+        with _lock:
+            job_id = _jobs_por_pedido.get(order_id)
+        job = get_job_queue().get(job_id) if job_id else None
+
+        if job:
+            status = job['status']
+        elif os.path.exists(InvoiceService.caminho_pdf(order_id)):
+            status = 'done'
+        else:
+            # job perdido (restart do processo) ou nunca agendado: agenda de novo
+            if not reagendar or not db.session.query(Order.id).filter_by(id=order_id).first():
+                return None
+            job_id = InvoiceService.agendar(order_id)
+            job = get_job_queue().get(job_id)
+            status = job['status'] if job else 'pending'
+
+        return {
+            'order_id': order_id,
+            'job_id': job_id,
+            'status': status,
+            'error': job.get('error') if job else None,
+            'url': InvoiceService.url_pdf(order_id) if status == 'done' else None,
+        }
+
+    @staticmethod
+    def aguardar_pdf(order_id, timeout=10):
+        """Espera o render já agendado terminar (primeiro download). Retorna o caminho ou None.
+
+        O download é público pelo id do pedido, então aqui nunca se agenda render
+        novo: isso só acontece no checkout ou no /status, que confere o dono.
+        """
+        pdf_path = InvoiceService.caminho_pdf(order_id)
+        if os.path.exists(pdf_path):
+            return pdf_path
+        info = InvoiceService.status(order_id, reagendar=False)
+        if not info:
+            return None
+        if info['status'] in ('pending', 'running'):
+            get_job_queue().wait(info['job_id'], timeout=timeout)
+        return pdf_path if os.path.exists(pdf_path) else None
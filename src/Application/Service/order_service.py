@@ -0,0 +1,73 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
+from src.Infrastructure.Model.order import Order
+from src.config.data_base import db
+
+LIMITE_HISTORICO_PADRAO = 20
+LIMITE_HISTORICO_MAX = 100
+
+
+class OrderService:
+    @staticmethod
+    def codificar_cursor(order):
+        bruto = f"{order.created_at.isoformat()}|{order.id}"
+        return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decodificar_cursor(cursor):
+        """Cursor opaco -> (created_at, id). Levanta ValueError se inválido."""
+        try:
+            bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            criado, order_id = bruto.rsplit("|", 1)
+            return datetime.fromisoformat(criado), int(order_id)
+        except Exception:
+            raise ValueError("cursor inválido")
+
+    @staticmethod
+    def consulta_historico(user_id, limite, apos=None):
+        """Query de uma página do histórico; `apos` é o (created_at, id) do cursor."""
+        query = (
+            db.session.query(Order)
+            .options(selectinload(Order.items))
+            .filter(Order.user_id == user_id)
+        )
+        if apos:
+            criado, order_id = apos
+            query = query.filter(or_(
+                Order.created_at < criado,
+                and_(Order.created_at == criado, Order.id < order_id)
+            ))
+        return query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limite)
+
+    @staticmethod
+    def historico_pagina(user_id, limite=LIMITE_HISTORICO_PADRAO, cursor=None):
+        """Uma página do histórico, do mais recente para o mais antigo.
+
+        Keyset em (created_at, id) — usa o índice orders(user_id, created_at) — e
+        itens carregados com selectinload (uma query extra por página, não por pedido).
+        Retorna (pedidos, próximo cursor ou None).
+        """
+        limite = max(1, min(int(limite), LIMITE_HISTORICO_MAX))
+        apos = OrderService.decodificar_cursor(cursor) if cursor else None
+        pedidos = OrderService.consulta_historico(user_id, limite + 1, apos).all()
+
+        proximo = None
+        if len(pedidos) > limite:
+            pedidos = pedidos[:limite]
+            proximo = OrderService.codificar_cursor(pedidos[-1])
+        return pedidos, proximo
+
+    @staticmethod
+    def iterar_historico(user_id, lote=LIMITE_HISTORICO_MAX):
+        """Percorre o histórico inteiro página a página (para respostas em streaming)."""
+        cursor = None
+        while True:
+            pedidos, cursor = OrderService.historico_pagina(user_id, limite=lote, cursor=cursor)
+            for pedido in pedidos:
+                yield pedido.to_dict(include_items=True)
+            # libera os objetos da página já enviada
+            db.session.expunge_all()
+            if not cursor:
+                break
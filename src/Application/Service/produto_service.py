@@ -1,31 +1,132 @@
 from src.Domain.produto import ProdutoDomain
-from src.Infrastructure.Model.produto import Produto
+from src.Infrastructure.Model.produto import Produto, nova_versao
+from sqlalchemy import case, func, select
+from src.Infrastructure.Model.catalog_version import CatalogVersion
+from src.Application.Service.stats_service import StatsService
+from src.Application.Service.stock_alert_service import StockAlertService
+from src.Infrastructure.cache.product_cache import criar_cache_produtos, NAO_EXISTE
+from src.Infrastructure.storage.image_store import (
+    caminho_original, gerar_variantes, salvar_imagem, variantes_prontas
+)
+from src.Infrastructure.jobs.job_queue import get_job_queue
 from werkzeug.utils import secure_filename
 from src.config.data_base import db
 from flask import current_app
+from datetime import datetime
 import os 
 
+# Campos da API (nomes usados pelo frontend) -> colunas do modelo
+CAMPOS_PRODUTO = {
+    "id": Produto.id,
+    "name": Produto.nome,
+    "price": Produto.preco,
+    "quantity": Produto.quantidade,
+    "status": Produto.status,
+    "image": Produto.imagem,
+    "description": Produto.nome,  # Usando nome como descrição por enquanto
+}
+
+# Cache de leitura de produtos (dicts, write-through nas mutações abaixo)
+_cache = criar_cache_produtos()
+
+LIMITE_PAGINA_PADRAO = 50
+LIMITE_PAGINA_MAX = 200
+
+# linhas por venda de balcão em lote (POST /produto/vender)
+MAX_ITENS_VENDA = int(os.environ.get('POS_MAX_LINES', 200))
+
+
+def _to_bool(val):
+    if isinstance(val, bool):
+        return val
+    if val is None:
+        return True
+    s = str(val).strip().lower()
+    if s in ('1', 'true', 't', 'yes', 'y', 'on', 'ativo', 'active'):
+        return True
+    if s in ('0', 'false', 'f', 'no', 'n', 'off', 'inativo', 'inactive'):
+        return False
+    # fallback: try integer
+    try:
+        return bool(int(s))
+    except Exception:
+        return True
+
 
 class ProdutoService:
     @staticmethod
-    def criar_produto(nome, preco, quantidade, status, imagem):
-        # normaliza o campo status para boolean
-        def _to_bool(val):
-            if isinstance(val, bool):
-                return val
-            if val is None:
-                return True
-            s = str(val).strip().lower()
-            if s in ('1', 'true', 't', 'yes', 'y', 'on', 'ativo', 'active'):
-                return True
-            if s in ('0', 'false', 'f', 'no', 'n', 'off', 'inativo', 'inactive'):
-                return False
-            # fallback: try integer
-            try:
-                return bool(int(s))
-            except Exception:
-                return True
+    def incrementar_versao():
+        """Incrementa a versão do catálogo na transação corrente (quem chama faz o commit).
+
+        Só para alterações de catálogo: baixa de estoque marca apenas o próprio
+        produto (nova_versao()), sem passar por esta linha única.
+
+        Retorna a versão nova: a linha fica travada até o commit, então ela é
+        exatamente a versão que inclui as mudanças desta transação.
+        """
+        tabela = CatalogVersion.__table__
+        agora = datetime.utcnow()
+        result = db.session.execute(
+            tabela.update().where(tabela.c.id == 1).values(version=tabela.c.version + 1, updated_at=agora)
+        )
+        if not result.rowcount:
+            db.session.add(CatalogVersion(id=1, version=1, updated_at=agora))
+            return 1
+        return db.session.execute(select(tabela.c.version).where(tabela.c.id == 1)).scalar()
+
+    @staticmethod
+    def versao_catalogo():
+        """Retorna (versão, atualizado) da listagem completa do catálogo.
 
+        A versão junta o contador do catálogo (criações/exclusões) com a soma das
+        `versao` dos produtos, que só cresce a cada escrita numa linha: qualquer
+        baixa de estoque muda o ETag sem disputar uma linha compartilhada. É um
+        agregado sobre duas colunas, bem mais barato que montar a lista.
+        """
+        row = db.session.query(CatalogVersion.version, CatalogVersion.updated_at).filter_by(id=1).first()
+        soma, ultima = db.session.query(
+            func.coalesce(func.sum(Produto.versao), 0), func.max(Produto.atualizado_em)
+        ).one()
+        versao = f"{row.version if row else 0}.{soma}"
+        atualizado = max((d for d in (row and row.updated_at, ultima) if d), default=None)
+        return versao, atualizado
+
+    @staticmethod
+    def obter_produto(id):
+        """Produto como dict (to_dict_product) passando pelo cache; None se não existe.
+
+        Toda escrita em produtos invalida (ou regrava) a entrada depois do commit;
+        o TTL do L1 limita o quanto outro worker pode servir uma entrada antiga.
+        """
+        cached = _cache.get(id)
+        if cached is not None:
+            return None if cached == NAO_EXISTE else cached
+
+        produto = Produto.query.filter_by(id=id).first()
+        if not produto:
+            _cache.set_missing(id)
+            return None
+        dados = produto.to_dict_product()
+        _cache.set(id, dados)
+        return dados
+
+    @staticmethod
+    def _marcar_alterado(produto):
+        """nova_versao() numa edição pelo ORM (vira `versao = versao + 1` no flush)."""
+        for coluna, valor in nova_versao().items():
+            setattr(produto, coluna, valor)
+
+    @staticmethod
+    def invalidar_cache(*ids):
+        _cache.invalidate(*ids)
+
+    @staticmethod
+    def cache_stats():
+        return _cache.stats()
+
+    @staticmethod
+    def _novo_dominio(nome, preco, quantidade, status, imagem):
+        # normaliza o campo status para boolean
         status_bool = _to_bool(status)
         
         # Converter preco e quantidade para os tipos corretos
@@ -35,29 +136,190 @@ class ProdutoService:
         except (ValueError, TypeError) as e:
             raise ValueError(f"Erro ao converter preco ou quantidade: {str(e)}")
 
-        new_produto = ProdutoDomain(nome, preco, quantidade, status_bool, imagem)
+        return ProdutoDomain(nome, preco, quantidade, status_bool, imagem)
+
+    @staticmethod
+    def criar_produto(nome, preco, quantidade, status, imagem):
+        new_produto = ProdutoService._novo_dominio(nome, preco, quantidade, status, imagem)
 
         produto = Produto(
             nome = new_produto.nome,
             preco = new_produto.preco,
             quantidade = new_produto.quantidade,
             status = new_produto.status,
-            imagem = new_produto.imagem
+            imagem = new_produto.imagem,
+            imagem_variantes = variantes_prontas(new_produto.imagem)
         )
 
         try:
             db.session.add(produto)
+            ProdutoService.incrementar_versao()
             db.session.commit()
         except Exception as e:
             db.session.rollback()
             raise Exception(f"Erro ao salvar produto no banco: {str(e)}")
-            
+
+        _cache.set(produto.id, produto.to_dict_product())
+        ProdutoService.agendar_variantes(produto)
         return produto 
     
 
+    @staticmethod
+    def agendar_variantes(produto):
+        """Depois do commit: se a imagem do produto é um upload sem variantes, gera em background."""
+        if produto.imagem_variantes or not caminho_original(produto.imagem):
+            return None
+        app = current_app._get_current_object()
+        return get_job_queue().enqueue(app, ProdutoService._gerar_variantes, produto.id, produto.imagem)
+
+    @staticmethod
+    def _gerar_variantes(produto_id, imagem):
+        """Job: gera thumb/medium e marca o produto, se ele ainda usa a mesma imagem."""
+        gerar_variantes(caminho_original(imagem))
+        if not variantes_prontas(imagem):
+            return False
+        try:
+            tabela = Produto.__table__
+            marcado = db.session.execute(
+                tabela.update()
+                .where(tabela.c.id == produto_id, tabela.c.imagem == imagem, tabela.c.imagem_variantes.is_(False))
+                .values(imagem_variantes=True, **nova_versao())
+            ).rowcount
+            if marcado:
+                # as URLs de thumb/medium mudam: a versão nova derruba os ETags antigos
+                ProdutoService.incrementar_versao()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        ProdutoService.invalidar_cache(produto_id)
+        return bool(marcado)
+
+    @staticmethod
+    def importar_lote(linhas, tamanho_lote=1000):
+        """Importa produtos de um iterável de (numero_linha, dict) em lotes.
+
+        Cada linha passa pelas mesmas conversões do criar_produto; linhas inválidas
+        entram no relatório de erros e não interrompem o restante. Cada lote é um
+        INSERT em executemany com seu próprio commit.
+
+        Retorna (inseridos, erros) com erros = [{"row": n, "error": msg}].
+        """
+        inseridos, erros, lote = 0, [], []
+
+        def gravar():
+            nonlocal inseridos
+            try:
+                db.session.execute(Produto.__table__.insert(), lote)
+                ProdutoService.incrementar_versao()
+                db.session.commit()
+                inseridos += len(lote)
+            except Exception as e:
+                db.session.rollback()
+                erros.append({"row": None, "error": f"Falha ao gravar lote de {len(lote)} linha(s): {str(e)}"})
+            lote.clear()
+
+        for numero, row in linhas:
+            try:
+                nome = (row.get("name") or row.get("nome") or "").strip()
+                preco = row.get("price", row.get("preco"))
+                if not nome or preco in (None, ""):
+                    raise ValueError("Campos obrigatórios faltando (name, price).")
+                quantidade = row.get("quantity", row.get("quantidade"))
+                if quantidade in (None, ""):
+                    quantidade = 1
+                produto = ProdutoService._novo_dominio(
+                    nome, preco, quantidade, row.get("status"), row.get("image") or row.get("imagem") or None
+                )
+            except Exception as e:
+                erros.append({"row": numero, "error": str(e)})
+                continue
+            linha = produto.to_dict_product()
+            linha["imagem_variantes"] = variantes_prontas(produto.imagem)
+            lote.append(linha)
+            if len(lote) >= tamanho_lote:
+                gravar()
+        if lote:
+            gravar()
+        return inseridos, erros
+
+    @staticmethod
+    def exportar(tamanho_lote=1000):
+        """Itera o catálogo inteiro com cursor no servidor, sem carregar tudo em memória."""
+        query = (
+            db.session.query(Produto.id, Produto.nome, Produto.preco, Produto.quantidade,
+                             Produto.status, Produto.imagem)
+            .order_by(Produto.id)
+            .execution_options(stream_results=True)
+            .yield_per(tamanho_lote)
+        )
+        for r in query:
+            yield {
+                "id": r.id,
+                "nome": r.nome,
+                "preco": r.preco,
+                "quantidade": r.quantidade,
+                "status": r.status,
+                "imagem": r.imagem
+            }
+
     @staticmethod
     def listar_produtos():
         return db.session.query(Produto).all()
+
+
+    @staticmethod
+    def listar_pagina(apos_id=None, limite=LIMITE_PAGINA_PADRAO, status=None, qtd_min=None,
+                      qtd_max=None, prefixo=None, campos=None):
+        """Lista produtos por keyset (id > apos_id), com filtros e projeção de colunas.
+
+        Retorna (lista de dicts só com `campos`, próximo cursor ou None).
+        """
+        campos = list(campos or CAMPOS_PRODUTO)
+        limite = max(1, min(int(limite), LIMITE_PAGINA_MAX))
+        # busca um a mais para saber se existe próxima página
+        rows = ProdutoService.consulta_pagina(apos_id, limite + 1, status, qtd_min, qtd_max, prefixo, campos).all()
+
+        proximo = None
+        if len(rows) > limite:
+            rows = rows[:limite]
+            proximo = rows[-1].id
+
+        itens = []
+        for r in rows:
+            dados = r._asdict()
+            itens.append({c: (r.id if c == "id" else dados[c]) for c in campos})
+        return itens, proximo
+
+    @staticmethod
+    def consulta_pagina(apos_id, limite, status=None, qtd_min=None, qtd_max=None, prefixo=None, campos=None):
+        """Query de uma página da listagem (keyset por id), só com as colunas de `campos`."""
+        colunas = {c: CAMPOS_PRODUTO[c] for c in (campos or CAMPOS_PRODUTO)}
+        # o id sempre é lido: é a chave do cursor
+        query = db.session.query(Produto.id, *[col.label(nome) for nome, col in colunas.items() if nome != "id"])
+
+        if apos_id is not None:
+            query = query.filter(Produto.id > apos_id)
+        if status is not None:
+            query = query.filter(Produto.status == _to_bool(status))
+        if qtd_min is not None:
+            query = query.filter(Produto.quantidade >= qtd_min)
+        if qtd_max is not None:
+            query = query.filter(Produto.quantidade <= qtd_max)
+        if prefixo:
+            escapado = prefixo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.filter(Produto.nome.like(f"{escapado}%", escape="\\"))
+        return query.order_by(Produto.id).limit(limite)
+
+    @staticmethod
+    def consulta_travar_produtos(ids):
+        """SELECT ... FOR UPDATE dos produtos em ordem crescente de id (evita deadlock entre vendas)."""
+        return (
+            db.session.query(Produto)
+            .filter(Produto.id.in_(ids))
+            .order_by(Produto.id)
+            .with_for_update()
+        )
     
 
     @staticmethod
@@ -77,25 +339,20 @@ class ProdutoService:
         if quantidade:
             new_produto.quantidade = quantidade
         
+        ProdutoService._marcar_alterado(new_produto)
         if imagem:
             if hasattr(imagem, 'filename') and imagem.filename:  # É um FileStorage e tem nome?
-                filename = secure_filename(imagem.filename)
-                # Evita colisões usando UUID no nome do arquivo
-                import uuid
-                base, ext = os.path.splitext(filename)
-                filename = f"{uuid.uuid4().hex}{ext or ''}"
-                # Garante pasta absoluta
-                upload_dir = os.path.join(current_app.static_folder, 'uploads')
-                os.makedirs(upload_dir, exist_ok=True)
-                abs_path = os.path.join(upload_dir, filename)
-                imagem.save(abs_path)
-                # salva caminho relativo iniciando com / para funcionar em páginas sob /static
-                new_produto.imagem = f"/static/uploads/{filename}"
+                # nome pelo hash do conteúdo (dedupe); variantes geradas em background
+                new_produto.imagem = salvar_imagem(imagem)
             else:
                 # string/URL direta
                 new_produto.imagem = imagem
+            new_produto.imagem_variantes = variantes_prontas(new_produto.imagem)
         
+        ProdutoService.incrementar_versao()
         db.session.commit()
+        _cache.set(new_produto.id, new_produto.to_dict_product())
+        ProdutoService.agendar_variantes(new_produto)
         return new_produto
     
 
@@ -107,7 +364,10 @@ class ProdutoService:
             return None
     
         produto.status = False  
+        ProdutoService._marcar_alterado(produto)
+        ProdutoService.incrementar_versao()
         db.session.commit()
+        _cache.set(produto.id, produto.to_dict_product())
     
         return produto
     
@@ -120,7 +380,10 @@ class ProdutoService:
             return None
         
         produto.status = True  
+        ProdutoService._marcar_alterado(produto)
+        ProdutoService.incrementar_versao()
         db.session.commit()
+        _cache.set(produto.id, produto.to_dict_product())
         
         return produto
     
@@ -133,27 +396,125 @@ class ProdutoService:
             return None
         
         db.session.delete(produto)
+        ProdutoService.incrementar_versao()
         db.session.commit()
+        _cache.set_missing(id)
 
         return True
 
     @staticmethod
     def vender_produto(id, quantidade_venda):
-        produto = Produto.query.filter_by(id=id).first()
-        
-        if not produto:
-            return None, "Produto não encontrado"
+        """Venda de balcão de um produto só: mesmo caminho do vender_lote.
 
-        if not produto.status:
-            return None, "Produto inativo!"
+        A linha é travada (FOR UPDATE) antes dos agregados e o estoque baixa com
+        o UPDATE condicional, na mesma ordem de travas do checkout.
+        Retorna (produto, mensagem de erro).
+        """
+        linhas, _, erro = ProdutoService.vender_lote([{'id': id, 'quantidade': quantidade_venda}])
+        if erro:
+            # motivo da linha recusada (não encontrado/inativo/estoque) ou o erro da venda
+            return None, (linhas or [{}])[0].get('error') or erro['error']
+        return db.session.get(Produto, id), None
 
-        if produto.quantidade < quantidade_venda:
-            return None, "Estoque insuficiente!"
+    @staticmethod
+    def _agrupar_venda(itens):
+        """Valida [{id, quantidade}] e soma linhas repetidas. Retorna (dict id -> quantidade, erro)."""
+        if not isinstance(itens, list) or not itens:
+            return None, {'error': 'itens deve ser uma lista não vazia', 'code': 'EMPTY_SALE'}
+        if len(itens) > MAX_ITENS_VENDA:
+            return None, {'error': f'Máximo de {MAX_ITENS_VENDA} itens por venda', 'code': 'TOO_MANY_ITEMS'}
+        quantidades = {}
+        for idx, entry in enumerate(itens):
+            try:
+                pid = int(entry.get('id'))
+            except Exception:
+                return None, {'error': f'id inválido no índice {idx}', 'code': 'BAD_PRODUCT_ID'}
+            try:
+                qty = int(entry.get('quantidade', 1))
+            except Exception:
+                return None, {'error': f'quantidade inválida no índice {idx}', 'code': 'BAD_QUANTITY'}
+            if qty < 1:
+                return None, {'error': f'quantidade inválida no índice {idx}', 'code': 'BAD_QUANTITY'}
+            quantidades[pid] = quantidades.get(pid, 0) + qty
+        return quantidades, None
 
-        produto.quantidade -= quantidade_venda
-        db.session.commit()
+    @staticmethod
+    def vender_lote(itens, user_id=None, parcial=False):
+        """Venda de balcão de vários produtos numa única transação.
+
+        Trava as linhas (SELECT ... FOR UPDATE, em ordem de id), confere cada
+        linha e baixa o estoque de todas com um único UPDATE condicional, como o
+        checkout. Com `parcial=False` qualquer linha recusada cancela a venda
+        inteira; com `parcial=True` vende só as linhas possíveis. Com `user_id`
+        a venda vira um Order (entra no histórico do usuário); sem ele, uma
+        CounterSale. As duas entram nos agregados e no rebuild-stats.
+
+        Retorna (resultado por linha, order ou None, erro).
+        """
+        quantidades, erro = ProdutoService._agrupar_venda(itens)
+        if erro:
+            return None, None, erro
+
+        ids = sorted(quantidades)
+        order = None
+        try:
+            por_id = {p.id: p for p in ProdutoService.consulta_travar_produtos(ids)}
+
+            linhas, vendaveis = [], {}
+            for pid in ids:
+                produto, qty = por_id.get(pid), quantidades[pid]
+                linha = {'id': pid, 'quantidade': qty}
+                if not produto:
+                    linha.update(vendido=False, error='Produto não encontrado', code='NOT_FOUND')
+                elif not produto.status:
+                    linha.update(vendido=False, error='Produto inativo!', code='PRODUCT_INACTIVE')
+                elif produto.quantidade < qty:
+                    linha.update(vendido=False, error='Estoque insuficiente!', code='LOW_STOCK',
+                                 disponivel=produto.quantidade)
+                else:
+                    linha.update(vendido=True, preco=produto.preco, estoque_restante=produto.quantidade - qty)
+                    vendaveis[pid] = qty
+                linhas.append(linha)
+
+            recusadas = len(ids) - len(vendaveis)
+            if not vendaveis or (recusadas and not parcial):
+                db.session.rollback()
+                for linha in linhas:
+                    if linha['vendido']:
+                        linha.update(vendido=False, code='NOT_SOLD')
+                        del linha['estoque_restante']
+                return linhas, None, {'error': f'{recusadas} item(ns) recusado(s), venda não realizada',
+                                      'code': 'SALE_REJECTED'}
+
+            # UPDATE produtos SET quantidade = quantidade - CASE id ... END
+            #  WHERE id IN (...) AND quantidade >= CASE id ... END
+            delta = case(vendaveis, value=Produto.id)
+            result = db.session.execute(
+                Produto.__table__.update()
+                .where(Produto.id.in_(list(vendaveis)))
+                .where(Produto.quantidade >= delta)
+                .values(quantidade=Produto.quantidade - delta, **nova_versao())
+            )
+            if result.rowcount != len(vendaveis):
+                db.session.rollback()
+                return None, None, {'error': 'Estoque insuficiente para um ou mais produtos', 'code': 'LOW_STOCK'}
+            StockAlertService.registrar_baixas(
+                (pid, por_id[pid].nome, por_id[pid].quantidade, por_id[pid].quantidade - qty)
+                for pid, qty in sorted(vendaveis.items())
+            )
+
+            from src.Application.Service.checkout_service import CheckoutService
+            if user_id is not None:
+                order = CheckoutService.criar_pedido(user_id, por_id, vendaveis)
+            else:
+                CheckoutService.criar_venda_balcao(por_id, vendaveis)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
-        return produto, None
+        ProdutoService.invalidar_cache(*vendaveis)
+        return linhas, order, None
     
 
 
@@ -0,0 +1,218 @@
+import os
+from datetime import date, datetime
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+from src.Infrastructure.Model.produto import Produto
+from src.Infrastructure.Model.order import Order
+from src.Infrastructure.Model.order_item import OrderItem
+from src.Infrastructure.Model.counter_sale import CounterSale, CounterSaleItem
+from src.Infrastructure.Model.sales_stats import SalesTotals, ProductSales, DailyRevenue, CustomerSales
+from src.config.data_base import db
+
+TOTALS_ID = 1
+LOW_STOCK_LIMIT = int(os.environ.get('LOW_STOCK_LIMIT', 5))
+
+
+def _incrementar(model, chave, **incrementos):
+    """UPDATE col = col + x na linha `chave`; se ela não existe, INSERT.
+
+    Roda dentro da transação de quem chamou (não faz commit). O INSERT fica num
+    savepoint: se outro processo criou a linha no meio tempo, cai para o UPDATE.
+    Retorna True quando a linha foi criada agora.
+    """
+    tabela = model.__table__
+    where = and_(*[tabela.c[k] == v for k, v in chave.items()])
+    valores = {col: tabela.c[col] + v for col, v in incrementos.items()}
+
+    if db.session.execute(tabela.update().where(where).values(**valores)).rowcount:
+        return False
+    try:
+        with db.session.begin_nested():
+            db.session.execute(tabela.insert().values(**chave, **incrementos))
+        return True
+    except IntegrityError:
+        db.session.execute(tabela.update().where(where).values(**valores))
+        return False
+
+
+class StatsService:
+    @staticmethod
+    def registrar_pedido(order, linhas):
+        """Atualiza os agregados com um pedido recém-criado (mesma transação do checkout).
+
+        `linhas` são os dicts de OrderItem (product_id, quantity, line_total).
+        """
+        itens = 0
+        for linha in linhas:
+            itens += linha['quantity']
+            _incrementar(ProductSales, {'product_id': linha['product_id']},
+                         sold_qty=linha['quantity'], revenue=linha['line_total'])
+
+        dia = (order.created_at or datetime.utcnow()).date()
+        _incrementar(DailyRevenue, {'day': dia}, total=order.total, orders=1)
+
+        novo_cliente = _incrementar(CustomerSales, {'user_id': order.user_id}, orders=1, total=order.total)
+        _incrementar(SalesTotals, {'id': TOTALS_ID},
+                     total_revenue=order.total, total_orders=1, total_items_sold=itens,
+                     unique_customers=1 if novo_cliente else 0)
+
+    @staticmethod
+    def registrar_venda_balcao(venda, linhas):
+        """Como registrar_pedido, para uma CounterSale: conta como uma venda, sem cliente."""
+        itens = 0
+        for linha in linhas:
+            itens += linha['quantity']
+            _incrementar(ProductSales, {'product_id': linha['product_id']},
+                         sold_qty=linha['quantity'], revenue=linha['line_total'])
+
+        dia = (venda.created_at or datetime.utcnow()).date()
+        _incrementar(DailyRevenue, {'day': dia}, total=venda.total, orders=1)
+        _incrementar(SalesTotals, {'id': TOTALS_ID},
+                     total_revenue=venda.total, total_orders=1, total_items_sold=itens, unique_customers=0)
+
+    @staticmethod
+    def reconstruir():
+        """Recalcula todas as tabelas de agregados a partir de orders e counter_sales (com os itens).
+
+        Pensado para rodar fora do horário de pico (`flask rebuild-stats`):
+        checkouts concorrentes durante o rebuild podem ficar de fora da contagem.
+        """
+        try:
+            for model in (SalesTotals, ProductSales, DailyRevenue, CustomerSales):
+                db.session.query(model).delete(synchronize_session=False)
+
+            # pedidos e vendas de balcão somados por produto e por dia
+            por_produto, por_dia = {}, {}
+            for venda, item in ((Order, OrderItem), (CounterSale, CounterSaleItem)):
+                for pid, qty, rev in (
+                    db.session.query(item.product_id,
+                                     func.coalesce(func.sum(item.quantity), 0),
+                                     func.coalesce(func.sum(item.line_total), 0.0))
+                    .group_by(item.product_id)
+                ):
+                    qty_ant, rev_ant = por_produto.get(pid, (0, 0.0))
+                    por_produto[pid] = (qty_ant + int(qty), rev_ant + float(rev))
+                for dia, total, qtd in (
+                    db.session.query(func.date(venda.created_at),
+                                     func.coalesce(func.sum(venda.total), 0.0),
+                                     func.count(venda.id))
+                    .filter(venda.created_at.isnot(None))
+                    .group_by(func.date(venda.created_at))
+                ):
+                    dia = dia if isinstance(dia, date) else date.fromisoformat(str(dia))
+                    total_ant, qtd_ant = por_dia.get(dia, (0.0, 0))
+                    por_dia[dia] = (total_ant + float(total), qtd_ant + int(qtd))
+            balcao_receita, balcao_vendas = db.session.query(
+                func.coalesce(func.sum(CounterSale.total), 0.0), func.count(CounterSale.id)
+            ).one()
+            por_cliente = (
+                db.session.query(Order.user_id, func.count(Order.id), func.coalesce(func.sum(Order.total), 0.0))
+                .group_by(Order.user_id)
+                .all()
+            )
+
+            if por_produto:
+                db.session.execute(ProductSales.__table__.insert(), [
+                    {'product_id': pid, 'sold_qty': qty, 'revenue': rev}
+                    for pid, (qty, rev) in por_produto.items()
+                ])
+            if por_dia:
+                db.session.execute(DailyRevenue.__table__.insert(), [
+                    {'day': dia, 'total': total, 'orders': qtd}
+                    for dia, (total, qtd) in por_dia.items()
+                ])
+            if por_cliente:
+                db.session.execute(CustomerSales.__table__.insert(), [
+                    {'user_id': uid, 'orders': int(qtd), 'total': float(total)}
+                    for uid, qtd, total in por_cliente
+                ])
+
+            db.session.add(SalesTotals(
+                id=TOTALS_ID,
+                total_revenue=sum(float(total) for _, _, total in por_cliente) + float(balcao_receita),
+                total_orders=sum(int(qtd) for _, qtd, _ in por_cliente) + int(balcao_vendas),
+                total_items_sold=sum(qty for qty, _ in por_produto.values()),
+                unique_customers=len(por_cliente)
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def consulta_por_produto():
+        """Estoque de cada produto com as vendas acumuladas (join pela PK de product_sales)."""
+        return (
+            db.session.query(
+                Produto.id,
+                Produto.nome,
+                Produto.preco,
+                Produto.quantidade.label('stock'),
+                func.coalesce(ProductSales.sold_qty, 0).label('sold_qty'),
+                func.coalesce(ProductSales.revenue, 0.0).label('revenue')
+            )
+            .outerjoin(ProductSales, ProductSales.product_id == Produto.id)
+        )
+
+    @staticmethod
+    def painel():
+        """Monta o payload de /admin/stats lendo só os agregados e a tabela de produtos.
+
+        Retorna None enquanto os agregados não existem (eles vêm da migração 12 ou
+        de `flask rebuild-stats`): reconstruir aqui varreria o histórico inteiro
+        dentro de uma requisição.
+        """
+        totais = db.session.get(SalesTotals, TOTALS_ID)
+        if totais is None:
+            return None
+
+        total_revenue = float(totais.total_revenue or 0.0)
+        total_orders = int(totais.total_orders or 0)
+        total_items_sold = int(totais.total_items_sold or 0)
+
+        rows = StatsService.consulta_por_produto().all()
+
+        per_product = []
+        for r in rows:
+            sold = int(r.sold_qty or 0)
+            stock = int(r.stock or 0)
+            price = float(r.preco or 0.0)
+            denom = sold + stock
+            per_product.append({
+                'id': r.id,
+                'name': r.nome,
+                'price': price,
+                'sold_qty': sold,
+                'stock_remaining': stock,
+                'stock_value': float(stock) * price,
+                'revenue': float(r.revenue or 0.0),
+                'percent_of_total_sold': (float(sold) / float(total_items_sold) * 100.0) if total_items_sold else 0.0,
+                'sold_vs_stock_percent': (float(sold) / float(denom) * 100.0) if denom else 0.0
+            })
+
+        low_stock = sorted(
+            (p for p in per_product if 0 < p['stock_remaining'] <= LOW_STOCK_LIMIT),
+            key=lambda p: p['stock_remaining']
+        )
+        top_selling = sorted(per_product, key=lambda p: p['sold_qty'], reverse=True)[:5]
+
+        revenue_by_day = [
+            {'date': str(dia), 'total': float(total)}
+            for dia, total in db.session.query(DailyRevenue.day, DailyRevenue.total).order_by(DailyRevenue.day).all()
+        ]
+
+        return {
+            'total_revenue': total_revenue,
+            'total_orders': total_orders,
+            'total_items_sold': total_items_sold,
+            'stock_total': sum(p['stock_remaining'] for p in per_product),
+            'unique_customers': int(totais.unique_customers or 0),
+            'avg_order_value': float(total_revenue / total_orders) if total_orders > 0 else 0.0,
+            'total_products': len(per_product),
+            'products_out_of_stock': sum(1 for p in per_product if p['stock_remaining'] == 0),
+            'low_stock_count': len(low_stock),
+            'top_products': [{'name': p['name'], 'quantity': p['sold_qty']} for p in top_selling],
+            'low_stock_list': [{'name': p['name'], 'stock': p['stock_remaining']} for p in low_stock[:10]],
+            'per_product': per_product,
+            'revenue_by_day': revenue_by_day
+        }
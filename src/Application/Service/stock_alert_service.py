@@ -0,0 +1,204 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from src.Infrastructure.Model.low_stock_alert import LowStockAlert
+from src.Infrastructure.Model.low_stock_digest import LowStockDigest
+from src.Infrastructure.Model.user import User
+from src.Application.Service.stats_service import LOW_STOCK_LIMIT
+from src.config.data_base import db
+
+logger = logging.getLogger(__name__)
+
+LOTE_RESUMO = int(os.environ.get('LOW_STOCK_DIGEST_BATCH', 500))
+# corpo de mensagem do WhatsApp aceita até 1600 caracteres
+TAMANHO_MAX_RESUMO = 1500
+MAX_TENTATIVAS = int(os.environ.get('LOW_STOCK_DIGEST_MAX_ATTEMPTS', 3))
+# resumo enfileirado por outro processo (ou antes de um restart): o status da
+# entrega só existe na memória de quem enfileirou; depois desse prazo reenvia
+PRAZO_ENTREGA = int(os.environ.get('LOW_STOCK_DIGEST_DELIVERY_TIMEOUT', 600))
+
+
+class StockAlertService:
+    @staticmethod
+    def registrar_baixas(mudancas):
+        """Grava alertas para as baixas de estoque que cruzaram o limite (sem commit).
+
+        `mudancas` são tuplas (product_id, nome, quantidade_anterior, quantidade_nova)
+        que quem baixou o estoque já tem em mãos: nenhuma consulta a produtos.
+        Gera 'out' quando o produto zera e 'low' quando passa de acima para
+        dentro do LOW_STOCK_LIMIT; baixas que já estavam abaixo do limite não
+        geram alerta de novo. Retorna quantos alertas gravou.
+        """
+        agora = datetime.utcnow()
+        linhas = []
+        for product_id, nome, anterior, nova in mudancas:
+            if nova <= 0 < anterior:
+                tipo = 'out'
+            elif nova <= LOW_STOCK_LIMIT < anterior:
+                tipo = 'low'
+            else:
+                continue
+            linhas.append({'product_id': product_id, 'product_name': nome, 'kind': tipo,
+                           'previous_quantity': anterior, 'quantity': nova, 'created_at': agora})
+        if linhas:
+            db.session.execute(LowStockAlert.__table__.insert(), linhas)
+        return len(linhas)
+
+    @staticmethod
+    def destinatarios():
+        """Números em E.164 de LOW_STOCK_ALERT_TO (separados por vírgula) ou, sem ela, do celular dos admins.
+
+        Números que não dá para normalizar ficam de fora, com aviso.
+        """
+        from src.Infrastructure.http.whats_app import normalizar_numero
+        configurados = os.environ.get('LOW_STOCK_ALERT_TO')
+        if configurados:
+            brutos = [n.strip() for n in configurados.split(',') if n.strip()]
+        else:
+            brutos = [celular for (celular,) in db.session.query(User.celular).filter(User.status == 2) if celular]
+        numeros = []
+        for bruto in brutos:
+            numero = normalizar_numero(bruto)
+            if numero is None:
+                logger.warning("Destinatário de alerta de estoque inválido: %s", bruto)
+            elif numero not in numeros:
+                numeros.append(numero)
+        return numeros
+
+    @staticmethod
+    def montar_resumo(alertas):
+        """Uma linha por produto (o alerta mais recente de cada um), esgotados primeiro."""
+        por_produto = {}
+        for alerta in alertas:
+            por_produto[alerta.product_id] = alerta
+        ordenados = sorted(por_produto.values(), key=lambda a: (a.quantity, a.product_name))
+
+        texto = f"Estoque baixo: {len(ordenados)} produto(s)"
+        for i, alerta in enumerate(ordenados):
+            situacao = 'ESGOTADO' if alerta.quantity <= 0 else f'{alerta.quantity} un.'
+            linha = f"\n- {alerta.product_name} (#{alerta.product_id}): {situacao}"
+            if len(texto) + len(linha) > TAMANHO_MAX_RESUMO:
+                texto += f"\n... e mais {len(ordenados) - i}"
+                break
+            texto += linha
+        return texto
+
+    @staticmethod
+    def enviar_resumo(lote=None):
+        """Rodada periódica dos alertas de estoque baixo.
+
+        1. junta os alertas pendentes num resumo e grava uma linha em
+           low_stock_digests por destinatário (sem destinatário, os alertas
+           continuam pendentes);
+        2. confere a entrega dos resumos já enfileirados: 'sent' fecha, falha
+           volta para a fila até MAX_TENTATIVAS;
+        3. enfileira os resumos pendentes no WhatsApp.
+        Retorna quantos alertas entraram em resumos novos.
+        """
+        lote = lote or LOTE_RESUMO
+        alertas = StockAlertService._gerar_resumos(lote)
+        StockAlertService._acompanhar_entregas(lote)
+        StockAlertService._enfileirar_pendentes(lote)
+        return alertas
+
+    @staticmethod
+    def consulta_alertas_pendentes(lote):
+        return (
+            db.session.query(LowStockAlert)
+            .filter(LowStockAlert.notified_at.is_(None))
+            .order_by(LowStockAlert.notified_at, LowStockAlert.id)
+            .limit(lote)
+            .with_for_update(skip_locked=True)
+        )
+
+    @staticmethod
+    def _gerar_resumos(lote):
+        try:
+            # SKIP LOCKED: várias instâncias não juntam os mesmos alertas
+            alertas = StockAlertService.consulta_alertas_pendentes(lote).all()
+            if not alertas:
+                db.session.rollback()
+                return 0
+            destinatarios = StockAlertService.destinatarios()
+            if not destinatarios:
+                db.session.rollback()
+                logger.warning("%s alerta(s) de estoque aguardando destinatário (LOW_STOCK_ALERT_TO)", len(alertas))
+                return 0
+
+            agora = datetime.utcnow()
+            corpo = StockAlertService.montar_resumo(alertas)
+            db.session.execute(LowStockDigest.__table__.insert(), [
+                {'recipient': numero, 'body': corpo, 'status': 'pending', 'attempts': 0,
+                 'created_at': agora, 'updated_at': agora}
+                for numero in destinatarios
+            ])
+            db.session.execute(
+                LowStockAlert.__table__.update()
+                .where(LowStockAlert.id.in_([a.id for a in alertas]))
+                .values(notified_at=agora)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        logger.info("Resumo de estoque baixo gerado",
+                    extra={'alertas': len(alertas), 'destinatarios': len(destinatarios)})
+        return len(alertas)
+
+    @staticmethod
+    def consulta_resumos(status, lote):
+        return (
+            db.session.query(LowStockDigest)
+            .filter(LowStockDigest.status == status)
+            .order_by(LowStockDigest.status, LowStockDigest.id)
+            .limit(lote)
+            .with_for_update(skip_locked=True)
+        )
+
+    @staticmethod
+    def _falhou(resumo, erro, agora):
+        resumo.error = (erro or 'erro desconhecido')[:255]
+        resumo.updated_at = agora
+        if resumo.attempts >= MAX_TENTATIVAS:
+            resumo.status = 'failed'
+            logger.error("Resumo de estoque baixo não entregue: %s", resumo.error,
+                         extra={'digest_id': resumo.id, 'attempts': resumo.attempts})
+        else:
+            resumo.status = 'pending'
+
+    @staticmethod
+    def _acompanhar_entregas(lote):
+        from src.Infrastructure.http.whats_app import status_envio
+        try:
+            agora = datetime.utcnow()
+            for resumo in StockAlertService.consulta_resumos('queued', lote):
+                info = status_envio(resumo.delivery_id)
+                if info is None:
+                    if resumo.updated_at + timedelta(seconds=PRAZO_ENTREGA) < agora:
+                        StockAlertService._falhou(resumo, 'status da entrega perdido', agora)
+                elif info['status'] == 'sent':
+                    resumo.status, resumo.error, resumo.updated_at = 'sent', None, agora
+                elif info['status'] == 'failed':
+                    StockAlertService._falhou(resumo, info.get('error'), agora)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def _enfileirar_pendentes(lote):
+        from src.Infrastructure.http.whats_app import enviar_mensagem_async
+        try:
+            agora = datetime.utcnow()
+            for resumo in StockAlertService.consulta_resumos('pending', lote):
+                delivery_id, erro = enviar_mensagem_async(resumo.recipient, resumo.body)
+                if erro:
+                    # fila cheia ou circuit breaker aberto: o resto tenta na próxima rodada
+                    logger.warning("Envio de resumo de estoque baixo adiado: %s", erro)
+                    break
+                resumo.status, resumo.delivery_id, resumo.updated_at = 'queued', delivery_id, agora
+                resumo.attempts += 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
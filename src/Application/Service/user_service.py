@@ -1,16 +1,41 @@
 from src.Domain.user import UserDomain
-from src.Infrastructure.Model.user import User
+from src.Infrastructure.Model.user import User, normalizar_email
 from src.config.data_base import db
+from src.config.log import amostrar
 from src.Infrastructure.http.whats_app import WhatsAppService
 from werkzeug.security import generate_password_hash, check_password_hash
 
+import logging
 import os 
+import re
+
+logger = logging.getLogger(__name__)
 
 # Prefer environment variables for Twilio credentials; keep previous values as fallback
 account_sid = os.environ.get('TWILIO_ACCOUNT_SID', "[REMOVED_TWILIO_SID]")
 auth_token = os.environ.get('TWILIO_AUTH_TOKEN', "d670018102f5d2fd131010b7f404f621")
 from_whatsapp_number = os.environ.get('TWILIO_FROM_NUMBER', "whatsapp:+14155238886")
 
+# Custo do hash de senha: PASSWORD_HASH_ITERATIONS (pbkdf2:sha256). Hashes gravados com
+# outro custo são refeitos de forma transparente no próximo login bem-sucedido.
+PASSWORD_HASH_METHOD = f"pbkdf2:sha256:{int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))}"
+
+
+def hash_senha(senha):
+    return generate_password_hash(senha, method=PASSWORD_HASH_METHOD)
+
+
+# Formato do Werkzeug: "método$salt$hash" (pbkdf2:sha256:600000$..., scrypt:32768:8:1$...)
+_FORMATO_HASH = re.compile(r'^[a-z0-9]+(:[a-z0-9:]+)?\$[^$]+\$[0-9a-f]+$')
+
+
+def eh_hash(stored):
+    return bool(_FORMATO_HASH.match(str(stored)))
+
+
+def precisa_rehash(stored):
+    return str(stored).split('$', 1)[0] != PASSWORD_HASH_METHOD
+
 
 class UserService:
     @staticmethod
@@ -22,7 +47,7 @@ class UserService:
             admin = User(
                 name='luiz',
                 email='luiz@gmail.com',
-                password=generate_password_hash('1234luiz'),
+                password=hash_senha('1234luiz'),
                 cnpj='49433805810',  # CPF no lugar do CNPJ conforme especificado
                 celular='11979911839',
                 codigo_validacao=None,
@@ -35,10 +60,10 @@ class UserService:
             if admin.status != 2:
                 admin.status = 2
                 db.session.commit()
-            # Se senha do admin não está hasheada, migra para hash
-            if admin.password and not str(admin.password).startswith('pbkdf2:'):
+            # Se senha do admin não está hasheada (em nenhum formato do Werkzeug), migra para hash
+            if admin.password and not eh_hash(admin.password):
                 try:
-                    admin.password = generate_password_hash(admin.password)
+                    admin.password = hash_senha(admin.password)
                     db.session.commit()
                 except Exception:
                     db.session.rollback()
@@ -55,7 +80,7 @@ class UserService:
         user = User(
             name=new_user.name,
             email=new_user.email,
-            password=generate_password_hash(new_user.password),
+            password=hash_senha(new_user.password),
             cnpj=new_user.cnpj,
             celular=new_user.celular,
             codigo_validacao=None,
@@ -70,53 +95,92 @@ class UserService:
     
 
     @staticmethod
-    def validar_codigo(codigo_digitado):
-        """Valida o código diretamente contra o último código gerado"""
+    def validar_codigo(email, codigo_digitado):
+        """Valida o código pendente do usuário no store de verificação (chave = email).
+
+        O usuário é localizado só pelo email: o cnpj não é único (o padrão
+        '00000000000' é compartilhado). Retorna (user, mensagem); user é None
+        se o código não confere.
+        """
         from src.Infrastructure.http.whats_app import verificar_codigo
-        return verificar_codigo(codigo_digitado)
+        user = UserService.buscar_por_email(email)
+        if not user:
+            return None, "Usuário não encontrado"
+
+        ok, msg = verificar_codigo(user.email, codigo_digitado)
+        if not ok:
+            return None, msg
+
+        if user.status not in (1, 2):
+            user.status = 1
+            db.session.commit()
+        return user, msg
 
 
        
     @staticmethod
-    def verifica_user(email, password):
+    def consulta_por_email(email_normalizado):
+        return User.query.filter_by(email_normalizado=email_normalizado)
+
+    @staticmethod
+    def buscar_por_email(email):
+        """Busca o usuário pelo email normalizado (uma consulta pelo índice único).
+
+        Contas ainda sem email_normalizado (antes da migração 4 do `flask migrate`) caem no
+        lookup exato pela coluna email, também indexada.
+        """
+        email_norm = normalizar_email(email)
+        if not email_norm:
+            return None
+        user = UserService.consulta_por_email(email_norm).first()
+        if user is None:
+            user = User.query.filter_by(email=email.strip()).first()
+        return user
+
+    @staticmethod
+    def verifica_user(email, password, user=None):
+        """Confere a senha. Aceita o `user` já carregado pela rota para não repetir o lookup."""
         if not email:
             return None, "Email não informado"
         if password is None:
             return None, "Senha não informada"
 
-        email_norm = email.strip().lower()
-        user = User.query.filter_by(email=email_norm).first() or User.query.filter_by(email=email.strip()).first()
+        email_norm = normalizar_email(email)
+        if user is None:
+            user = UserService.buscar_por_email(email)
         
         if not user:
-            print(f"[LOGIN] Usuário não encontrado para email: {email_norm}")
+            logger.info("[LOGIN] Usuário não encontrado", extra=amostrar(email=email_norm))
             return None, "Usuário não encontrado"
 
         stored = user.password or ''
         provided = str(password)
 
-        # Verifica se senha está hasheada
-        is_hashed = str(stored).startswith('pbkdf2:')
+        # Verifica se senha está hasheada (qualquer método do Werkzeug, não só pbkdf2)
+        is_hashed = eh_hash(stored)
         valid = False
         try:
             if is_hashed:
-                valid = check_password_hash(stored, provided)
-            else:
+                try:
+                    valid = check_password_hash(stored, provided)
+                except ValueError:
+                    # parece "x$y$z" mas o Werkzeug não reconhece o método: é texto puro
+                    is_hashed = False
+            if not is_hashed:
                 valid = (stored == provided)
         except Exception:
             valid = False
 
         if not valid:
-            print(f"[LOGIN] Senha incorreta para email: {email_norm} | hashed={is_hashed}")
+            logger.info("[LOGIN] Senha incorreta", extra=amostrar(email=email_norm, hashed=is_hashed))
             return None, "Senha incorreta"
 
-        # Migração silenciosa: se estava em texto puro, converte para hash após login bem-sucedido
-        if not is_hashed:
+        # Migração silenciosa: texto puro ou hash com custo antigo é refeito com o custo atual
+        if not is_hashed or precisa_rehash(stored):
             try:
-                user.password = generate_password_hash(provided)
-                # também normaliza email para minúsculo
-                user.email = email_norm
+                user.password = hash_senha(provided)
                 db.session.commit()
-                print(f"[LOGIN] Senha migrada para hash para email: {email_norm}")
+                logger.info("[LOGIN] Hash de senha atualizado", extra={"email": email_norm})
             except Exception:
                 db.session.rollback()
         
@@ -162,4 +226,32 @@ class UserService:
             return True
         except:
             db.session.rollback()
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def backfill_email_normalizado(lote=None):
+        """Preenche email_normalizado das contas antigas, em lotes pequenos.
+
+        Retorna (atualizados, conflitos); conflito = dois emails que só diferem
+        em maiúsculas/espaços, que ficam sem normalizar para revisão manual.
+        """
+        from sqlalchemy.exc import IntegrityError
+        from src.config.migration import backfill_em_lotes
+        atualizados, conflitos = 0, []
+
+        def aplicar(linhas):
+            nonlocal atualizados
+            for linha in linhas:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(
+                            User.__table__.update()
+                            .where(User.id == linha.id)
+                            .values(email_normalizado=normalizar_email(linha.email) or None)
+                        )
+                    atualizados += 1
+                except IntegrityError:
+                    conflitos.append(linha.email)
+
+        backfill_em_lotes(User.__table__, User.email_normalizado.is_(None), aplicar, lote=lote)
+        return atualizados, conflitos
@@ -0,0 +1,15 @@
+from src.config.data_base import db
+from datetime import datetime
+
+
+class CatalogVersion(db.Model):
+    """Contador de versão do catálogo (linha única, id=1).
+
+    Só alterações de catálogo (criar, editar, ativar/inativar, excluir, importar)
+    incrementam `version`. Baixas de estoque ficam na `versao` de cada produto,
+    para as vendas não disputarem esta linha.
+    """
+    __tablename__ = 'catalog_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,34 @@
+from src.config.data_base import db
+from datetime import datetime
+
+
+class CounterSale(db.Model):
+    """Venda de balcão sem cliente (POST /produto/vender sem registrar_pedido).
+
+    É a fonte dessas vendas para o `flask rebuild-stats`, como orders é para o checkout.
+    """
+    __tablename__ = 'counter_sales'
+    __table_args__ = (
+        # receita por dia (rebuild-stats)
+        db.Index('ix_counter_sales_created_at', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    items = db.relationship('CounterSaleItem', backref='sale', lazy=True, cascade="all, delete-orphan")
+
+
+class CounterSaleItem(db.Model):
+    __tablename__ = 'counter_sale_items'
+    __table_args__ = (
+        db.Index('ix_counter_sale_items_sale_id', 'sale_id'),
+        db.Index('ix_counter_sale_items_product_id', 'product_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    sale_id = db.Column(db.Integer, db.ForeignKey('counter_sales.id'), nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)
+    product_name = db.Column(db.String(120), nullable=False)
+    unit_price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    line_total = db.Column(db.Float, nullable=False)
@@ -0,0 +1,20 @@
+from src.config.data_base import db
+from datetime import datetime
+
+
+class IdempotencyKey(db.Model):
+    """Resposta gravada para um Idempotency-Key (store 'database', compartilhado entre workers).
+
+    `chave` é o hash de usuário + rota + header; `fingerprint` o hash do corpo da
+    requisição original. Enquanto status='processing' a primeira requisição ainda
+    está rodando e as repetições esperam.
+    """
+    __tablename__ = 'idempotency_keys'
+    chave = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='processing')
+    response_status = db.Column(db.Integer, nullable=True)
+    response_content_type = db.Column(db.String(100), nullable=True)
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,35 @@
+from src.config.data_base import db
+from datetime import datetime
+
+
+class LowStockAlert(db.Model):
+    """Produto que cruzou o limite de estoque baixo (ou zerou) numa baixa de estoque.
+
+    Gravado na mesma transação da venda; `notified_at` fica nulo até o alerta
+    entrar num resumo enviado por WhatsApp.
+    """
+    __tablename__ = 'low_stock_alerts'
+    __table_args__ = (
+        # alertas pendentes de resumo, em ordem de chegada
+        db.Index('ix_low_stock_alerts_notified_at', 'notified_at', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, nullable=False)
+    product_name = db.Column(db.String(100), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # 'low' | 'out'
+    previous_quantity = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    notified_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'kind': self.kind,
+            'previous_quantity': self.previous_quantity,
+            'quantity': self.quantity,
+            'created_at': self.created_at.isoformat(),
+            'notified_at': self.notified_at.isoformat() if self.notified_at else None,
+        }
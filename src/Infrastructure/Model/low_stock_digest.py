@@ -0,0 +1,23 @@
+from src.config.data_base import db
+from datetime import datetime
+
+
+class LowStockDigest(db.Model):
+    """Resumo de estoque baixo para um destinatário, com o acompanhamento da entrega.
+
+    pending -> queued (aceito pela fila de WhatsApp, `delivery_id`) -> sent | failed.
+    Envios que falham voltam para pending até `attempts` chegar no limite.
+    """
+    __tablename__ = 'low_stock_digests'
+    __table_args__ = (
+        db.Index('ix_low_stock_digests_status', 'status', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    recipient = db.Column(db.String(20), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    delivery_id = db.Column(db.String(32), nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -4,6 +4,12 @@ from datetime import datetime
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # histórico do usuário ordenado por data (/historico)
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+        # receita por dia (rebuild-stats) e filtros por período
+        db.Index('ix_orders_created_at', 'created_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
     total = db.Column(db.Float, nullable=False, default=0.0)
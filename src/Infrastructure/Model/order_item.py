@@ -3,6 +3,11 @@ from src.config.data_base import db
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        # itens do pedido (selectinload em /historico) e vendas por produto (stats)
+        db.Index('ix_order_items_order_id', 'order_id'),
+        db.Index('ix_order_items_product_id', 'product_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
     product_id = db.Column(db.Integer, nullable=False)
@@ -1,14 +1,24 @@
+from datetime import datetime
+from sqlalchemy import false
 from src.config.data_base import db
-from sqlalchemy import event
 
 class Produto(db.Model):
     __tablename__ = 'produtos'
+    __table_args__ = (
+        # filtros de ativo/estoque baixo (status = ? AND quantidade <= ?)
+        db.Index('ix_produtos_status_quantidade', 'status', 'quantidade'),
+    )
     id = db.Column(db.Integer, primary_key = True)
     nome = db.Column(db.String(100), nullable = False)
     preco = db.Column(db.Float, nullable=False)
     quantidade = db.Column(db.Integer, nullable = False)
     status = db.Column(db.Boolean, default=True, nullable=True)
     imagem = db.Column(db.String(500))  # Aumentado para 500 para suportar URLs longas
+    # thumb/medium em WebP já geradas para `imagem` (marcado pelo job de variantes)
+    imagem_variantes = db.Column(db.Boolean, nullable=False, default=False, server_default=false())
+    # +1 a cada escrita na linha, estoque inclusive (ETag de GET /produto/<id>); ver nova_versao()
+    versao = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    atualizado_em = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
     def to_dict_product(self):
         return {
             "id": self.id,
@@ -16,20 +26,17 @@ class Produto(db.Model):
             "preco": self.preco,
             "quantidade": self.quantidade,
             "status": self.status,
-            "imagem": self.imagem
+            "imagem": self.imagem,
+            "imagem_variantes": bool(self.imagem_variantes),
+            "versao": self.versao or 0,
+            "atualizado_em": self.atualizado_em.isoformat() if self.atualizado_em else None
         }
 
 
-# Evento para criar tabela com IF NOT EXISTS
-@event.listens_for(Produto.__table__, 'after_create')
-def create_produtos_table(*args, **kwargs):
-    db.session.execute("""
-    CREATE TABLE IF NOT EXISTS produtos (
-        id INTEGER PRIMARY KEY AUTO_INCREMENT,
-        nome VARCHAR(100) NOT NULL,
-        preco FLOAT NOT NULL,
-        quantidade INTEGER NOT NULL,
-        status BOOLEAN DEFAULT TRUE,
-        imagem VARCHAR(500)
-    )
-    """)
\ No newline at end of file
+def nova_versao():
+    """Valores para o UPDATE que marcam a linha como alterada (versao + 1, atualizado_em agora).
+
+    Vão no mesmo UPDATE da escrita (a linha já está travada por ela), nunca numa
+    linha compartilhada entre produtos.
+    """
+    return {'versao': Produto.versao + 1, 'atualizado_em': datetime.utcnow()}
@@ -0,0 +1,35 @@
+from src.config.data_base import db
+
+
+class SalesTotals(db.Model):
+    """Totais globais de vendas (linha única, id=1)."""
+    __tablename__ = 'sales_totals'
+    id = db.Column(db.Integer, primary_key=True)
+    total_revenue = db.Column(db.Float, nullable=False, default=0.0)
+    total_orders = db.Column(db.Integer, nullable=False, default=0)
+    total_items_sold = db.Column(db.Integer, nullable=False, default=0)
+    unique_customers = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ProductSales(db.Model):
+    """Quantidade vendida e receita acumuladas por produto."""
+    __tablename__ = 'product_sales'
+    product_id = db.Column(db.Integer, primary_key=True)
+    sold_qty = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class DailyRevenue(db.Model):
+    """Receita e número de pedidos por dia (UTC, mesmo critério de Order.created_at)."""
+    __tablename__ = 'daily_revenue'
+    day = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CustomerSales(db.Model):
+    """Pedidos por cliente; usado para manter `unique_customers` sem COUNT(DISTINCT)."""
+    __tablename__ = 'customer_sales'
+    user_id = db.Column(db.Integer, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
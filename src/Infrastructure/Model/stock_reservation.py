@@ -0,0 +1,28 @@
+from src.config.data_base import db
+from datetime import datetime
+
+
+class StockReservation(db.Model):
+    """Item do carrinho do usuário com o estoque já separado até `expires_at`.
+
+    A quantidade reservada sai de produtos.quantidade no momento da reserva e
+    volta quando a reserva expira (varredura por expires_at) ou é removida.
+    """
+    __tablename__ = 'stock_reservations'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_stock_reservations_user_product'),
+        db.Index('ix_stock_reservations_expires_at', 'expires_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'quantity': self.quantity,
+            'expires_at': self.expires_at.isoformat(),
+        }
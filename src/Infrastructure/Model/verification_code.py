@@ -0,0 +1,12 @@
+from src.config.data_base import db
+from datetime import datetime
+
+
+class VerificationCode(db.Model):
+    """Código de verificação pendente por destinatário (email normalizado ou telefone)."""
+    __tablename__ = 'verification_codes'
+    chave = db.Column(db.String(120), primary_key=True)
+    codigo = db.Column(db.String(10), nullable=False)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Marca de "produto não existe" (cache negativo)
+NAO_EXISTE = {"__nao_existe__": True}
+
+
+class LRUCache:
+    """LRU em memória com TTL por entrada e limite de tamanho (thread-safe)."""
+
+    def __init__(self, max_entries=1000, ttl=10):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        agora = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < agora:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expira)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class LocalSharedCache:
+    """Stand-in local do backend compartilhado (mesma interface do RedisCache).
+
+    Serializa os valores em JSON como o Redis faria, para os testes de carga
+    exercitarem o mesmo caminho sem rede.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                self._data.pop(key, None)
+                return None
+            return json.loads(item[0])
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (json.dumps(value), time.monotonic() + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisCache:
+    """Backend compartilhado entre workers (requer o pacote `redis`)."""
+
+    def __init__(self, url):
+        import redis  # dependência opcional
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2)
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+class ProductCache:
+    """Cache de produtos em dois níveis: LRU local (L1) + backend compartilhado opcional (L2).
+
+    Os valores são dicts (to_dict_product), nunca objetos ORM. Falhas do L2 contam
+    como miss: o banco continua sendo a fonte da verdade.
+    """
+
+    def __init__(self, l1, shared=None, ttl=60, negative_ttl=5):
+        self.l1 = l1
+        self.shared = shared
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.shared_errors = 0
+
+    @staticmethod
+    def _key(product_id):
+        return f"produto:{product_id}"
+
+    def get(self, product_id):
+        """Retorna o dict do produto, NAO_EXISTE (cache negativo) ou None (miss)."""
+        key = self._key(product_id)
+        value = self.l1.get(key)
+        if value is not None or self.shared is None:
+            return value
+        try:
+            value = self.shared.get(key)
+        except Exception:
+            self.shared_errors += 1
+            return None
+        if value is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        self.l1.set(key, value, ttl=self.negative_ttl if value == NAO_EXISTE else None)
+        return value
+
+    def set(self, product_id, value):
+        key = self._key(product_id)
+        ttl = self.negative_ttl if value == NAO_EXISTE else self.ttl
+        self.l1.set(key, value, ttl=min(ttl, self.l1.ttl))
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl)
+            except Exception:
+                self.shared_errors += 1
+
+    def set_missing(self, product_id):
+        self.set(product_id, NAO_EXISTE)
+
+    def invalidate(self, *product_ids):
+        for product_id in product_ids:
+            key = self._key(product_id)
+            self.l1.delete(key)
+            if self.shared is not None:
+                try:
+                    self.shared.delete(key)
+                except Exception:
+                    self.shared_errors += 1
+
+    def stats(self):
+        data = {"l1": self.l1.stats()}
+        if self.shared is not None:
+            data["shared"] = {
+                "backend": type(self.shared).__name__,
+                "hits": self.shared_hits,
+                "misses": self.shared_misses,
+                "errors": self.shared_errors,
+            }
+        return data
+
+
+def criar_cache_produtos():
+    """Monta o cache a partir das variáveis de ambiente.
+
+    PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL (L1, segundos), PRODUCT_CACHE_SHARED_TTL,
+    PRODUCT_CACHE_NEGATIVE_TTL e PRODUCT_CACHE_BACKEND ('none' | 'local' | 'redis',
+    com PRODUCT_CACHE_URL para o redis).
+    """
+    l1 = LRUCache(
+        max_entries=int(os.environ.get("PRODUCT_CACHE_SIZE", 1000)),
+        ttl=float(os.environ.get("PRODUCT_CACHE_TTL", 10)),
+    )
+    backend = os.environ.get("PRODUCT_CACHE_BACKEND", "none").lower()
+    shared = None
+    if backend == "local":
+        shared = LocalSharedCache()
+    elif backend == "redis":
+        try:
+            shared = RedisCache(os.environ.get("PRODUCT_CACHE_URL", "redis://localhost:6379/0"))
+        except Exception as e:
+            logger.warning("Backend redis do cache de produtos indisponível (%s); usando só o LRU local", e)
+    return ProductCache(
+        l1,
+        shared=shared,
+        ttl=float(os.environ.get("PRODUCT_CACHE_SHARED_TTL", 60)),
+        negative_ttl=float(os.environ.get("PRODUCT_CACHE_NEGATIVE_TTL", 5)),
+    )
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import uuid
+from collections import OrderedDict
+
+from src.Infrastructure.http.whatsapp_delivery import (
+    CircuitBreaker, DeliveryQueue, _erro_definitivo, credenciais_twilio, usar_transporte_fake
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TwilioHTTPError(Exception):
+    """Resposta de erro da API da Twilio (status HTTP em `status`, como TwilioRestException)."""
+
+    def __init__(self, status, detalhe):
+        super().__init__(f"HTTP {status}: {detalhe}")
+        self.status = status
+
+
+class AsyncTwilioTransport:
+    """Envio pela API REST da Twilio com httpx.AsyncClient (keep-alive, pool limitado).
+
+    O cliente é criado no primeiro envio, já dentro do event loop do dispatcher.
+    """
+
+    URL = "https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
+
+    def __init__(self, account_sid, auth_token, timeout=5, max_conexoes=100):
+        self.url = self.URL.format(sid=account_sid)
+        self.auth = (account_sid, auth_token)
+        self.timeout = timeout
+        self.max_conexoes = max_conexoes
+        self._client = None
+
+    async def send(self, from_number, to_number, body):
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                auth=self.auth, timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_conexoes, max_keepalive_connections=self.max_conexoes),
+            )
+        resposta = await self._client.post(self.url, data={"From": from_number, "To": to_number, "Body": body})
+        if resposta.status_code >= 400:
+            raise TwilioHTTPError(resposta.status_code, resposta.text[:200])
+        return resposta.json()["sid"]
+
+
+class AsyncFakeTransport:
+    """Equivalente assíncrono do FakeTransport (mesmas variáveis WHATSAPP_FAKE_*)."""
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+
+    async def send(self, from_number, to_number, body):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("falha simulada no AsyncFakeTransport")
+        sid = f"FAKE{uuid.uuid4().hex[:30]}"
+        # só o loop do dispatcher mexe na lista: sem lock
+        self.sent.append({"sid": sid, "from": from_number, "to": to_number, "body": body})
+        del self.sent[:-1000]
+        return sid
+
+
+class AsyncDeliveryQueue(DeliveryQueue):
+    """Mesma interface da DeliveryQueue (enqueue/status/stats), com um event loop no lugar das threads.
+
+    Um único thread roda o loop; cada envio é uma corrotina e até `max_in_flight`
+    chamadas à API ficam em andamento ao mesmo tempo, sem uma thread por chamada.
+    Retries, backoff e circuit breaker seguem as mesmas regras.
+    """
+
+    def __init__(self, transport, from_number, max_in_flight=200, max_queue=500, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, max_status=5000):
+        self.transport = transport
+        self.from_number = from_number
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.max_status = max_status
+        self._status = OrderedDict()
+        self._lock = threading.Lock()
+        self._pendentes = 0
+        self._em_andamento = 0
+        self._pronto = threading.Event()
+        threading.Thread(target=self._rodar_loop, name="whatsapp-asyncio", daemon=True).start()
+        self._pronto.wait()
+
+    def _rodar_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._semaforo = asyncio.Semaphore(self.max_in_flight)
+        self._pronto.set()
+        self._loop.run_forever()
+
+    def enqueue(self, to_number, body):
+        if not self.breaker.allow():
+            return None, "circuit_open"
+        with self._lock:
+            if self._pendentes >= self.max_queue:
+                return None, "queue_full"
+            self._pendentes += 1
+        delivery_id = uuid.uuid4().hex
+        self._set_status(delivery_id, status="queued", attempts=0, error=None, sid=None)
+        asyncio.run_coroutine_threadsafe(self._entregar_async(delivery_id, to_number, body), self._loop)
+        return delivery_id, None
+
+    async def _entregar_async(self, delivery_id, to_number, body):
+        try:
+            async with self._semaforo:
+                self._em_andamento += 1
+                try:
+                    await self._tentar(delivery_id, to_number, body)
+                finally:
+                    self._em_andamento -= 1
+        except Exception:
+            logger.exception("Erro inesperado no envio WhatsApp", extra={"delivery_id": delivery_id})
+            self._set_status(delivery_id, status="failed", error="internal_error")
+        finally:
+            with self._lock:
+                self._pendentes -= 1
+
+    async def _tentar(self, delivery_id, to_number, body):
+        tentativa = 0
+        while True:
+            tentativa += 1
+            if not self.breaker.allow():
+                self._set_status(delivery_id, status="failed", attempts=tentativa - 1, error="circuit_open")
+                return
+            self._set_status(delivery_id, status="sending", attempts=tentativa)
+            try:
+                sid = await self.transport.send(self.from_number, to_number, body)
+            except Exception as e:
+                if _erro_definitivo(e):
+                    self._set_status(delivery_id, status="failed", error=str(e))
+                    logger.warning("Envio WhatsApp recusado pela API: %s", e, extra={"delivery_id": delivery_id})
+                    return
+                self.breaker.record_failure()
+                if tentativa > self.max_retries:
+                    self._set_status(delivery_id, status="failed", error=str(e))
+                    logger.error("Falha definitiva no envio WhatsApp: %s", e,
+                                 extra={"delivery_id": delivery_id, "attempts": tentativa})
+                    return
+                espera = min(self.backoff_max, self.backoff_base * (2 ** (tentativa - 1)))
+                await asyncio.sleep(espera * random.uniform(0.5, 1.0))
+                continue
+            self.breaker.record_success()
+            self._set_status(delivery_id, status="sent", sid=sid, error=None)
+            return
+
+    def stats(self):
+        with self._lock:
+            contagem = {}
+            for info in self._status.values():
+                contagem[info["status"]] = contagem.get(info["status"], 0) + 1
+            fila = self._pendentes - self._em_andamento
+        return {"queue_size": fila, "in_flight": self._em_andamento, "breaker": self.breaker.state,
+                "status": contagem}
+
+
+def criar_dispatcher_async():
+    """AsyncDeliveryQueue a partir do ambiente (mesmas variáveis WHATSAPP_* da versão com threads)."""
+    max_in_flight = int(os.environ.get("WHATSAPP_MAX_IN_FLIGHT", 200))
+    if usar_transporte_fake():
+        transporte = AsyncFakeTransport(
+            latency=float(os.environ.get("WHATSAPP_FAKE_LATENCY", 0)),
+            failure_rate=float(os.environ.get("WHATSAPP_FAKE_FAILURE_RATE", 0)),
+        )
+    else:
+        account_sid, auth_token, _ = credenciais_twilio()
+        transporte = AsyncTwilioTransport(
+            account_sid, auth_token,
+            timeout=float(os.environ.get("WHATSAPP_TIMEOUT", 5)),
+            max_conexoes=max_in_flight,
+        )
+    return AsyncDeliveryQueue(
+        transporte,
+        from_number=os.environ.get('TWILIO_FROM_NUMBER', ''),
+        max_in_flight=max_in_flight,
+        max_queue=int(os.environ.get("WHATSAPP_QUEUE_SIZE", 500)),
+        max_retries=int(os.environ.get("WHATSAPP_MAX_RETRIES", 3)),
+        breaker=CircuitBreaker(
+            threshold=int(os.environ.get("WHATSAPP_BREAKER_THRESHOLD", 5)),
+            cooldown=float(os.environ.get("WHATSAPP_BREAKER_COOLDOWN", 30)),
+        ),
+    )
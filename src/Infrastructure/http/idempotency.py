@@ -0,0 +1,87 @@
+import hashlib
+import logging
+from functools import wraps
+from flask import jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from src.Infrastructure.store.idempotency_store import (
+    CONFLITO, EM_ANDAMENTO, NOVO, PRONTO, get_idempotency_store
+)
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_MAX_CHAVE = 255
+
+
+def _hash(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else str(parte).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def _escopo():
+    """Dono da chave: a identidade do JWT (sobrevive à renovação do token) ou anônimo."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identidade = get_jwt_identity()
+    except Exception:
+        # token inválido numa rota sem @jwt_required: trata como anônimo
+        identidade = None
+    return 'anon' if identidade is None else f'user:{identidade}'
+
+
+def idempotente(view):
+    """Torna a rota segura para retry com o header `Idempotency-Key`.
+
+    A primeira requisição com a chave executa normalmente e sua resposta (exceto
+    5xx e streaming) fica gravada; repetições devolvem a resposta gravada com
+    `Idempotent-Replayed: true` sem rodar a transação de novo. Repetições que
+    chegam enquanto a primeira ainda roda esperam por ela. A chave vale por
+    usuário (identidade do JWT, não o token: um token renovado continua valendo)
+    e rota; sem JWT, só pela rota. Reutilizá-la com outro corpo dá 422.
+    Sem o header, a rota se comporta como antes.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        chave_cliente = request.headers.get('Idempotency-Key')
+        if not chave_cliente:
+            return view(*args, **kwargs)
+        if len(chave_cliente) > TAMANHO_MAX_CHAVE:
+            return jsonify({'error': 'Idempotency-Key muito longa', 'code': 'BAD_IDEMPOTENCY_KEY'}), 400
+
+        store = get_idempotency_store()
+        chave = _hash(_escopo(), request.method, request.path, chave_cliente)
+        estado, salva = store.iniciar(chave, _hash(request.get_data()))
+        if estado == PRONTO:
+            status, content_type, corpo = salva
+            resposta = make_response(corpo, status)
+            resposta.headers['Content-Type'] = content_type
+            resposta.headers['Idempotent-Replayed'] = 'true'
+            return resposta
+        if estado == CONFLITO:
+            return jsonify({'error': 'Idempotency-Key já usada com outro corpo', 'code': 'IDEMPOTENCY_MISMATCH'}), 422
+        if estado == EM_ANDAMENTO:
+            resposta = jsonify({'error': 'Requisição com esta Idempotency-Key ainda em processamento',
+                                'code': 'IDEMPOTENCY_IN_PROGRESS'})
+            resposta.headers['Retry-After'] = '1'
+            return resposta, 409
+        assert estado == NOVO
+
+        try:
+            resposta = make_response(view(*args, **kwargs))
+        except Exception:
+            store.abandonar(chave)
+            raise
+        if resposta.status_code >= 500 or resposta.is_streamed:
+            # falha transitória: o retry com a mesma chave executa de novo
+            store.abandonar(chave)
+        else:
+            try:
+                store.concluir(chave, (resposta.status_code, resposta.content_type, resposta.get_data()))
+            except Exception:
+                logger.exception("Falha ao gravar resposta idempotente")
+                store.abandonar(chave)
+        return resposta
+
+    return wrapper
@@ -1,7 +1,13 @@
+import logging
 import os
 import random
+import re
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from src.Infrastructure.http.whatsapp_delivery import get_dispatcher
+from src.Infrastructure.store.verification_code_store import get_code_store
+
+logger = logging.getLogger(__name__)
 
 class WhatsAppService:
     def __init__(self, account_sid, auth_token, from_number):
@@ -21,47 +27,74 @@ class WhatsAppService:
             )
         except TwilioRestException as e:
             # Falha de autenticação ou outro erro da API Twilio
-            # Log simples para debug; caller pode escolher como proceder
-            print(f"Twilio error sending code to {to_number}: {e}")
+            # caller pode escolher como proceder
+            logger.warning("Twilio error sending code to %s: %s", to_number, e)
             return None
 
         return codigo
 
-# Variáveis globais
-ultimo_codigo = None
-FIXED_NUMBER = '+5511979911839'  # Número fixo para todos os envios
-ultimo_codigo = None
+    def enviar_mensagem(self, to_number, body):
+        """Envio assíncrono pela fila compartilhada. Retorna (delivery_id, erro)."""
+        return enviar_mensagem_async(to_number, body)
+
 FIXED_NUMBER = '+5511979911839'  # Número fixo para todos os envios
 
-def gerar_codigo():
-    global ultimo_codigo
-    numero_aleatorio = str(random.randint(1000, 9999))
-    ultimo_codigo = numero_aleatorio
-    # use env vars when available (safer than hardcoding credentials)
-    account_sid = os.environ.get('TWILIO_ACCOUNT_SID') or '[REMOVED_TWILIO_SID]'
-    auth_token = os.environ.get('TWILIO_AUTH_TOKEN') or 'dbd08638f326d3a2721c8c344ff1d26a'
-    from_num = os.environ.get('TWILIO_FROM_NUMBER') or '+13188181686'
-
-    client = Client(account_sid, auth_token)
-    try:
-        message = client.messages.create(
-            from_=from_num,
-            body=f'Seu código de verificação é: {numero_aleatorio}',
-            to=FIXED_NUMBER
-        )
-        print(f"Código gerado: {numero_aleatorio}")  # Debug
-        return numero_aleatorio  # Retorna o código em vez do SID
-    except TwilioRestException as e:
-        print(f"Twilio error in gerar_codigo: {e}")
+
+def novo_codigo():
+    """Gera um código de 4 dígitos."""
+    return str(random.randint(1000, 9999))
+
+
+def enviar_codigo_async(codigo, to_number=FIXED_NUMBER):
+    """Enfileira o envio do código (não bloqueia). Retorna (delivery_id, erro)."""
+    return get_dispatcher().enqueue(to_number, f'Seu código de verificação é: {codigo}')
+
+
+def enviar_mensagem_async(to_number, body):
+    """Enfileira uma mensagem qualquer (ex.: resumo de estoque baixo). Retorna (delivery_id, erro)."""
+    return get_dispatcher().enqueue(to_number, body)
+
+
+def normalizar_numero(numero, ddi=None):
+    """Número em E.164 (+<ddi><número>) ou None se não der para interpretar.
+
+    Aceita números já com `+` e números nacionais como os de users.celular
+    ('11979911839'), que recebem o DDI padrão (WHATSAPP_DEFAULT_COUNTRY_CODE, 55).
+    """
+    if not numero:
+        return None
+    ddi = ddi or os.environ.get('WHATSAPP_DEFAULT_COUNTRY_CODE', '55')
+    numero = str(numero).strip()
+    if numero.startswith('whatsapp:'):
+        numero = numero[len('whatsapp:'):]
+    digitos = re.sub(r'\D', '', numero)
+    if numero.startswith('+') or numero.startswith('00'):
+        digitos = digitos[2:] if numero.startswith('00') else digitos
+    elif not (digitos.startswith(ddi) and len(digitos) > 11):
+        digitos = ddi + digitos.lstrip('0')
+    if not 8 <= len(digitos) <= 15:
         return None
+    return f'+{digitos}'
+
+
+def status_envio(delivery_id):
+    return get_dispatcher().status(delivery_id)
+
+
+def gerar_codigo(destinatario):
+    """Gera um código, registra no store de verificação para `destinatario` e enfileira o envio.
+
+    Retorna o código (ou None se a fila recusou o envio).
+    """
+    numero_aleatorio = novo_codigo()
+    get_code_store().emitir(destinatario, numero_aleatorio)
+    delivery_id, erro = enviar_codigo_async(numero_aleatorio)
+    if erro:
+        logger.warning("Envio do código recusado: %s", erro)
+        return None
+    return numero_aleatorio
+
 
-def verificar_codigo(codigo_digitado):
-    global ultimo_codigo
-    if not ultimo_codigo:
-        return False, "Nenhum código foi gerado ainda"
-    
-    if str(codigo_digitado) == str(ultimo_codigo):
-        ultimo_codigo = None  # limpa o código após uso
-        return True, "Código verificado com sucesso"
-    
-    return False, "Código inválido"
+def verificar_codigo(destinatario, codigo_digitado):
+    """Confere o código pendente de `destinatario` (email ou telefone). Retorna (ok, mensagem)."""
+    return get_code_store().verificar(destinatario, codigo_digitado)
@@ -0,0 +1,244 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class FakeTransport:
+    """Transporte local para testes de carga: não usa rede.
+
+    WHATSAPP_FAKE_LATENCY (segundos) simula o tempo da API e
+    WHATSAPP_FAKE_FAILURE_RATE (0..1) a fração de envios que falham.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, from_number, to_number, body):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError("falha simulada no FakeTransport")
+        sid = f"FAKE{uuid.uuid4().hex[:30]}"
+        with self._lock:
+            self.sent.append({"sid": sid, "from": from_number, "to": to_number, "body": body})
+            del self.sent[:-1000]
+        return sid
+
+
+class TwilioTransport:
+    """Cliente Twilio de longa duração (uma sessão HTTP com keep-alive e timeout)."""
+
+    def __init__(self, account_sid, auth_token, timeout=5):
+        from twilio.rest import Client
+        from twilio.http.http_client import TwilioHttpClient
+        http_client = TwilioHttpClient(pool_connections=True, timeout=timeout)
+        self.client = Client(account_sid, auth_token, http_client=http_client)
+
+    def send(self, from_number, to_number, body):
+        message = self.client.messages.create(from_=from_number, body=body, to=to_number)
+        return message.sid
+
+
+def _erro_definitivo(exc):
+    """Erros 4xx da Twilio (exceto 429) não melhoram com retry."""
+    status = getattr(exc, "status", None)
+    return isinstance(status, int) and 400 <= status < 500 and status != 429
+
+
+class CircuitBreaker:
+    """Abre após `threshold` falhas seguidas; depois de `cooldown` segundos volta a
+    deixar envios passarem (half-open) e o primeiro sucesso fecha de novo."""
+
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        return self.state != "open"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class DeliveryQueue:
+    """Fila limitada de envios de WhatsApp processada por threads em background.
+
+    Cada envio tem retries com backoff exponencial (com jitter), passa pelo
+    circuit breaker e tem seu status registrado: queued -> sending -> sent | failed.
+    """
+
+    def __init__(self, transport, from_number, workers=2, max_queue=500, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, max_status=5000):
+        self.transport = transport
+        self.from_number = from_number
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.max_status = max_status
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._status = OrderedDict()
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"whatsapp-{i}", daemon=True).start()
+
+    def _set_status(self, delivery_id, **campos):
+        with self._lock:
+            info = self._status.setdefault(delivery_id, {"id": delivery_id})
+            info.update(campos)
+            self._status.move_to_end(delivery_id)
+            while len(self._status) > self.max_status:
+                self._status.popitem(last=False)
+
+    def status(self, delivery_id):
+        with self._lock:
+            info = self._status.get(delivery_id)
+            return dict(info) if info else None
+
+    def enqueue(self, to_number, body):
+        """Enfileira o envio. Retorna (delivery_id, None) ou (None, motivo) se rejeitado."""
+        if not self.breaker.allow():
+            return None, "circuit_open"
+        delivery_id = uuid.uuid4().hex
+        self._set_status(delivery_id, status="queued", attempts=0, error=None, sid=None)
+        try:
+            self._queue.put_nowait((delivery_id, to_number, body))
+        except queue.Full:
+            self._set_status(delivery_id, status="failed", error="queue_full")
+            return None, "queue_full"
+        return delivery_id, None
+
+    def _worker(self):
+        while True:
+            delivery_id, to_number, body = self._queue.get()
+            try:
+                self._entregar(delivery_id, to_number, body)
+            finally:
+                self._queue.task_done()
+
+    def _entregar(self, delivery_id, to_number, body):
+        tentativa = 0
+        while True:
+            tentativa += 1
+            if not self.breaker.allow():
+                self._set_status(delivery_id, status="failed", attempts=tentativa - 1, error="circuit_open")
+                return
+            self._set_status(delivery_id, status="sending", attempts=tentativa)
+            try:
+                sid = self.transport.send(self.from_number, to_number, body)
+            except Exception as e:
+                if _erro_definitivo(e):
+                    # número inválido etc.: a API está de pé, não conta para o breaker
+                    self._set_status(delivery_id, status="failed", error=str(e))
+                    logger.warning("Envio WhatsApp recusado pela API: %s", e, extra={"delivery_id": delivery_id})
+                    return
+                self.breaker.record_failure()
+                if tentativa > self.max_retries:
+                    self._set_status(delivery_id, status="failed", error=str(e))
+                    logger.error("Falha definitiva no envio WhatsApp: %s", e,
+                                 extra={"delivery_id": delivery_id, "attempts": tentativa})
+                    return
+                espera = min(self.backoff_max, self.backoff_base * (2 ** (tentativa - 1)))
+                time.sleep(espera * random.uniform(0.5, 1.0))
+                continue
+            self.breaker.record_success()
+            self._set_status(delivery_id, status="sent", sid=sid, error=None)
+            return
+
+    def stats(self):
+        with self._lock:
+            contagem = {}
+            for info in self._status.values():
+                contagem[info["status"]] = contagem.get(info["status"], 0) + 1
+        return {"queue_size": self._queue.qsize(), "breaker": self.breaker.state, "status": contagem}
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def credenciais_twilio():
+    """(account_sid, auth_token, from_number) do ambiente; None se faltar alguma."""
+    credenciais = tuple(os.environ.get(nome) for nome in
+                        ('TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TWILIO_FROM_NUMBER'))
+    return credenciais if all(credenciais) else None
+
+
+def usar_transporte_fake():
+    """WHATSAPP_TRANSPORT='fake', ou credenciais da Twilio ausentes (aí com aviso: nada é enviado)."""
+    if os.environ.get("WHATSAPP_TRANSPORT", "twilio").lower() == "fake":
+        return True
+    if credenciais_twilio() is None:
+        logger.warning("TWILIO_ACCOUNT_SID/TWILIO_AUTH_TOKEN/TWILIO_FROM_NUMBER não definidos: "
+                       "usando o transporte fake, nenhuma mensagem será enviada")
+        return True
+    return False
+
+
+def criar_transporte():
+    """WHATSAPP_TRANSPORT='twilio' (padrão) ou 'fake'."""
+    if usar_transporte_fake():
+        return FakeTransport(
+            latency=float(os.environ.get("WHATSAPP_FAKE_LATENCY", 0)),
+            failure_rate=float(os.environ.get("WHATSAPP_FAKE_FAILURE_RATE", 0)),
+        )
+    account_sid, auth_token, _ = credenciais_twilio()
+    return TwilioTransport(account_sid, auth_token, timeout=float(os.environ.get("WHATSAPP_TIMEOUT", 5)))
+
+
+def get_dispatcher():
+    """Fila de envio única por processo (criada na primeira chamada).
+
+    WHATSAPP_DISPATCHER='threads' (padrão: WHATSAPP_WORKERS threads, uma chamada
+    em andamento por thread) ou 'asyncio' (um event loop com httpx; até
+    WHATSAPP_MAX_IN_FLIGHT chamadas simultâneas, ver async_delivery).
+    """
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None and os.environ.get("WHATSAPP_DISPATCHER", "threads").lower() == "asyncio":
+                from src.Infrastructure.http.async_delivery import criar_dispatcher_async
+                _dispatcher = criar_dispatcher_async()
+            if _dispatcher is None:
+                _dispatcher = DeliveryQueue(
+                    criar_transporte(),
+                    from_number=os.environ.get('TWILIO_FROM_NUMBER', ''),
+                    workers=int(os.environ.get("WHATSAPP_WORKERS", 2)),
+                    max_queue=int(os.environ.get("WHATSAPP_QUEUE_SIZE", 500)),
+                    max_retries=int(os.environ.get("WHATSAPP_MAX_RETRIES", 3)),
+                    breaker=CircuitBreaker(
+                        threshold=int(os.environ.get("WHATSAPP_BREAKER_THRESHOLD", 5)),
+                        cooldown=float(os.environ.get("WHATSAPP_BREAKER_COOLDOWN", 30)),
+                    ),
+                )
+    return _dispatcher
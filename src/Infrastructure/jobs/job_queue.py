@@ -0,0 +1,95 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LocalJobQueue:
+    """Fila de jobs em processo (ThreadPoolExecutor).
+
+    Cada job roda dentro de um app_context da aplicação Flask que o enfileirou.
+    O registro de status é limitado a `max_jobs` entradas (os mais antigos saem primeiro).
+    """
+
+    def __init__(self, workers=2, max_jobs=1000):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jobs')
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _registrar(self, job_id, **campos):
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {'id': job_id})
+            job.update(campos)
+            self._jobs.move_to_end(job_id)
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            return dict(job)
+
+    def enqueue(self, app, fn, *args, **kwargs):
+        job_id = uuid.uuid4().hex
+        self._registrar(job_id, status='pending', result=None, error=None)
+
+        def _run():
+            self._registrar(job_id, status='running')
+            try:
+                with app.app_context():
+                    result = fn(*args, **kwargs)
+                self._registrar(job_id, status='done', result=result)
+            except Exception as e:
+                self._registrar(job_id, status='failed', error=str(e))
+
+        self._registrar(job_id, future=self.executor.submit(_run))
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        job = self.get(job_id)
+        if job and job.get('future') is not None:
+            try:
+                job['future'].result(timeout=timeout)
+            except Exception:
+                pass
+        return self.get(job_id)
+
+
+class SyncJobQueue(LocalJobQueue):
+    """Executa o job na hora (útil em testes e em ambientes serverless sem threads)."""
+
+    def __init__(self, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def enqueue(self, app, fn, *args, **kwargs):
+        job_id = uuid.uuid4().hex
+        try:
+            with app.app_context():
+                result = fn(*args, **kwargs)
+            self._registrar(job_id, status='done', result=result, error=None)
+        except Exception as e:
+            self._registrar(job_id, status='failed', result=None, error=str(e))
+        return job_id
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Retorna a fila configurada por JOB_QUEUE_BACKEND ('local' por padrão, ou 'sync')."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                backend = os.environ.get('JOB_QUEUE_BACKEND', 'local').lower()
+                if backend == 'sync':
+                    _queue = SyncJobQueue()
+                else:
+                    _queue = LocalJobQueue(workers=int(os.environ.get('JOB_QUEUE_WORKERS', 2)))
+    return _queue
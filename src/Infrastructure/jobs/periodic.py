@@ -0,0 +1,58 @@
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TarefaPeriodica:
+    """Executa `fn()` a cada `intervalo` segundos numa thread daemon, dentro do app_context."""
+
+    def __init__(self, app, nome, fn, intervalo):
+        self.app = app
+        self.nome = nome
+        self.fn = fn
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._loop, name=f"periodic-{self.nome}", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                with self.app.app_context():
+                    self.fn()
+            except Exception:
+                # falha numa rodada não derruba a thread; a próxima tenta de novo
+                logger.exception("Falha na tarefa periódica %s", self.nome)
+
+
+def init_periodic(app, tarefas):
+    """Agenda as tarefas [(nome, fn, intervalo)] para começar na primeira requisição.
+
+    Iniciar na primeira requisição (e não no create_app) evita threads em comandos
+    da CLI, como `flask migrate`. Intervalo <= 0 desliga a tarefa; PERIODIC_TASKS=0
+    desliga todas (ex.: serverless, onde a varredura roda pela CLI/cron).
+    """
+    if os.environ.get('PERIODIC_TASKS', '1') == '0':
+        return app
+    pendentes = [TarefaPeriodica(app, nome, fn, intervalo) for nome, fn, intervalo in tarefas if intervalo > 0]
+    lock = threading.Lock()
+
+    @app.before_request
+    def iniciar_tarefas_periodicas():
+        if not pendentes:
+            return
+        with lock:
+            while pendentes:
+                tarefa = pendentes.pop()
+                tarefa.iniciar()
+                logger.info("Tarefa periódica %s iniciada (a cada %ss)", tarefa.nome, tarefa.intervalo)
+
+    return app
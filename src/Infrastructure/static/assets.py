@@ -0,0 +1,118 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from flask import request, send_from_directory
+
+PASTA_DIST = 'dist'
+EXTENSOES_FINGERPRINT = ('.css', '.js')
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# uploads nomeados pelo hash do conteúdo (ver storage/image_store.py) nunca mudam
+_UPLOAD_IMUTAVEL = re.compile(r'^uploads/[0-9a-f]{64}(_[a-z]+)?\.[a-z0-9]+$')
+
+
+def _comprimir(caminho, conteudo):
+    with open(f'{caminho}.gz', 'wb') as f:
+        f.write(gzip.compress(conteudo, compresslevel=9, mtime=0))
+    try:
+        import brotli  # dependência opcional
+    except ImportError:
+        return
+    with open(f'{caminho}.br', 'wb') as f:
+        f.write(brotli.compress(conteudo, quality=11))
+
+
+def build_assets(static_folder):
+    """Gera static/dist: CSS/JS com hash no nome, HTML reescrito e variantes .gz/.br.
+
+    Retorna o manifesto ({'assets': {original: fingerprint}, 'pages': [...]}),
+    também gravado em dist/manifest.json.
+    """
+    dist = os.path.join(static_folder, PASTA_DIST)
+    os.makedirs(dist, exist_ok=True)
+    manifesto = {'assets': {}, 'pages': []}
+
+    for nome in sorted(os.listdir(static_folder)):
+        origem = os.path.join(static_folder, nome)
+        base, ext = os.path.splitext(nome)
+        if not os.path.isfile(origem) or ext not in EXTENSOES_FINGERPRINT:
+            continue
+        with open(origem, 'rb') as f:
+            conteudo = f.read()
+        fingerprint = f'{base}.{hashlib.sha256(conteudo).hexdigest()[:10]}{ext}'
+        destino = os.path.join(dist, fingerprint)
+        if not os.path.exists(destino):
+            with open(destino, 'wb') as f:
+                f.write(conteudo)
+            _comprimir(destino, conteudo)
+        manifesto['assets'][nome] = fingerprint
+
+    for nome in sorted(os.listdir(static_folder)):
+        origem = os.path.join(static_folder, nome)
+        if not os.path.isfile(origem) or not nome.endswith('.html'):
+            continue
+        with open(origem, 'r', encoding='utf-8') as f:
+            html = f.read()
+        for original, fingerprint in manifesto['assets'].items():
+            html = html.replace(f'/static/{original}', f'/static/{PASTA_DIST}/{fingerprint}')
+        conteudo = html.encode('utf-8')
+        destino = os.path.join(dist, nome)
+        with open(destino, 'wb') as f:
+            f.write(conteudo)
+        _comprimir(destino, conteudo)
+        manifesto['pages'].append(nome)
+
+    with open(os.path.join(dist, 'manifest.json'), 'w') as f:
+        json.dump(manifesto, f, indent=2)
+    return manifesto
+
+
+def init_assets(app):
+    """Troca o handler de /static para servir a saída do build (se existir).
+
+    - dist/<nome>.<hash>.<ext> e uploads com hash: Cache-Control immutable;
+    - páginas HTML: versão reescrita de dist/, sempre revalidada (ETag);
+    - .br/.gz escolhidos pelo Accept-Encoding (Vary: Accept-Encoding).
+    Sem `flask build-assets` o comportamento é o do handler padrão do Flask.
+    """
+    static_folder = app.static_folder
+    dist = os.path.join(static_folder, PASTA_DIST)
+    manifesto = {'assets': {}, 'pages': []}
+    try:
+        with open(os.path.join(dist, 'manifest.json')) as f:
+            manifesto = json.load(f)
+    except (OSError, ValueError):
+        pass
+    paginas = set(manifesto.get('pages', []))
+    fingerprints = set(manifesto.get('assets', {}).values())
+
+    def _enviar(pasta, nome, cache_control):
+        mimetype = None
+        codificacao = None
+        aceitas = request.accept_encodings
+        for enc, sufixo in (('br', '.br'), ('gzip', '.gz')):
+            if aceitas[enc] and os.path.isfile(os.path.join(pasta, nome + sufixo)):
+                mimetype = mimetypes.guess_type(nome)[0] or 'application/octet-stream'
+                codificacao, nome = enc, nome + sufixo
+                break
+        resposta = send_from_directory(pasta, nome, mimetype=mimetype)
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        resposta.headers['Vary'] = 'Accept-Encoding'
+        resposta.headers['Cache-Control'] = cache_control
+        return resposta
+
+    def servir_static(filename):
+        if filename.startswith(f'{PASTA_DIST}/') and filename[len(PASTA_DIST) + 1:] in fingerprints:
+            return _enviar(dist, filename[len(PASTA_DIST) + 1:], CACHE_IMUTAVEL)
+        if filename in paginas:
+            return _enviar(dist, filename, 'no-cache')
+        resposta = app.send_static_file(filename)
+        if _UPLOAD_IMUTAVEL.match(filename):
+            resposta.headers['Cache-Control'] = CACHE_IMUTAVEL
+        return resposta
+
+    app.view_functions['static'] = servir_static
+    return app
@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import os
+import re
+import uuid
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES_PERMITIDAS = {'.png', '.jpg', '.jpeg', '.webp', '.gif'}
+# nome -> maior lado em pixels
+VARIANTES = {'thumb': 200, 'medium': 600}
+TAMANHO_BLOCO = 64 * 1024
+URL_UPLOADS = '/static/uploads/'
+
+# /static/uploads/<sha256>.<ext>: só arquivos enviados por este pipeline têm variantes
+_NOME_CONTEUDO = re.compile(r'^/static/uploads/([0-9a-f]{64})\.[a-z0-9]+$')
+
+
+def _pasta_uploads():
+    pasta = os.path.join(current_app.static_folder, 'uploads')
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def salvar_imagem(arquivo, max_bytes=None):
+    """Grava o upload (FileStorage) em blocos, nomeado pelo SHA-256 do conteúdo.
+
+    Uploads repetidos apontam para o mesmo arquivo. Levanta ValueError se a
+    extensão não for de imagem ou se passar de UPLOAD_MAX_BYTES (5 MB por padrão).
+    Retorna a URL do original; as variantes (thumb/medium) são agendadas por quem
+    grava o produto, depois do commit (ver ProdutoService.agendar_variantes).
+    """
+    max_bytes = max_bytes or int(os.environ.get('UPLOAD_MAX_BYTES', 5 * 1024 * 1024))
+    _, ext = os.path.splitext(secure_filename(arquivo.filename or ''))
+    ext = ext.lower()
+    if ext not in EXTENSOES_PERMITIDAS:
+        raise ValueError(f"Extensão de imagem não suportada: {ext or '(nenhuma)'}")
+
+    pasta = _pasta_uploads()
+    tmp_path = os.path.join(pasta, f'.upload-{uuid.uuid4().hex}.tmp')
+    digest = hashlib.sha256()
+    total = 0
+    try:
+        with open(tmp_path, 'wb') as destino:
+            while True:
+                bloco = arquivo.stream.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                total += len(bloco)
+                if total > max_bytes:
+                    raise ValueError(f"Imagem maior que o limite de {max_bytes // 1024} KB")
+                digest.update(bloco)
+                destino.write(bloco)
+
+        nome = f'{digest.hexdigest()}{ext}'
+        final_path = os.path.join(pasta, nome)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)  # mesmo conteúdo já armazenado
+        else:
+            os.replace(tmp_path, final_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return f'{URL_UPLOADS}{nome}'
+
+
+def caminho_original(imagem):
+    """Caminho local de um upload deste pipeline (nome pelo hash); None para URLs externas/antigas."""
+    if not imagem or not _NOME_CONTEUDO.match(imagem):
+        return None
+    return os.path.join(_pasta_uploads(), imagem[len(URL_UPLOADS):])
+
+
+def variantes_prontas(imagem):
+    """True se todas as variantes de `imagem` já existem em disco (usado só ao gravar o produto)."""
+    original = caminho_original(imagem)
+    return bool(original) and all(os.path.exists(_caminho_variante(original, v)) for v in VARIANTES)
+
+
+def _caminho_variante(original_path, variante):
+    base, _ = os.path.splitext(original_path)
+    return f'{base}_{variante}.webp'
+
+
+def gerar_variantes(original_path):
+    """Gera thumb e medium em WebP ao lado do original (roda na fila de jobs; requer Pillow)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.warning("Pillow não instalado: variantes de imagem não geradas")
+        return None
+
+    gerados = []
+    with Image.open(original_path) as img:
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if img.mode in ('P', 'LA', 'PA') else 'RGB')
+        for variante, lado in VARIANTES.items():
+            destino = _caminho_variante(original_path, variante)
+            if os.path.exists(destino):
+                continue
+            copia = img.copy()
+            copia.thumbnail((lado, lado))
+            tmp = f'{destino}.{uuid.uuid4().hex}.tmp'
+            copia.save(tmp, format='WEBP', quality=80)
+            os.replace(tmp, destino)
+            gerados.append(destino)
+    return gerados
+
+
+def url_variante(imagem, variante, prontas):
+    """URL da variante (`thumb`/`medium`) se o produto já tem variantes (`prontas`); senão a própria `imagem`.
+
+    Não consulta o disco: `prontas` é a coluna produtos.imagem_variantes, marcada
+    quando o job de variantes termina. URLs externas e uploads antigos (nome com
+    UUID) não têm variantes e voltam como estão.
+    """
+    if not prontas or not imagem or variante not in VARIANTES:
+        return imagem
+    match = _NOME_CONTEUDO.match(imagem)
+    if not match:
+        return imagem
+    return f'{URL_UPLOADS}{match.group(1)}_{variante}.webp'
@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# resultados de iniciar()
+NOVO = 'novo'                  # quem chamou executa a requisição e depois chama concluir/abandonar
+PRONTO = 'pronto'              # já existe resposta gravada: devolver sem executar
+CONFLITO = 'conflito'          # mesma chave com outro corpo
+EM_ANDAMENTO = 'em_andamento'  # a primeira requisição não terminou dentro da espera
+
+
+class MemoryIdempotencyStore:
+    """Respostas por chave em memória do processo (um único worker).
+
+    Limitado a `max_entries` (saem as mais antigas) e com TTL. Repetições
+    concorrentes esperam num Event a primeira requisição terminar.
+    """
+
+    def __init__(self, ttl=86400, max_entries=10000, espera=30.0, lease=60.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.espera = espera
+        self.lease = lease
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def iniciar(self, chave, fingerprint):
+        """Retorna (estado, resposta); resposta = (status, content_type, corpo) quando PRONTO."""
+        limite = time.monotonic() + self.espera
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                item = self._data.get(chave)
+                if item and (item['expira'] < agora or
+                             (item['status'] == 'processing' and item['inicio'] + self.lease < agora)):
+                    # vencida, ou a requisição original morreu sem concluir
+                    del self._data[chave]
+                    item = None
+                if item is None:
+                    self._data[chave] = {'status': 'processing', 'fingerprint': fingerprint, 'resposta': None,
+                                         'inicio': agora, 'expira': agora + self.ttl, 'pronto': threading.Event()}
+                    self._limitar()
+                    return NOVO, None
+                if item['fingerprint'] != fingerprint:
+                    return CONFLITO, None
+                if item['status'] == 'done':
+                    return PRONTO, item['resposta']
+                evento = item['pronto']
+            restante = limite - time.monotonic()
+            if restante <= 0 or not evento.wait(restante):
+                return EM_ANDAMENTO, None
+
+    def concluir(self, chave, resposta):
+        with self._lock:
+            item = self._data.get(chave)
+            if item:
+                item.update(status='done', resposta=resposta)
+                item['pronto'].set()
+
+    def abandonar(self, chave):
+        """Descarta a chave (erro/5xx): a próxima tentativa executa de novo."""
+        with self._lock:
+            item = self._data.pop(chave, None)
+        if item:
+            item['pronto'].set()
+
+    def _limitar(self):
+        if len(self._data) <= self.max_entries:
+            return
+        agora = time.monotonic()
+        for chave in [k for k, v in self._data.items() if v['expira'] < agora]:
+            del self._data[chave]
+        while len(self._data) > self.max_entries:
+            _, item = self._data.popitem(last=False)
+            item['pronto'].set()
+
+    def limpar_expirados(self):
+        with self._lock:
+            agora = time.monotonic()
+            vencidas = [k for k, v in self._data.items() if v['expira'] < agora]
+            for chave in vencidas:
+                del self._data[chave]
+            return len(vencidas)
+
+
+class DatabaseIdempotencyStore:
+    """Respostas na tabela idempotency_keys: vale para vários workers/instâncias.
+
+    A PK da chave decide quem executa (INSERT ganha); as repetições consultam a
+    linha em intervalos curtos até ela virar 'done'. Usa conexões próprias do
+    engine para não misturar com a transação da requisição.
+    """
+
+    def __init__(self, ttl=86400, espera=30.0, lease=60.0, intervalo=0.05, limpeza_a_cada=100):
+        self.ttl = ttl
+        self.espera = espera
+        self.lease = lease
+        self.intervalo = intervalo
+        self.limpeza_a_cada = limpeza_a_cada
+        self._escritas = 0
+
+    def iniciar(self, chave, fingerprint):
+        from sqlalchemy import select
+        from sqlalchemy.exc import IntegrityError
+        from src.config.data_base import db
+        from src.Infrastructure.Model.idempotency_key import IdempotencyKey
+        tabela = IdempotencyKey.__table__
+
+        limite = time.monotonic() + self.espera
+        while True:
+            agora = datetime.utcnow()
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(tabela.insert().values(
+                        chave=chave, fingerprint=fingerprint, status='processing',
+                        created_at=agora, expires_at=agora + timedelta(seconds=self.ttl)))
+                self._contar_escrita()
+                return NOVO, None
+            except IntegrityError:
+                pass
+
+            with db.engine.begin() as conn:
+                linha = conn.execute(select(tabela).where(tabela.c.chave == chave)).first()
+                if linha is None:
+                    continue
+                parada = linha.status == 'processing' and linha.created_at + timedelta(seconds=self.lease) < agora
+                if linha.expires_at < agora or parada:
+                    # assume a chave só se ninguém mexeu nela desde a leitura
+                    tomada = conn.execute(
+                        tabela.update()
+                        .where(tabela.c.chave == chave, tabela.c.created_at == linha.created_at)
+                        .values(fingerprint=fingerprint, status='processing', response_status=None,
+                                response_content_type=None, response_body=None, created_at=agora,
+                                expires_at=agora + timedelta(seconds=self.ttl))
+                    ).rowcount
+                    if tomada:
+                        return NOVO, None
+                    continue
+            if linha.fingerprint != fingerprint:
+                return CONFLITO, None
+            if linha.status == 'done':
+                return PRONTO, (linha.response_status, linha.response_content_type, linha.response_body)
+            if time.monotonic() >= limite:
+                return EM_ANDAMENTO, None
+            time.sleep(self.intervalo)
+
+    def concluir(self, chave, resposta):
+        from src.config.data_base import db
+        from src.Infrastructure.Model.idempotency_key import IdempotencyKey
+        tabela = IdempotencyKey.__table__
+        status, content_type, corpo = resposta
+        with db.engine.begin() as conn:
+            conn.execute(tabela.update().where(tabela.c.chave == chave).values(
+                status='done', response_status=status, response_content_type=content_type, response_body=corpo))
+
+    def abandonar(self, chave):
+        from src.config.data_base import db
+        from src.Infrastructure.Model.idempotency_key import IdempotencyKey
+        tabela = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            conn.execute(tabela.delete().where(tabela.c.chave == chave, tabela.c.status == 'processing'))
+
+    def _contar_escrita(self):
+        self._escritas += 1
+        if self._escritas % self.limpeza_a_cada == 0:
+            self.limpar_expirados()
+
+    def limpar_expirados(self):
+        from src.config.data_base import db
+        from src.Infrastructure.Model.idempotency_key import IdempotencyKey
+        tabela = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            return conn.execute(tabela.delete().where(tabela.c.expires_at < datetime.utcnow())).rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store():
+    """IDEMPOTENCY_STORE='memory' (padrão, um worker) ou 'database' (vários workers/instâncias).
+
+    IDEMPOTENCY_TTL (segundos, padrão 24h) define por quanto tempo a resposta é
+    reaproveitada, IDEMPOTENCY_MAX_ENTRIES o limite em memória e IDEMPOTENCY_WAIT
+    quanto uma repetição espera a primeira requisição terminar.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                ttl = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+                espera = float(os.environ.get('IDEMPOTENCY_WAIT', 30))
+                if os.environ.get('IDEMPOTENCY_STORE', 'memory').lower() == 'database':
+                    _store = DatabaseIdempotencyStore(ttl=ttl, espera=espera)
+                else:
+                    _store = MemoryIdempotencyStore(
+                        ttl=ttl, espera=espera, max_entries=int(os.environ.get('IDEMPOTENCY_MAX_ENTRIES', 10000)))
+    return _store
@@ -0,0 +1,188 @@
+import hmac
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+CODIGO_VERIFICADO = "Código verificado com sucesso"
+SEM_CODIGO = "Nenhum código pendente. Solicite um novo código."
+CODIGO_EXPIRADO = "Código expirado. Solicite um novo código."
+CODIGO_INCORRETO = "Código incorreto"
+TENTATIVAS_EXCEDIDAS = "Número máximo de tentativas excedido. Solicite um novo código."
+
+
+def normalizar_chave(destinatario):
+    """Emails em minúsculo e sem espaços; telefones só com dígitos (e '+')."""
+    valor = str(destinatario or '').strip().lower()
+    if '@' in valor:
+        return valor
+    return ''.join(c for c in valor if c.isdigit() or c == '+')
+
+
+def _codigo_confere(esperado, digitado):
+    return hmac.compare_digest(str(esperado), str(digitado).strip())
+
+
+class MemoryCodeStore:
+    """Códigos em memória do processo (um único worker). Expirados saem na leitura e a cada N escritas."""
+
+    def __init__(self, ttl=600, max_tentativas=5, max_entries=10000, limpeza_a_cada=100):
+        self.ttl = ttl
+        self.max_tentativas = max_tentativas
+        self.max_entries = max_entries
+        self.limpeza_a_cada = limpeza_a_cada
+        self._data = {}
+        self._escritas = 0
+        self._lock = threading.Lock()
+
+    def emitir(self, destinatario, codigo):
+        chave = normalizar_chave(destinatario)
+        with self._lock:
+            self._data[chave] = {'codigo': str(codigo), 'tentativas': 0, 'expira': time.monotonic() + self.ttl}
+            self._escritas += 1
+            if self._escritas % self.limpeza_a_cada == 0 or len(self._data) > self.max_entries:
+                self._limpar()
+            while len(self._data) > self.max_entries:
+                # ainda cheio sem expirados: descarta o mais antigo
+                del self._data[min(self._data, key=lambda k: self._data[k]['expira'])]
+
+    def verificar(self, destinatario, codigo_digitado):
+        """Retorna (ok, mensagem). O código é consumido no sucesso ou ao estourar as tentativas."""
+        chave = normalizar_chave(destinatario)
+        with self._lock:
+            item = self._data.get(chave)
+            if not item:
+                return False, SEM_CODIGO
+            if item['expira'] < time.monotonic():
+                del self._data[chave]
+                return False, CODIGO_EXPIRADO
+            if _codigo_confere(item['codigo'], codigo_digitado):
+                del self._data[chave]
+                return True, CODIGO_VERIFICADO
+            item['tentativas'] += 1
+            if item['tentativas'] >= self.max_tentativas:
+                del self._data[chave]
+                return False, TENTATIVAS_EXCEDIDAS
+            return False, CODIGO_INCORRETO
+
+    def _limpar(self):
+        agora = time.monotonic()
+        for chave in [k for k, v in self._data.items() if v['expira'] < agora]:
+            del self._data[chave]
+
+    def limpar_expirados(self):
+        with self._lock:
+            antes = len(self._data)
+            self._limpar()
+            return antes - len(self._data)
+
+
+class DatabaseCodeStore:
+    """Códigos na tabela verification_codes: compartilhado entre workers/instâncias.
+
+    A verificação trava a linha (SELECT ... FOR UPDATE) para que tentativas
+    concorrentes contem certo. Expirados são apagados por índice em expires_at
+    a cada `limpeza_a_cada` emissões.
+    """
+
+    def __init__(self, ttl=600, max_tentativas=5, limpeza_a_cada=100):
+        self.ttl = ttl
+        self.max_tentativas = max_tentativas
+        self.limpeza_a_cada = limpeza_a_cada
+        self._escritas = 0
+
+    def emitir(self, destinatario, codigo):
+        """Grava o código (substitui o pendente): UPDATE pela chave; se não há linha, INSERT.
+
+        O INSERT fica num savepoint: se outra emissão para o mesmo destinatário
+        criou a linha no meio tempo, cai para o UPDATE e o último código vale.
+        """
+        from sqlalchemy.exc import IntegrityError
+        from src.config.data_base import db
+        from src.Infrastructure.Model.verification_code import VerificationCode
+        chave = normalizar_chave(destinatario)
+        agora = datetime.utcnow()
+        tabela = VerificationCode.__table__
+        valores = dict(codigo=str(codigo), tentativas=0, created_at=agora,
+                       expires_at=agora + timedelta(seconds=self.ttl))
+        try:
+            atualizar = tabela.update().where(tabela.c.chave == chave).values(**valores)
+            if not db.session.execute(atualizar).rowcount:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(tabela.insert().values(chave=chave, **valores))
+                except IntegrityError:
+                    db.session.execute(atualizar)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self._escritas += 1
+        if self._escritas % self.limpeza_a_cada == 0:
+            self.limpar_expirados()
+
+    def verificar(self, destinatario, codigo_digitado):
+        from src.config.data_base import db
+        from src.Infrastructure.Model.verification_code import VerificationCode
+        chave = normalizar_chave(destinatario)
+        try:
+            registro = db.session.query(VerificationCode).filter_by(chave=chave).with_for_update().first()
+            if not registro:
+                db.session.rollback()
+                return False, SEM_CODIGO
+            if registro.expires_at < datetime.utcnow():
+                db.session.delete(registro)
+                db.session.commit()
+                return False, CODIGO_EXPIRADO
+            if _codigo_confere(registro.codigo, codigo_digitado):
+                db.session.delete(registro)
+                db.session.commit()
+                return True, CODIGO_VERIFICADO
+            registro.tentativas += 1
+            if registro.tentativas >= self.max_tentativas:
+                db.session.delete(registro)
+                db.session.commit()
+                return False, TENTATIVAS_EXCEDIDAS
+            db.session.commit()
+            return False, CODIGO_INCORRETO
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def limpar_expirados(self):
+        from src.config.data_base import db
+        from src.Infrastructure.Model.verification_code import VerificationCode
+        try:
+            apagados = (
+                db.session.query(VerificationCode)
+                .filter(VerificationCode.expires_at < datetime.utcnow())
+                .delete(synchronize_session=False)
+            )
+            db.session.commit()
+            return apagados
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_code_store():
+    """VERIFICATION_STORE='database' (padrão, vale para vários workers) ou 'memory'.
+
+    VERIFICATION_CODE_TTL (segundos) e VERIFICATION_MAX_ATTEMPTS ajustam expiração e tentativas.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                ttl = int(os.environ.get('VERIFICATION_CODE_TTL', 600))
+                max_tentativas = int(os.environ.get('VERIFICATION_MAX_ATTEMPTS', 5))
+                if os.environ.get('VERIFICATION_STORE', 'database').lower() == 'memory':
+                    _store = MemoryCodeStore(ttl=ttl, max_tentativas=max_tentativas)
+                else:
+                    _store = DatabaseCodeStore(ttl=ttl, max_tentativas=max_tentativas)
+    return _store
@@ -0,0 +1,77 @@
+import click
+
+
+def init_commands(app):
+    @app.cli.command("rebuild-stats")
+    def rebuild_stats():
+        """Recalcula as tabelas de agregados de vendas (sales_totals, product_sales, ...)."""
+        from src.Application.Service.stats_service import StatsService
+        StatsService.reconstruir()
+        click.echo("Agregados de vendas reconstruídos.")
+
+    @app.cli.command("purge-verification-codes")
+    def purge_verification_codes():
+        """Apaga os códigos de verificação expirados."""
+        from src.Infrastructure.store.verification_code_store import get_code_store
+        apagados = get_code_store().limpar_expirados()
+        click.echo(f"{apagados} código(s) expirado(s) removido(s).")
+
+    @app.cli.command("migrate")
+    @click.option("--to", "ate", type=int, default=None, help="Aplica só até esta versão.")
+    def migrate(ate):
+        """Aplica as migrações de schema pendentes (src/config/migration.py)."""
+        from src.config.migration import migrar, versao_atual
+        feitas = migrar(ate=ate, log=click.echo)
+        click.echo(f"{len(feitas)} migração(ões) aplicada(s); schema na versão {versao_atual()}.")
+
+    @app.cli.command("migrate-status")
+    def migrate_status():
+        """Lista as migrações e quando cada uma foi aplicada."""
+        from src.config.migration import status
+        for versao, descricao, aplicada_em in status():
+            click.echo(f"{versao:>4}  {aplicada_em or 'pendente':<26}  {descricao}")
+
+    @app.cli.command("check-query-plans")
+    def check_query_plans():
+        """EXPLAIN nas consultas quentes; sai com código 1 se alguma fizer full scan."""
+        from src.config.query_plans import verificar_planos
+        falhas = 0
+        for resultado in verificar_planos():
+            if resultado["full_scan"]:
+                falhas += 1
+                click.echo(f"FULL SCAN {resultado['consulta']}: {', '.join(resultado['full_scan'])}")
+                for linha in resultado["plano"]:
+                    click.echo(f"    {linha}")
+            else:
+                click.echo(f"ok {resultado['consulta']}")
+        if falhas:
+            raise SystemExit(1)
+
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys():
+        """Apaga as respostas de Idempotency-Key vencidas."""
+        from src.Infrastructure.store.idempotency_store import get_idempotency_store
+        click.echo(f"{get_idempotency_store().limpar_expirados()} chave(s) vencida(s) removida(s).")
+
+    @app.cli.command("release-reservations")
+    def release_reservations():
+        """Devolve ao estoque as reservas de carrinho vencidas (para cron em ambientes sem threads)."""
+        from src.Application.Service.cart_service import CartService
+        click.echo(f"{CartService.liberar_expiradas()} reserva(s) liberada(s).")
+
+    @app.cli.command("send-low-stock-digest")
+    def send_low_stock_digest():
+        """Envia o resumo dos alertas de estoque baixo pendentes (para cron em ambientes sem threads)."""
+        from src.Application.Service.stock_alert_service import StockAlertService
+        click.echo(f"{StockAlertService.enviar_resumo()} alerta(s) no resumo.")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Gera frontend/static/dist (CSS/JS com hash no nome + variantes gzip/brotli)."""
+        from src.Infrastructure.static.assets import build_assets
+        manifesto = build_assets(app.static_folder)
+        for original, fingerprint in manifesto["assets"].items():
+            click.echo(f"{original} -> dist/{fingerprint}")
+        click.echo(f"{len(manifesto['pages'])} página(s) HTML reescrita(s).")
+
+    return app
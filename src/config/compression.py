@@ -0,0 +1,61 @@
+import gzip
+import os
+import zlib
+from flask import request
+
+TIPOS_COMPRIMIVEIS = (
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript', 'image/svg+xml',
+)
+
+
+def _gzip_stream(partes, nivel):
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)  # wbits 31 = container gzip
+    for parte in partes:
+        if isinstance(parte, str):
+            parte = parte.encode('utf-8')
+        dados = compressor.compress(parte)
+        if dados:
+            yield dados
+    yield compressor.flush()
+
+
+def init_compression(app):
+    """Comprime respostas com gzip quando o cliente aceita.
+
+    GZIP_MIN_SIZE (bytes, padrão 1024) é o tamanho mínimo para valer a pena e
+    GZIP_LEVEL (1-9, padrão 6) o nível. Respostas em streaming são comprimidas
+    parte a parte, sem materializar o corpo.
+    """
+    minimo = int(os.environ.get('GZIP_MIN_SIZE', 1024))
+    nivel = int(os.environ.get('GZIP_LEVEL', 6))
+
+    @app.after_request
+    def comprimir_resposta(response):
+        if request.method == 'HEAD' or not request.accept_encodings['gzip']:
+            return response
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+        if response.direct_passthrough or 'Content-Encoding' in response.headers:
+            # arquivos (send_file) e variantes já comprimidas ficam como estão
+            return response
+        if response.mimetype not in TIPOS_COMPRIMIVEIS:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if response.is_streamed:
+            response.response = _gzip_stream(response.response, nivel)
+            response.headers.pop('Content-Length', None)
+        else:
+            corpo = response.get_data()
+            if len(corpo) < minimo:
+                return response
+            response.set_data(gzip.compress(corpo, compresslevel=nivel))
+        response.headers['Content-Encoding'] = 'gzip'
+        etag, fraca = response.get_etag()
+        if etag and not fraca:
+            # corpo mudou: ETag forte vira fraca
+            response.set_etag(etag, weak=True)
+        return response
+
+    return app
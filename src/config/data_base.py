@@ -1,31 +1,166 @@
+import os
+import threading
+import time
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
 
 db = SQLAlchemy()
 
+# Valores padrão; cada um pode ser sobrescrito pela variável de ambiente correspondente
+# (DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME) ou por DATABASE_URL inteira.
 DB_CONFIG = {
-    'user': 'root',
-    'password': '218101809Luiz.',
-    'host': 'localhost',
-    'database': 'projeto_frameworks'
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', '218101809Luiz.'),
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': os.environ.get('DB_PORT', '3306'),
+    'database': os.environ.get('DB_NAME', 'projeto_frameworks')
 }
 
 
+class PoolMetrics:
+    """Tempo de espera no checkout do pool e contagem de timeouts (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def registrar_espera(self, segundos, timeout=False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += segundos
+            self.wait_max = max(self.wait_max, segundos)
+            if timeout:
+                self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_seconds_total': self.wait_total,
+                'wait_seconds_max': self.wait_max,
+                'wait_seconds_avg': (self.wait_total / self.checkouts) if self.checkouts else 0.0,
+                'timeouts': self.timeouts
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão livre."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        pool_metrics.registrar_espera(time.perf_counter() - inicio)
+        return conn
+
+
+def _env_bool(nome, padrao):
+    valor = os.environ.get(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_url():
+    """URL do banco: DATABASE_URL se definida, senão montada a partir do DB_CONFIG."""
+    url = os.environ.get('DATABASE_URL')
+    if url:
+        return url
+    return (f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}"
+            f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
+
+
+def engine_options(url):
+    """Opções do engine (pool, pre-ping, recycle, timeouts) vindas do ambiente.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_CONNECT_TIMEOUT e DB_READ_TIMEOUT/DB_WRITE_TIMEOUT (pymysql).
+    """
+    url = make_url(url)
+    options = {'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True)}
+
+    if url.get_backend_name() == 'sqlite':
+        # SQLite usa o pool padrão do dialeto; tamanho/overflow não se aplicam
+        return options
+
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # abaixo do wait_timeout do MySQL para não reutilizar conexão já derrubada
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 280)),
+    })
+    if url.get_backend_name() == 'mysql':
+        options['connect_args'] = {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            'read_timeout': int(os.environ.get('DB_READ_TIMEOUT', 30)),
+            'write_timeout': int(os.environ.get('DB_WRITE_TIMEOUT', 30)),
+        }
+    return options
+
+
+def criar_database(url):
+    """CREATE DATABASE IF NOT EXISTS conectando ao servidor sem database (só MySQL)."""
+    url = make_url(url)
+    if url.get_backend_name() != 'mysql' or not url.database:
+        return
+    engine = create_engine(url.set(database=None), poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{url.database}`"))
+    finally:
+        engine.dispose()
+
+
+def pool_stats():
+    """Utilização do pool do engine da aplicação + métricas de espera no checkout."""
+    dados = pool_metrics.snapshot()
+    try:
+        pool = db.engine.pool
+    except Exception:
+        return dados
+    if isinstance(pool, QueuePool):
+        tamanho = pool.size()
+        em_uso = pool.checkedout()
+        capacidade = tamanho + pool._max_overflow
+        dados.update({
+            'pool_size': tamanho,
+            'max_overflow': pool._max_overflow,
+            'checked_out': em_uso,
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'utilization': (em_uso / capacidade) if capacidade > 0 else 0.0
+        })
+    return dados
+
+
 def init_db(app):
     """
-    Inicializa a base de dados com o app Flask e o SQLAlchemy usando MySQL.
-    Cria o database se necessário conectando ao servidor (sem especificar database)
-    e então configura a URI para o SQLAlchemy usar o database criado.
+    Inicializa a base de dados com o app Flask e o SQLAlchemy.
+
+    A URL e o pool vêm do ambiente (ver database_url/engine_options). Criar o
+    database no servidor é opcional: só acontece com DB_CREATE_DATABASE=1.
     """
-    # Cria o database se não existir. Conecta ao servidor sem database.
-    base_uri = f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}/"
-    engine = create_engine(base_uri)
-    with engine.connect() as conn:
-        conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}"))
-
-    # Configuração MySQL para a aplicação (com database)
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}/{DB_CONFIG['database']}"
+    url = database_url()
+    if _env_bool('DB_CREATE_DATABASE', False):
+        criar_database(url)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
 
     # Inicializa a conexão do Flask-SQLAlchemy
     db.init_app(app)
@@ -0,0 +1,195 @@
+import logging
+import os
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_QUERIES = (1, 2, 5, 10, 20, 50, 100)
+
+
+class Histograma:
+    """Histograma cumulativo no formato do Prometheus (buckets fixos, soma e contagem)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * len(buckets)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in labels.items()) + '}'
+
+
+class Metricas:
+    """Contadores e histogramas por endpoint (thread-safe), exportados em texto Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requisicoes = {}
+        self.latencia = {}
+        self.tempo_db = {}
+        self.queries = {}
+        self.queries_lentas = 0
+
+    def registrar_requisicao(self, endpoint, metodo, status, duracao, tempo_db, queries):
+        with self._lock:
+            chave = (endpoint, metodo, status)
+            self.requisicoes[chave] = self.requisicoes.get(chave, 0) + 1
+            self.latencia.setdefault(endpoint, Histograma(BUCKETS_SEGUNDOS)).observar(duracao)
+            self.tempo_db.setdefault(endpoint, Histograma(BUCKETS_SEGUNDOS)).observar(tempo_db)
+            self.queries.setdefault(endpoint, Histograma(BUCKETS_QUERIES)).observar(queries)
+
+    def registrar_query_lenta(self):
+        with self._lock:
+            self.queries_lentas += 1
+
+    def prometheus(self, extras=()):
+        """Texto no formato de exposição do Prometheus.
+
+        `extras` são tuplas (nome, tipo, ajuda, valor) com métricas vindas de fora
+        (pool de conexões, cache).
+        """
+        linhas = []
+
+        def cabecalho(nome, tipo, ajuda):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+
+        def histogramas(nome, ajuda, por_endpoint):
+            cabecalho(nome, 'histogram', ajuda)
+            for endpoint, h in sorted(por_endpoint.items()):
+                for limite, contagem in zip(h.buckets, h.contagens):
+                    linhas.append(f"{nome}_bucket{_labels(endpoint=endpoint, le=limite)} {contagem}")
+                linhas.append(f"{nome}_bucket{_labels(endpoint=endpoint, le='+Inf')} {h.total}")
+                linhas.append(f"{nome}_sum{_labels(endpoint=endpoint)} {h.soma}")
+                linhas.append(f"{nome}_count{_labels(endpoint=endpoint)} {h.total}")
+
+        with self._lock:
+            cabecalho('http_requests_total', 'counter', 'Requisições por endpoint, método e status.')
+            for (endpoint, metodo, status), total in sorted(self.requisicoes.items()):
+                linhas.append(f"http_requests_total{_labels(endpoint=endpoint, method=metodo, status=status)} {total}")
+            histogramas('http_request_duration_seconds', 'Latência da requisição (até o fim do handler).',
+                        self.latencia)
+            histogramas('http_request_db_seconds', 'Tempo em SQL por requisição.', self.tempo_db)
+            histogramas('http_request_db_queries', 'Statements SQL por requisição.', self.queries)
+            cabecalho('db_slow_queries_total', 'counter', 'Statements acima de SLOW_QUERY_MS.')
+            linhas.append(f"db_slow_queries_total {self.queries_lentas}")
+
+        for nome, tipo, ajuda, valor in extras:
+            cabecalho(nome, tipo, ajuda)
+            linhas.append(f"{nome} {valor}")
+        return '\n'.join(linhas) + '\n'
+
+
+metricas = Metricas()
+
+
+def metricas_externas():
+    """Pool de conexões e cache de produtos no formato aceito por Metricas.prometheus."""
+    from src.config.data_base import pool_stats
+    from src.Application.Service.produto_service import ProdutoService
+
+    extras = []
+    pool = pool_stats()
+    for chave, nome, tipo, ajuda in (
+        ('checkouts', 'db_pool_checkouts_total', 'counter', 'Checkouts de conexão do pool.'),
+        ('wait_seconds_total', 'db_pool_wait_seconds_total', 'counter', 'Tempo total esperando conexão livre.'),
+        ('wait_seconds_max', 'db_pool_wait_seconds_max', 'gauge', 'Maior espera por conexão.'),
+        ('timeouts', 'db_pool_timeouts_total', 'counter', 'Checkouts que estouraram DB_POOL_TIMEOUT.'),
+        ('pool_size', 'db_pool_size', 'gauge', 'Tamanho do pool.'),
+        ('checked_out', 'db_pool_checked_out', 'gauge', 'Conexões em uso.'),
+        ('overflow', 'db_pool_overflow', 'gauge', 'Conexões de overflow abertas.'),
+        ('utilization', 'db_pool_utilization', 'gauge', 'Conexões em uso / capacidade.'),
+    ):
+        if chave in pool:
+            extras.append((nome, tipo, ajuda, pool[chave]))
+
+    cache = ProdutoService.cache_stats()
+    for chave in ('hits', 'misses', 'evictions'):
+        extras.append((f'product_cache_l1_{chave}_total', 'counter', f'Cache L1 de produtos: {chave}.',
+                       cache['l1'][chave]))
+    extras.append(('product_cache_l1_size', 'gauge', 'Entradas no cache L1 de produtos.', cache['l1']['size']))
+    if 'shared' in cache:
+        for chave in ('hits', 'misses', 'errors'):
+            extras.append((f'product_cache_shared_{chave}_total', 'counter',
+                           f'Cache compartilhado de produtos: {chave}.', cache['shared'][chave]))
+    return extras
+
+
+_limite_lenta = 0.2
+
+
+def _antes_da_query(conn, cursor, statement, parameters, context, executemany):
+    context._inicio_sql = time.perf_counter()
+
+
+def _depois_da_query(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - context._inicio_sql
+    if has_request_context():
+        g.sql_queries = getattr(g, 'sql_queries', 0) + 1
+        g.sql_tempo = getattr(g, 'sql_tempo', 0.0) + duracao
+    if duracao >= _limite_lenta:
+        metricas.registrar_query_lenta()
+        origem = request.path if has_request_context() else '-'
+        logger.warning("[SLOW SQL] %.1f ms", duracao * 1000,
+                       extra={'origem': origem, 'statement': ' '.join(statement.split())[:500]})
+
+
+def init_instrumentation(app):
+    """Mede SQL e latência por requisição.
+
+    Conta statements e soma o tempo de banco de cada requisição (eventos de cursor
+    do SQLAlchemy), devolve o header Server-Timing e alimenta os histogramas de
+    /metrics. SLOW_QUERY_MS (padrão 200) define o limite do log de queries lentas
+    e SERVER_TIMING=0 desliga o header. Em respostas em streaming a latência vai
+    até o fim do handler, não até o último byte enviado.
+    """
+    global _limite_lenta
+    _limite_lenta = float(os.environ.get('SLOW_QUERY_MS', 200)) / 1000.0
+    server_timing = os.environ.get('SERVER_TIMING', '1') != '0'
+
+    # no Engine (classe): vale para o engine que o Flask-SQLAlchemy criar depois
+    if not event.contains(Engine, 'before_cursor_execute', _antes_da_query):
+        event.listen(Engine, 'before_cursor_execute', _antes_da_query)
+        event.listen(Engine, 'after_cursor_execute', _depois_da_query)
+
+    @app.before_request
+    def iniciar_medicao():
+        g.inicio_requisicao = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_tempo = 0.0
+
+    @app.after_request
+    def registrar_medicao(response):
+        inicio = getattr(g, 'inicio_requisicao', None)
+        if inicio is None:
+            return response
+        duracao = time.perf_counter() - inicio
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metricas.registrar_requisicao(endpoint, request.method, response.status_code,
+                                      duracao, g.sql_tempo, g.sql_queries)
+        if server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={g.sql_tempo * 1000:.2f};desc="{g.sql_queries} queries", total;dur={duracao * 1000:.2f}'
+            )
+        return response
+
+    return app
@@ -0,0 +1,55 @@
+import logging
+import os
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson  # dependência opcional: encoder rápido
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider com orjson; mesma saída do provider padrão do Flask.
+
+    Datas/Decimal/UUID continuam passando pelo `default` do Flask (OPT_PASSTHROUGH_*),
+    então o formato das respostas não muda, só o tempo de serialização.
+    """
+
+    def _opcoes(self):
+        opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_SUBCLASS
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        return opcoes
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # indent/separators/etc. específicos: deixa com a stdlib
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._opcoes()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self.compact is False or (self.compact is None and self._app.debug):
+            # saída indentada em debug, igual ao provider padrão
+            return super().response(obj)
+        corpo = orjson.dumps(obj, default=self.default, option=self._opcoes() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(corpo, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """JSON_PROVIDER='auto' (orjson se instalado), 'orjson' ou 'stdlib'."""
+    escolha = os.environ.get('JSON_PROVIDER', 'auto').lower()
+    if escolha == 'stdlib' or orjson is None:
+        if escolha == 'orjson':
+            logger.warning("JSON_PROVIDER=orjson mas o pacote orjson não está instalado; usando stdlib")
+        return app
+    app.json_provider_class = OrjsonProvider
+    app.json = OrjsonProvider(app)
+    return app
@@ -0,0 +1,136 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+
+# atributos padrão do LogRecord; o resto veio de `extra=` e vai como campo do JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def amostrar(taxa=None, **campos):
+    """`extra=` para mensagens de alto volume: só uma fração `taxa` é gravada.
+
+    Sem `taxa`, usa LOG_SAMPLE_RATE (padrão 0.1). WARNING ou acima nunca é descartado.
+    """
+    if taxa is None:
+        taxa = float(os.environ.get('LOG_SAMPLE_RATE', 0.1))
+    return {'sample_rate': taxa, **campos}
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro: ts, level, logger, msg, request_id e os campos de `extra=`."""
+
+    def format(self, record):
+        dados = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and valor is not None:
+                dados[chave] = valor
+        if record.exc_text:
+            dados['exc'] = record.exc_text
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class ContextoRequisicaoFilter(logging.Filter):
+    """Anexa request_id, método e rota ao registro (roda na thread da requisição)."""
+
+    def filter(self, record):
+        record.request_id = None
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class AmostragemFilter(logging.Filter):
+    def filter(self, record):
+        taxa = getattr(record, 'sample_rate', None)
+        if taxa is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < taxa
+
+
+class FilaHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloqueia: com a fila cheia o registro é descartado e contado."""
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # formata mensagem e traceback aqui, na thread de origem; o writer só serializa
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+_listener = None
+
+
+def configurar_logging():
+    """Configura o logger raiz uma vez por processo.
+
+    Os registros vão para uma fila limitada e uma thread em background os grava
+    em stdout, então o request nunca espera pela escrita no terminal/pipe.
+    LOG_LEVEL (padrão INFO), LOG_FORMAT=json|text, LOG_QUEUE_SIZE (padrão 10000)
+    e LOG_SAMPLE_RATE (ver `amostrar`).
+    """
+    global _listener
+    if _listener is not None:
+        return
+    saida = logging.StreamHandler(sys.stdout)
+    if os.environ.get('LOG_FORMAT', 'json').lower() == 'text':
+        saida.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+    else:
+        saida.setFormatter(JsonFormatter())
+
+    handler = FilaHandler(queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000))))
+    handler.addFilter(AmostragemFilter())
+    handler.addFilter(ContextoRequisicaoFilter())
+
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [handler]
+    raiz.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+    _listener = logging.handlers.QueueListener(handler.queue, saida, respect_handler_level=True)
+    _listener.start()
+    # esvazia a fila na saída do processo
+    atexit.register(_listener.stop)
+
+
+def init_logging(app):
+    """Logging estruturado + X-Request-ID (reaproveita o do cliente/balanceador se vier)."""
+    configurar_logging()
+
+    @app.before_request
+    def atribuir_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+
+    @app.after_request
+    def devolver_request_id(response):
+        if g.get('request_id'):
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    return app
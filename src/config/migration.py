@@ -0,0 +1,247 @@
+"""Migrações versionadas do schema, aplicadas por `flask migrate` (nunca no boot).
+
+A versão aplicada fica na tabela `schema_version` (uma linha por migração). Cada
+migração é uma função registrada com `@migracao(versao, descricao)`; `migrar()`
+roda, em ordem, as que ainda não constam na tabela.
+
+A versão 1 cria as tabelas a partir dos modelos atuais, então num banco novo as
+migrações seguintes encontram o schema já pronto: elas precisam ser idempotentes
+(conferir com o inspector antes de um ALTER/CREATE INDEX).
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from src.config.data_base import db
+
+logger = logging.getLogger(__name__)
+
+LOTE_BACKFILL = int(os.environ.get('MIGRATION_BATCH_SIZE', 500))
+# pausa entre lotes de backfill (segundos) para não disputar locks com o tráfego
+PAUSA_BACKFILL = float(os.environ.get('MIGRATION_BATCH_PAUSE', 0.05))
+
+_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRACOES = []
+
+
+def migracao(versao, descricao):
+    def registrar(fn):
+        MIGRACOES.append((versao, descricao, fn))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return fn
+    return registrar
+
+
+def importar_modelos():
+    """Importa todos os modelos para que db.metadata conheça todas as tabelas."""
+    from src.Infrastructure.Model.user import User  # noqa: F401
+    from src.Infrastructure.Model.produto import Produto  # noqa: F401
+    from src.Infrastructure.Model.order import Order  # noqa: F401
+    from src.Infrastructure.Model.order_item import OrderItem  # noqa: F401
+    from src.Infrastructure.Model.sales_stats import SalesTotals  # noqa: F401
+    from src.Infrastructure.Model.catalog_version import CatalogVersion  # noqa: F401
+    from src.Infrastructure.Model.verification_code import VerificationCode  # noqa: F401
+    from src.Infrastructure.Model.stock_reservation import StockReservation  # noqa: F401
+    from src.Infrastructure.Model.idempotency_key import IdempotencyKey  # noqa: F401
+    from src.Infrastructure.Model.low_stock_alert import LowStockAlert  # noqa: F401
+    from src.Infrastructure.Model.low_stock_digest import LowStockDigest  # noqa: F401
+    from src.Infrastructure.Model.counter_sale import CounterSale  # noqa: F401
+
+
+def backfill_em_lotes(tabela, condicao, aplicar, lote=None, pausa=None):
+    """Percorre as linhas de `tabela` que atendem `condicao` em lotes por id (keyset).
+
+    `aplicar(linhas)` roda dentro de uma transação curta, com commit por lote, e
+    há uma pausa entre lotes: nenhum lock fica preso na tabela pelo backfill
+    inteiro. Retorna o total de linhas percorridas.
+    """
+    lote = lote or LOTE_BACKFILL
+    pausa = PAUSA_BACKFILL if pausa is None else pausa
+    ultimo_id, total = 0, 0
+    while True:
+        linhas = db.session.execute(
+            select(tabela).where(condicao, tabela.c.id > ultimo_id).order_by(tabela.c.id).limit(lote)
+        ).all()
+        if not linhas:
+            break
+        try:
+            aplicar(linhas)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        ultimo_id = linhas[-1].id
+        total += len(linhas)
+        if pausa:
+            time.sleep(pausa)
+    return total
+
+
+def versoes_aplicadas():
+    """{versao: applied_at} das migrações já aplicadas (vazio se a tabela não existe)."""
+    if not inspect(db.engine).has_table('schema_version'):
+        return {}
+    with db.engine.connect() as conn:
+        return {v: quando for v, quando in conn.execute(select(schema_version.c.version, schema_version.c.applied_at))}
+
+
+def versao_atual():
+    return max(versoes_aplicadas(), default=0)
+
+
+def status():
+    """Lista (versao, descricao, applied_at ou None) de todas as migrações conhecidas."""
+    aplicadas = versoes_aplicadas()
+    return [(versao, descricao, aplicadas.get(versao)) for versao, descricao, _ in MIGRACOES]
+
+
+def migrar(ate=None, log=logger.info):
+    """Aplica as migrações pendentes (até a versão `ate`, se informada). Retorna as versões aplicadas."""
+    importar_modelos()
+    _metadata.create_all(bind=db.engine)
+    aplicadas = versoes_aplicadas()
+    feitas = []
+    for versao, descricao, fn in MIGRACOES:
+        if versao in aplicadas or (ate is not None and versao > ate):
+            continue
+        log(f"Aplicando {versao}: {descricao}")
+        inicio = time.perf_counter()
+        fn()
+        with db.engine.begin() as conn:
+            conn.execute(schema_version.insert().values(
+                version=versao, description=descricao, applied_at=datetime.utcnow()))
+        log(f"  ok ({time.perf_counter() - inicio:.2f}s)")
+        feitas.append(versao)
+    return feitas
+
+
+def _colunas(tabela):
+    return {c['name'] for c in inspect(db.engine).get_columns(tabela)}
+
+
+@migracao(1, "tabelas iniciais a partir dos modelos")
+def _tabelas_iniciais():
+    db.metadata.create_all(bind=db.engine)
+
+
+@migracao(2, "produtos.imagem VARCHAR(500)")
+def _imagem_500():
+    if db.engine.dialect.name == 'mysql':
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE produtos MODIFY COLUMN imagem VARCHAR(500)"))
+
+
+@migracao(3, "users.email_normalizado e users.password VARCHAR(255)")
+def _email_normalizado():
+    with db.engine.begin() as conn:
+        if 'email_normalizado' not in _colunas('users'):
+            conn.execute(text("ALTER TABLE users ADD COLUMN email_normalizado VARCHAR(100) NULL"))
+            conn.execute(text("CREATE UNIQUE INDEX ix_users_email_normalizado ON users (email_normalizado)"))
+        if db.engine.dialect.name == 'mysql':
+            # hashes pbkdf2 com 600k iterações passam de 100 caracteres
+            conn.execute(text("ALTER TABLE users MODIFY COLUMN password VARCHAR(255) NOT NULL"))
+
+
+@migracao(4, "preenche users.email_normalizado em lotes")
+def _backfill_emails():
+    from src.Application.Service.user_service import UserService
+    atualizados, conflitos = UserService.backfill_email_normalizado()
+    logger.info("%s usuário(s) atualizado(s)", atualizados)
+    for email in conflitos:
+        logger.warning("Conflito (email duplicado ao normalizar): %s", email)
+
+
+@migracao(5, "índices de orders, order_items e produtos")
+def _indices():
+    from src.config.query_plans import criar_indices
+    for nome in criar_indices():
+        logger.info("Índice %s criado", nome)
+
+
+@migracao(6, "usuário admin")
+def _admin():
+    from src.Application.Service.user_service import UserService
+    UserService.create_admin_if_not_exists()
+
+
+@migracao(7, "stock_reservations (carrinho com reserva de estoque)")
+def _reservas():
+    from src.Infrastructure.Model.stock_reservation import StockReservation
+    StockReservation.__table__.create(bind=db.engine, checkfirst=True)
+
+
+@migracao(8, "idempotency_keys (respostas de Idempotency-Key)")
+def _idempotencia():
+    from src.Infrastructure.Model.idempotency_key import IdempotencyKey
+    IdempotencyKey.__table__.create(bind=db.engine, checkfirst=True)
+
+
+@migracao(9, "low_stock_alerts (alertas de estoque baixo)")
+def _alertas_estoque():
+    from src.Infrastructure.Model.low_stock_alert import LowStockAlert
+    LowStockAlert.__table__.create(bind=db.engine, checkfirst=True)
+
+
+@migracao(10, "produtos.imagem_variantes (thumb/medium prontas)")
+def _imagem_variantes():
+    from sqlalchemy import column, table, true
+    from src.Infrastructure.storage.image_store import URL_UPLOADS, variantes_prontas
+    from src.Application.Service.produto_service import ProdutoService
+    if 'imagem_variantes' not in _colunas('produtos'):
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE produtos ADD COLUMN imagem_variantes BOOLEAN NOT NULL DEFAULT 0"))
+
+    # só as colunas usadas: o modelo atual tem colunas de migrações posteriores
+    tabela = table('produtos', column('id'), column('imagem'), column('imagem_variantes'))
+    marcados = []
+
+    def aplicar(linhas):
+        ids = [linha.id for linha in linhas if variantes_prontas(linha.imagem)]
+        if ids:
+            db.session.execute(tabela.update().where(tabela.c.id.in_(ids)).values(imagem_variantes=true()))
+            ProdutoService.incrementar_versao()
+            marcados.extend(ids)
+
+    backfill_em_lotes(tabela, tabela.c.imagem.like(f'{URL_UPLOADS}%'), aplicar)
+    logger.info("%s produto(s) com variantes de imagem já geradas", len(marcados))
+
+
+@migracao(11, "low_stock_digests (entrega dos resumos de estoque baixo por destinatário)")
+def _resumos_estoque():
+    from src.Infrastructure.Model.low_stock_digest import LowStockDigest
+    LowStockDigest.__table__.create(bind=db.engine, checkfirst=True)
+
+
+@migracao(12, "agregados de vendas a partir do histórico")
+def _agregados():
+    from src.Application.Service.stats_service import StatsService, TOTALS_ID
+    from src.Infrastructure.Model.sales_stats import SalesTotals
+    # o rebuild lê counter_sales: num banco que já estava na 11 elas ainda não existem
+    _vendas_balcao()
+    if db.session.get(SalesTotals, TOTALS_ID) is None:
+        StatsService.reconstruir()
+
+
+@migracao(13, "counter_sales (vendas de balcão sem cliente, fonte do rebuild-stats)")
+def _vendas_balcao():
+    from src.Infrastructure.Model.counter_sale import CounterSale, CounterSaleItem
+    CounterSale.__table__.create(bind=db.engine, checkfirst=True)
+    CounterSaleItem.__table__.create(bind=db.engine, checkfirst=True)
+
+
+@migracao(14, "produtos.versao/atualizado_em (ETag por produto, sem linha global nas vendas)")
+def _versao_produto():
+    colunas = _colunas('produtos')
+    with db.engine.begin() as conn:
+        if 'versao' not in colunas:
+            conn.execute(text("ALTER TABLE produtos ADD COLUMN versao INTEGER NOT NULL DEFAULT 0"))
+        if 'atualizado_em' not in colunas:
+            conn.execute(text("ALTER TABLE produtos ADD COLUMN atualizado_em DATETIME NULL"))
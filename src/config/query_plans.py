@@ -0,0 +1,91 @@
+import re
+from datetime import datetime
+from sqlalchemy import inspect
+from src.config.data_base import db
+
+def compilar(statement, dialect):
+    """SQL final de um statement do ORM, com os valores embutidos (como o banco vai recebê-lo)."""
+    return str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+def consultas_quentes():
+    """As consultas quentes, montadas pelos mesmos métodos que a aplicação usa.
+
+    Retorna {nome: (statement, tabelas em que o full scan é esperado)}. Cada
+    consulta deve ir por índice; se o plano voltar a ler uma tabela inteira,
+    `verificar_planos` acusa. Precisa de app_context.
+    """
+    from src.Application.Service.cart_service import CartService
+    from src.Application.Service.order_service import OrderService
+    from src.Application.Service.produto_service import ProdutoService
+    from src.Application.Service.stats_service import StatsService
+    from src.Application.Service.stock_alert_service import StockAlertService
+    from src.Application.Service.user_service import UserService
+    from src.Infrastructure.Model.order_item import OrderItem
+
+    agora = datetime.utcnow()
+    return {
+        'historico_pagina': (OrderService.consulta_historico(1, 21).statement, ()),
+        'historico_pagina_cursor': (OrderService.consulta_historico(1, 21, (agora, 100)).statement, ()),
+        # forma da query extra do selectinload(Order.items)
+        'itens_do_pedido': (db.session.query(OrderItem).filter(OrderItem.order_id.in_([1, 2, 3])).statement, ()),
+        'listar_pagina_cursor': (ProdutoService.consulta_pagina(100, 51).statement, ()),
+        'travar_produtos': (ProdutoService.consulta_travar_produtos([1, 2, 3]).statement, ()),
+        # o painel lista todos os produtos por definição; product_sales tem que ir pela PK
+        'painel_por_produto': (StatsService.consulta_por_produto().statement, ('produtos',)),
+        'reservas_vencidas': (CartService.consulta_reservas_vencidas(500).statement, ()),
+        'alertas_pendentes': (StockAlertService.consulta_alertas_pendentes(500).statement, ()),
+        'resumos_pendentes': (StockAlertService.consulta_resumos('pending', 500).statement, ()),
+        'login': (UserService.consulta_por_email('admin@example.com').statement, ()),
+    }
+
+
+# 'SCAN t' e 'SCAN t USING [COVERING] INDEX' leem a tabela/índice inteiro; 'SEARCH' é busca por índice
+_SCAN_SQLITE = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+def criar_indices():
+    """Cria os índices declarados nos modelos que ainda não existem no banco.
+
+    Só olha tabelas já existentes; retorna a lista de índices criados.
+    """
+    inspetor = inspect(db.engine)
+    tabelas = set(inspetor.get_table_names())
+    criados = []
+    for tabela in db.metadata.sorted_tables:
+        if tabela.name not in tabelas:
+            continue
+        existentes = {i['name'] for i in inspetor.get_indexes(tabela.name)}
+        for indice in sorted(tabela.indexes, key=lambda i: i.name):
+            if indice.name not in existentes:
+                indice.create(bind=db.engine)
+                criados.append(indice.name)
+    return criados
+
+
+def _tabelas_em_full_scan(conn, statement):
+    sql = compilar(statement, conn.dialect)
+    if conn.dialect.name == 'sqlite':
+        plano = [linha[-1] for linha in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+        scans = [m.group(1) for m in (_SCAN_SQLITE.match(d) for d in plano) if m]
+        return plano, scans
+    plano = [dict(linha) for linha in conn.exec_driver_sql(f"EXPLAIN {sql}").mappings().all()]
+    # type=ALL é leitura da tabela inteira no MySQL
+    scans = [linha['table'] for linha in plano if str(linha.get('type')).upper() == 'ALL']
+    return plano, scans
+
+
+def verificar_planos(consultas=None):
+    """Roda EXPLAIN nas consultas quentes e aponta as que caíram em full scan.
+
+    Em MySQL o otimizador pode preferir full scan em tabelas quase vazias:
+    rode contra uma base com volume realista. Retorna uma lista de dicts
+    {'consulta', 'plano', 'full_scan'}.
+    """
+    resultados = []
+    with db.engine.connect() as conn:
+        for nome, (statement, esperados) in (consultas or consultas_quentes()).items():
+            plano, scans = _tabelas_em_full_scan(conn, statement)
+            resultados.append({'consulta': nome, 'plano': plano,
+                               'full_scan': [t for t in scans if t not in esperados]})
+    return resultados
@@ -2,14 +2,56 @@
 from src.Application.Controllers.produto_controller import ProdutoController
 from flask import jsonify, make_response, request, session
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.Infrastructure.http.whats_app import gerar_codigo, verificar_codigo, ultimo_codigo
+from src.Infrastructure.http.whats_app import verificar_codigo, novo_codigo, enviar_codigo_async, status_envio
+from src.Infrastructure.store.verification_code_store import get_code_store
+from src.Infrastructure.http.idempotency import idempotente
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+
+def _user_id_atual():
+    """Id do usuário do JWT (identity é o id; tokens antigos trazem o cnpj). Retorna (user_id, erro)."""
+    from src.config.data_base import db
+    ident = get_jwt_identity()
+    try:
+        return int(ident), None
+    except Exception:
+        from src.Infrastructure.Model.user import User
+        u = db.session.query(User).filter_by(cnpj=str(ident)).first()
+        if not u:
+            return None, (jsonify({'error': 'Usuário inválido'}), 400)
+        return u.id, None
+
+
+def _nota_fiscal(order):
+    """Nota fiscal (JSON) + links do PDF, renderizado em background."""
+    from src.Application.Service.invoice_service import InvoiceService
+    try:
+        job_id = InvoiceService.agendar(order.id)
+    except Exception as e_pdf:
+        job_id = None
+        logger.warning('Falha ao agendar PDF da nota fiscal: %s', e_pdf, extra={'order_id': order.id})
+    return {
+        'nota_fiscal': {
+            'order_id': order.id,
+            'user_id': order.user_id,
+            'total': order.total,
+            'itens': [i.to_dict() for i in order.items]
+        },
+        # o link faz o render sob demanda se o job ainda não terminou
+        'nota_fiscal_url': f"/invoice/{order.id}",
+        'nota_fiscal_job_id': job_id,
+        'nota_fiscal_status_url': f"/invoice/{order.id}/status"
+    }
+
+
 def init_routes(app):    
     @app.route("/", methods=["GET"])
     def index_page():
-        # retorna o index.html estático da pasta frontend/static
-        return app.send_static_file('index.html')
+        # retorna o index.html estático da pasta frontend/static (versão do build, se houver)
+        return app.view_functions['static']('index.html')
 
     @app.route("/api", methods=["GET"])
     def health():
@@ -39,53 +81,89 @@ def init_routes(app):
         except Exception as e:
             return jsonify({'db_available': False, 'error': str(e)}), 200
     
+    @app.route('/debug/pool', methods=['GET'])
+    def debug_pool():
+        """Utilização do pool de conexões e tempo de espera no checkout (só com ENABLE_DEBUG=1)."""
+        if os.environ.get('ENABLE_DEBUG') != '1':
+            return jsonify({'error': 'Not found'}), 404
+        from src.config.data_base import pool_stats
+        return jsonify(pool_stats()), 200
+
+    @app.route('/debug/cache', methods=['GET'])
+    def debug_cache():
+        """Contadores de hit/miss do cache de produtos (mesma regra do /debug/db: só com ENABLE_DEBUG=1)."""
+        if os.environ.get('ENABLE_DEBUG') != '1':
+            return jsonify({'error': 'Not found'}), 404
+        from src.Application.Service.produto_service import ProdutoService
+        return jsonify(ProdutoService.cache_stats()), 200
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Métricas no formato Prometheus: requisições, SQL por endpoint, pool e cache.
+
+        Com METRICS_TOKEN definido, exige `Authorization: Bearer <token>`.
+        """
+        token = os.environ.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return jsonify({'error': 'Not found'}), 404
+        from src.config.instrumentation import metricas, metricas_externas
+        resposta = make_response(metricas.prometheus(metricas_externas()), 200)
+        resposta.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        return resposta
+
     @app.route("/send-code", methods=["POST"])
     def send_code():
         try:
             from src.Infrastructure.Model.user import User
+            from src.Application.Service.user_service import UserService
             from src.config.data_base import db
             
             data = request.get_json()
-            if not data or not data.get("email"):
+            if not data or not (data.get("email") or "").strip():
                 return jsonify({"error": "Email é obrigatório"}), 400
 
-            # Gerar e enviar o código primeiro
-            codigo = gerar_codigo()
-
-            if not codigo:
-                return jsonify({"error": "Falha ao enviar código"}), 500
-
-            print(f"Código gerado e enviado: {codigo}")  # Debug
+            # Gera o código; o envio pelo WhatsApp só é enfileirado depois de persistido
+            codigo = novo_codigo()
 
             # Verificar se o usuário já existe para atualizar, senão cria um novo
-            user = db.session.query(User).filter_by(email=data["email"]).first()
+            # (pelo email normalizado: variação de caixa/espaços é o mesmo usuário)
+            user = UserService.buscar_por_email(data["email"])
 
-            if user:
-                # Atualiza o código de validação do usuário existente
-                user.codigo_validacao = codigo
-                print(f"Atualizando código para usuário existente: {codigo}")  # Debug
-            else:
+            if not user:
                 # Se não existe, cria um novo usuário com os dados básicos
                 # status inicial 0 (pendente) até validar código; admin permanecem 2 manualmente
                 user = User(
                     name=data.get("name", ""),
-                    email=data["email"],
+                    email=data["email"].strip(),
                     password=data.get("password", ""),
                     cnpj="00000000000",
                     celular="11979911839",
-                    codigo_validacao=codigo,
+                    codigo_validacao=None,
                     status=0
                 )
-                print(f"Criando novo usuário com código: {codigo}")  # Debug
+                logger.debug("Novo usuário pendente criado em /send-code")
                 db.session.add(user)
 
             db.session.commit()
-            return jsonify({"message": "Código enviado com sucesso"}), 200
+            # código pendente fica no store de verificação (TTL + tentativas), chaveado pelo email
+            get_code_store().emitir(user.email, codigo)
+
+            delivery_id, erro = enviar_codigo_async(codigo)
+            if erro:
+                return jsonify({"error": "Falha ao enviar código", "code": erro}), 503
+            return jsonify({"message": "Código enviado com sucesso", "delivery_id": delivery_id}), 202
             
         except Exception as e:
-            print(f"Erro ao enviar código: {str(e)}")
+            logger.exception("Erro ao enviar código")
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/send-code/status/<delivery_id>", methods=["GET"])
+    def send_code_status(delivery_id):
+        info = status_envio(delivery_id)
+        if not info:
+            return jsonify({"error": "Envio não encontrado"}), 404
+        return jsonify(info), 200
+
     @app.route("/verify-code", methods=["POST"])
     def verify_code():
         data = request.get_json()
@@ -93,19 +171,17 @@ def init_routes(app):
             return jsonify({"error": "Código e email são obrigatórios"}), 400
             
         try:
-            from src.Infrastructure.Model.user import User
+            from src.Application.Service.user_service import UserService
             from src.config.data_base import db
             
-            # Buscar usuário e verificar código
-            user = db.session.query(User).filter_by(email=data["email"]).first()
+            # Buscar usuário e verificar código (store chaveado pelo email gravado, como no /send-code)
+            user = UserService.buscar_por_email(data["email"])
             if not user:
                 return jsonify({"error": "Usuário não encontrado"}), 404
                 
-            if not user.codigo_validacao:
-                return jsonify({"error": "Nenhum código pendente. Solicite um novo código."}), 400
-                
-            if data["code"] != user.codigo_validacao:
-                return jsonify({"error": "Código incorreto"}), 400
+            ok, mensagem = verificar_codigo(user.email, data["code"])
+            if not ok:
+                return jsonify({"error": mensagem}), 400
             
             # Atualizar dados do usuário se fornecidos
             if data.get("name"):
@@ -122,7 +198,7 @@ def init_routes(app):
             return jsonify({"message": "Código validado com sucesso. Você já pode fazer login."}), 200
             
         except Exception as e:
-            print(f"Erro na verificação do código: {str(e)}")
+            logger.exception("Erro na verificação do código")
             return jsonify({"error": "Erro ao verificar código"}), 500
         if not data.get("name") or not data.get("email") or not data.get("password"):
                 return jsonify({"error": "Dados de cadastro incompletos"}), 400
@@ -148,7 +224,7 @@ def init_routes(app):
                 return UserController.register_user()
                 
         except Exception as e:
-                print(f"Erro ao criar usuário: {str(e)}")  # log para debug
+                logger.exception("Erro ao criar usuário")
                 if "Duplicate entry" in str(e):
                     return jsonify({"error": "Este email já está cadastrado. Por favor, use outro email ou faça login."}), 400
                 return jsonify({"error": "Erro ao criar usuário. Por favor, tente novamente."}), 500
@@ -171,16 +247,16 @@ def init_routes(app):
             if not data or "email" not in data or "password" not in data:
                 return jsonify({"error": "Email e senha são obrigatórios"}), 400
 
-            # Buscar usuário pelo email
-            from src.Infrastructure.Model.user import User
+            # Buscar usuário pelo email normalizado (um lookup, reaproveitado pelo service)
+            from src.Application.Service.user_service import UserService
             from src.config.data_base import db
-            user = db.session.query(User).filter_by(email=data["email"]).first()
+            user = UserService.buscar_por_email(data["email"])
             
             if not user:
                 return jsonify({"error": "Usuário não encontrado"}), 404
             
             # Verifica a senha (usa o UserController que retorna (response, status) ou Response)
-            result = UserController.verify_user()
+            result = UserController.verify_user(user=user)
 
             # Interpretar o resultado para obter o status code de forma segura
             status_code = None
@@ -200,16 +276,15 @@ def init_routes(app):
                 status_code = None
 
             # Se a verificação for bem sucedida (HTTP 200), NÃO sobrescreve status de admin
-            if status_code == 200 and user.status != 2:
-                # Mantém usuário comum com status 1; não rebaixa admin
-                if user.status not in (1,2):  # Em caso de resíduos booleanos
-                    user.status = 1
+            if status_code == 200 and user.status not in (1, 2):
+                # Em caso de resíduos booleanos mantém usuário comum com status 1; não rebaixa admin
+                user.status = 1
                 db.session.commit()
 
             return result
 
         except Exception as e:
-            print(f"Erro na verificação: {str(e)}")
+            logger.exception("Erro na verificação")
             return jsonify({"error": "Erro ao verificar usuário"}), 500
     
     @app.route("/user/<int:id>", methods=["PUT"])
@@ -243,7 +318,7 @@ def init_routes(app):
                 "status": user.status
             }), 200
         except Exception as e:
-            print(f"Erro em /me: {str(e)}")
+            logger.exception("Erro em /me")
             return jsonify({"error": "Erro ao obter usuário"}), 500
     
     @app.route("/verifica/code", methods=["POST"])
@@ -262,6 +337,14 @@ def init_routes(app):
     @app.route("/produto", methods=["GET"])
     def listar():
         return ProdutoController.list_product()
+
+    @app.route("/produto/bulk", methods=["POST"])
+    def importar_produtos():
+        return ProdutoController.bulk_import()
+
+    @app.route("/produto/export", methods=["GET"])
+    def exportar_produtos():
+        return ProdutoController.export()
     
     @app.route("/produto/<int:id>", methods=["GET"])
     def get_produto(id):
@@ -284,19 +367,28 @@ def init_routes(app):
         return ProdutoController.deletar_produto(id)
     
     @app.route("/produto/vender/<int:id>", methods=["PATCH"])
+    @idempotente
     def vender_produto(id):
         return ProdutoController.vender(id)
 
+    @app.route("/produto/vender", methods=["POST"])
+    @jwt_required(optional=True)
+    @idempotente
+    def vender_lote():
+        user_id = None
+        if get_jwt_identity() is not None:
+            user_id, erro = _user_id_atual()
+            if erro:
+                return erro
+        return ProdutoController.vender_lote(user_id)
+
     # ----- Admin stats dashboard -----
     @app.route('/admin/stats', methods=['GET'])
     @jwt_required()
     def admin_stats():
         try:
-            from sqlalchemy import func
             from src.Infrastructure.Model.user import User
-            from src.Infrastructure.Model.produto import Produto
-            from src.Infrastructure.Model.order import Order
-            from src.Infrastructure.Model.order_item import OrderItem
+            from src.Application.Service.stats_service import StatsService
             from src.config.data_base import db
 
             # Verifica admin
@@ -310,230 +402,155 @@ def init_routes(app):
             if not user or user.status != 2:
                 return jsonify({"error": "Acesso negado"}), 403
 
-            total_revenue = db.session.query(func.coalesce(func.sum(Order.total), 0.0)).scalar() or 0.0
-            total_orders = db.session.query(func.count(Order.id)).scalar() or 0
-            total_items_sold = db.session.query(func.coalesce(func.sum(OrderItem.quantity), 0)).scalar() or 0
-            stock_total = db.session.query(func.coalesce(func.sum(Produto.quantidade), 0)).scalar() or 0
-            
-            # Estatísticas adicionais
-            unique_customers = db.session.query(func.count(func.distinct(Order.user_id))).scalar() or 0
-            avg_order_value = float(total_revenue / total_orders) if total_orders > 0 else 0.0
-            total_products = db.session.query(func.count(Produto.id)).scalar() or 0
-            products_out_of_stock = db.session.query(func.count(Produto.id)).filter(Produto.quantidade == 0).scalar() or 0
-            low_stock_count = db.session.query(func.count(Produto.id)).filter(Produto.quantidade > 0, Produto.quantidade <= 5).scalar() or 0
-            
-            # Top 5 produtos mais vendidos
-            top_selling = (
-                db.session.query(
-                    Produto.nome,
-                    func.coalesce(func.sum(OrderItem.quantity), 0).label('qty')
-                )
-                .outerjoin(OrderItem, OrderItem.product_id == Produto.id)
-                .group_by(Produto.id)
-                .order_by(func.coalesce(func.sum(OrderItem.quantity), 0).desc())
-                .limit(5)
-                .all()
-            )
-            top_products = [{'name': name, 'quantity': int(qty or 0)} for name, qty in top_selling]
-            
-            # Produtos com estoque crítico
-            low_stock_products = (
-                db.session.query(Produto.nome, Produto.quantidade)
-                .filter(Produto.quantidade > 0, Produto.quantidade <= 5)
-                .order_by(Produto.quantidade.asc())
-                .limit(10)
-                .all()
-            )
-            low_stock_list = [{'name': name, 'stock': int(qty)} for name, qty in low_stock_products]
-
-            # Por produto
-            rows = (
-                db.session.query(
-                    Produto.id,
-                    Produto.nome,
-                    Produto.preco,
-                    Produto.quantidade.label('stock'),
-                    func.coalesce(func.sum(OrderItem.quantity), 0).label('sold_qty'),
-                    func.coalesce(func.sum(OrderItem.line_total), 0.0).label('revenue')
-                )
-                .outerjoin(OrderItem, OrderItem.product_id == Produto.id)
-                .group_by(Produto.id)
-                .all()
-            )
-
-            per_product = []
-            for r in rows:
-                sold = int(r.sold_qty or 0)
-                stock = int(r.stock or 0)
-                price = float(r.preco or 0.0)
-                denom = sold + stock
-                total_items_float = float(total_items_sold) if total_items_sold else 1.0
-                stock_value = float(stock) * price
-                per_product.append({
-                    'id': r.id,
-                    'name': r.nome,
-                    'price': price,
-                    'sold_qty': sold,
-                    'stock_remaining': stock,
-                    'stock_value': stock_value,
-                    'revenue': float(r.revenue or 0.0),
-                    'percent_of_total_sold': (float(sold) / total_items_float * 100.0) if total_items_sold else 0.0,
-                    'sold_vs_stock_percent': (float(sold) / float(denom) * 100.0) if denom else 0.0
-                })
-
-            # Série por dia
-            revenue_by_day = (
-                db.session.query(func.date(Order.created_at).label('day'), func.coalesce(func.sum(Order.total), 0.0))
-                .group_by(func.date(Order.created_at))
-                .order_by(func.date(Order.created_at))
-                .all()
-            )
-            revenue_by_day = [
-                { 'date': str(day), 'total': float(total) }
-                for day, total in revenue_by_day
-            ]
-
-            return jsonify({
-                'total_revenue': float(total_revenue),
-                'total_orders': int(total_orders),
-                'total_items_sold': int(total_items_sold),
-                'stock_total': int(stock_total),
-                'unique_customers': int(unique_customers),
-                'avg_order_value': float(avg_order_value),
-                'total_products': int(total_products),
-                'products_out_of_stock': int(products_out_of_stock),
-                'low_stock_count': int(low_stock_count),
-                'top_products': top_products,
-                'low_stock_list': low_stock_list,
-                'per_product': per_product,
-                'revenue_by_day': revenue_by_day
-            })
+            painel = StatsService.painel()
+            if painel is None:
+                resposta = jsonify({"error": "Estatísticas ainda não calculadas (flask rebuild-stats)",
+                                    "code": "STATS_NOT_READY"})
+                resposta.headers["Retry-After"] = "60"
+                return resposta, 503
+            return jsonify(painel)
         except Exception as e:
-            print(f"Erro ao montar stats: {e}")
+            logger.exception("Erro ao montar stats")
             return jsonify({"error": "Falha ao obter estatísticas"}), 500
 
     # ----- Carrinho em memória simples (sessionStorage front; backend só processa compra) -----
     @app.route('/checkout', methods=['POST'])
     @jwt_required()
+    @idempotente
     def checkout():
         try:
-            from src.Infrastructure.Model.produto import Produto
-            from src.Infrastructure.Model.order import Order
-            from src.Infrastructure.Model.order_item import OrderItem
-            from src.config.data_base import db
-            from flask import current_app
-            import os
+            from src.Application.Service.checkout_service import CheckoutService
             data = request.get_json() or {}
             items = data.get('items', [])  # [{product_id, quantity}]
             if not items:
                 return jsonify({'error': 'Nenhum item enviado', 'code': 'EMPTY_ITEMS'}), 400
 
-            ident = get_jwt_identity()
-            user_id = None
-            try:
-                user_id = int(ident)
-            except Exception:
-                # se identity não for id direto, tentar mapear via cnpj
-                from src.Infrastructure.Model.user import User
-                u = db.session.query(User).filter_by(cnpj=str(ident)).first()
-                if not u:
-                    return jsonify({'error': 'Usuário inválido'}), 400
-                user_id = u.id
+            user_id, erro = _user_id_atual()
+            if erro:
+                return erro
 
-            order = Order(user_id=user_id, total=0.0)
-            db.session.add(order)
-            total = 0.0
-            for idx, entry in enumerate(items):
-                try:
-                    pid = int(entry.get('product_id'))
-                except Exception:
-                    return jsonify({'error': f'product_id inválido no índice {idx}', 'code': 'BAD_PRODUCT_ID'}), 400
-                try:
-                    qty = int(entry.get('quantity', 1))
-                except Exception:
-                    return jsonify({'error': f'quantity inválida no índice {idx}', 'code': 'BAD_QUANTITY'}), 400
-                produto = db.session.query(Produto).filter_by(id=pid).first()
-                if not produto or not produto.status:
-                    return jsonify({'error': f'Produto {pid} inválido/inativo', 'code': 'PRODUCT_INACTIVE'}), 400
-                if produto.quantidade < qty:
-                    return jsonify({'error': f'Estoque insuficiente para produto {pid}', 'code': 'LOW_STOCK'}), 400
-                linha_total = produto.preco * qty
-                oi = OrderItem(order=order,
-                               product_id=produto.id,
-                               product_name=produto.nome,
-                               unit_price=produto.preco,
-                               quantity=qty,
-                               line_total=linha_total)
-                db.session.add(oi)
-                total += linha_total
-                # baixa estoque
-                produto.quantidade -= qty
-            order.total = total
-            db.session.commit()
-            # Nota fiscal simples (mock JSON)
-            nota = {
-                'order_id': order.id,
-                'user_id': order.user_id,
-                'total': order.total,
-                'itens': [i.to_dict() for i in order.items]
-            }
-
-            # Geração de PDF
-            try:
-                from reportlab.lib.pagesizes import A4
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.units import mm
-                from src.Infrastructure.Model.user import User
-                
-                # Buscar nome do usuário
-                usuario = db.session.query(User).filter_by(id=order.user_id).first()
-                nome_usuario = usuario.name if usuario else f"ID: {order.user_id}"
-                
-                pdf_dir = os.path.join(current_app.static_folder, 'invoices')
-                os.makedirs(pdf_dir, exist_ok=True)
-                pdf_path = os.path.join(pdf_dir, f'invoice_{order.id}.pdf')
-                c = canvas.Canvas(pdf_path, pagesize=A4)
-                width, height = A4
-                y = height - 20*mm
-                c.setFont("Helvetica-Bold", 14)
-                c.drawString(20*mm, y, f"Nota Fiscal - Pedido #{order.id}")
-                y -= 10*mm
-                c.setFont("Helvetica", 11)
-                c.drawString(20*mm, y, f"Usuário: {nome_usuario}")
-                y -= 6*mm
-                c.drawString(20*mm, y, f"Total: R$ {order.total:.2f}")
-                y -= 10*mm
-                c.setFont("Helvetica-Bold", 12)
-                c.drawString(20*mm, y, "Itens")
-                y -= 8*mm
-                c.setFont("Helvetica", 10)
-                for it in order.items:
-                    if y < 20*mm:
-                        c.showPage()
-                        y = height - 20*mm
-                        c.setFont("Helvetica", 10)
-                    line = f"{it.product_name} | Qtd: {it.quantity} | Unit: R$ {it.unit_price:.2f} | Total: R$ {it.line_total:.2f}"
-                    c.drawString(20*mm, y, line)
-                    y -= 6*mm
-                c.showPage()
-                c.save()
-                nota_pdf_url = f"/static/invoices/invoice_{order.id}.pdf"
-            except Exception as e_pdf:
-                nota_pdf_url = None
-                print('Falha ao gerar PDF da nota fiscal:', e_pdf)
-
-            return jsonify({'message': 'Compra realizada', 'nota_fiscal': nota, 'nota_fiscal_url': nota_pdf_url}), 201
+            order, erro = CheckoutService.finalizar_compra(user_id, items)
+            if erro:
+                # falta de estoque é conflito com o estado atual (como no /cart); o resto é payload inválido
+                return jsonify(erro), 409 if erro['code'] == 'LOW_STOCK' else 400
+            return jsonify({'message': 'Compra realizada', **_nota_fiscal(order)}), 201
         except Exception as e:
-            import traceback
-            print('Erro no checkout:', e)
-            traceback.print_exc()
+            logger.exception('Erro no checkout')
             return jsonify({'error': 'Falha no checkout', 'detail': str(e), 'code': 'CHECKOUT_EXCEPTION'}), 500
 
+    # ----- Carrinho no servidor: cada item reserva estoque por CART_RESERVATION_TTL segundos -----
+    @app.route('/cart', methods=['GET'])
+    @jwt_required()
+    def cart():
+        from src.Application.Service.cart_service import CartService
+        user_id, erro = _user_id_atual()
+        if erro:
+            return erro
+        return jsonify({'items': CartService.itens(user_id)}), 200
+
+    @app.route('/cart/items/<int:product_id>', methods=['PUT'])
+    @jwt_required()
+    def cart_set_item(product_id):
+        try:
+            from src.Application.Service.cart_service import CartService
+            user_id, erro = _user_id_atual()
+            if erro:
+                return erro
+            data = request.get_json() or {}
+            itens, erro = CartService.definir_quantidade(user_id, product_id, data.get('quantity'))
+            if erro:
+                return jsonify(erro), 409 if erro['code'] in ('LOW_STOCK', 'CONFLICT') else 400
+            return jsonify({'items': itens}), 200
+        except Exception:
+            logger.exception('Erro ao reservar item do carrinho')
+            return jsonify({'error': 'Falha ao atualizar carrinho'}), 500
+
+    @app.route('/cart/items/<int:product_id>', methods=['DELETE'])
+    @jwt_required()
+    def cart_remove_item(product_id):
+        try:
+            from src.Application.Service.cart_service import CartService
+            user_id, erro = _user_id_atual()
+            if erro:
+                return erro
+            itens, erro = CartService.definir_quantidade(user_id, product_id, 0)
+            if erro:
+                return jsonify(erro), 409
+            return jsonify({'items': itens}), 200
+        except Exception:
+            logger.exception('Erro ao remover item do carrinho')
+            return jsonify({'error': 'Falha ao atualizar carrinho'}), 500
+
+    @app.route('/cart', methods=['DELETE'])
+    @jwt_required()
+    def cart_clear():
+        try:
+            from src.Application.Service.cart_service import CartService
+            user_id, erro = _user_id_atual()
+            if erro:
+                return erro
+            return jsonify({'released': CartService.esvaziar(user_id)}), 200
+        except Exception:
+            logger.exception('Erro ao esvaziar carrinho')
+            return jsonify({'error': 'Falha ao esvaziar carrinho'}), 500
+
+    @app.route('/cart/checkout', methods=['POST'])
+    @jwt_required()
+    @idempotente
+    def cart_checkout():
+        try:
+            from src.Application.Service.cart_service import CartService
+            user_id, erro = _user_id_atual()
+            if erro:
+                return erro
+            order, erro = CartService.finalizar(user_id)
+            if erro:
+                return jsonify(erro), 409 if erro['code'] == 'RESERVATION_EXPIRED' else 400
+            return jsonify({'message': 'Compra realizada', **_nota_fiscal(order)}), 201
+        except Exception as e:
+            logger.exception('Erro no checkout do carrinho')
+            return jsonify({'error': 'Falha no checkout', 'detail': str(e), 'code': 'CHECKOUT_EXCEPTION'}), 500
+
+    @app.route('/invoice/<int:order_id>/status', methods=['GET'])
+    @jwt_required()
+    def invoice_status(order_id):
+        try:
+            from src.Application.Service.invoice_service import InvoiceService
+            user_id, erro = _user_id_atual()
+            if erro:
+                return erro
+            # pedido de outro usuário responde como inexistente (e não agenda render)
+            if not InvoiceService.pedido_visivel(order_id, user_id):
+                return jsonify({'error': 'Pedido não encontrado'}), 404
+            info = InvoiceService.status(order_id)
+            if not info:
+                return jsonify({'error': 'Pedido não encontrado'}), 404
+            return jsonify(info), 200
+        except Exception as e:
+            logger.exception('Erro ao consultar nota fiscal')
+            return jsonify({'error': 'Falha ao consultar nota fiscal'}), 500
+
+    @app.route('/invoice/<int:order_id>', methods=['GET'])
+    def invoice_download(order_id):
+        # Mesmo nível de acesso do antigo link /static/invoices/...: público pelo id do pedido,
+        # mas só serve o que já foi renderizado/agendado (não dispara render)
+        try:
+            from flask import send_file
+            from src.Application.Service.invoice_service import InvoiceService
+            pdf_path = InvoiceService.aguardar_pdf(order_id)
+            if not pdf_path:
+                return jsonify({'error': 'Nota fiscal indisponível'}), 404
+            return send_file(pdf_path, mimetype='application/pdf')
+        except Exception as e:
+            logger.exception('Erro ao baixar nota fiscal')
+            return jsonify({'error': 'Falha ao baixar nota fiscal'}), 500
+
     @app.route('/historico', methods=['GET'])
     @jwt_required()
     def historico():
         try:
-            from src.Infrastructure.Model.order import Order
+            from flask import Response, stream_with_context, current_app
+            from src.Application.Service.order_service import OrderService, LIMITE_HISTORICO_PADRAO
             from src.config.data_base import db
             ident = get_jwt_identity()
             user_id = None
@@ -545,10 +562,36 @@ def init_routes(app):
                 if not u:
                     return jsonify({'error': 'Usuário inválido'}), 400
                 user_id = u.id
-            orders = db.session.query(Order).filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-            return jsonify([o.to_dict(include_items=True) for o in orders]), 200
+            args = request.args
+            if 'limit' in args or 'cursor' in args:
+                # página com cursor opaco em (created_at, id)
+                try:
+                    pedidos, proximo = OrderService.historico_pagina(
+                        user_id, limite=int(args.get('limit', LIMITE_HISTORICO_PADRAO)), cursor=args.get('cursor')
+                    )
+                except ValueError:
+                    return jsonify({'error': 'limit ou cursor inválido'}), 400
+                return jsonify({
+                    'items': [o.to_dict(include_items=True) for o in pedidos],
+                    'next_cursor': proximo
+                }), 200
+
+            # histórico completo em streaming (array JSON, compatível com o formato antigo, ou NDJSON)
+            pedidos = OrderService.iterar_historico(user_id)
+            if args.get('format') == 'ndjson':
+                def gerar():
+                    for pedido in pedidos:
+                        yield current_app.json.dumps(pedido) + '\n'
+                return Response(stream_with_context(gerar()), mimetype='application/x-ndjson')
+
+            def gerar():
+                yield '['
+                for i, pedido in enumerate(pedidos):
+                    yield (',' if i else '') + current_app.json.dumps(pedido)
+                yield ']'
+            return Response(stream_with_context(gerar()), mimetype='application/json')
         except Exception as e:
-            print('Erro ao recuperar histórico:', e)
+            logger.exception('Erro ao recuperar histórico')
             return jsonify({'error': 'Falha ao recuperar histórico'}), 500
 
     return app
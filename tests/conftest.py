@@ -0,0 +1,78 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_banco = os.path.join(tempfile.mkdtemp(prefix='getstock-tests-'), 'test.db')
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_banco}')
+os.environ.setdefault('PERIODIC_TASKS', '0')
+os.environ.setdefault('WHATSAPP_TRANSPORT', 'fake')
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from run import app as flask_app
+    from src.config.migration import migrar
+    with flask_app.app_context():
+        migrar(log=lambda _: None)
+    return flask_app
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+_usuarios = itertools.count(1000)
+
+
+@pytest.fixture
+def client(app):
+    # cliente WSGI do próprio Werkzeug: o FlaskClient do Flask 2.2 não roda sobre o Werkzeug 3
+    from werkzeug.test import Client
+    return Client(app)
+
+
+@pytest.fixture
+def user_id():
+    """Id de usuário novo a cada teste (o banco é compartilhado pela sessão de testes)."""
+    return next(_usuarios)
+
+
+@pytest.fixture
+def auth(app):
+    """auth(user_id) -> headers com um JWT para o usuário."""
+    from flask_jwt_extended import create_access_token
+
+    def headers(uid):
+        with app.app_context():
+            return {'Authorization': f'Bearer {create_access_token(identity=str(uid))}'}
+    return headers
+
+
+@pytest.fixture
+def novo_produto(app_context):
+    """novo_produto(quantidade=10, preco=2.5, status=True) -> id de um produto recém-criado."""
+    from src.Application.Service.produto_service import ProdutoService
+
+    def criar(quantidade=10, preco=2.5, status=True):
+        return ProdutoService.criar_produto('Produto teste', preco, quantidade, status, None).id
+    return criar
+
+
+@pytest.fixture
+def estoque(app_context):
+    """estoque(product_id) -> quantidade lida direto do banco (sem o identity map da sessão)."""
+    from sqlalchemy import select
+    from src.config.data_base import db
+    from src.Infrastructure.Model.produto import Produto
+
+    def ler(product_id):
+        return db.session.execute(select(Produto.quantidade).where(Produto.id == product_id)).scalar()
+    return ler
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+from src.Application.Service.cart_service import CartService
+from src.Application.Service.produto_service import ProdutoService
+from src.config.data_base import db
+from src.Infrastructure.Model.order import Order
+from src.Infrastructure.Model.order_item import OrderItem
+from src.Infrastructure.Model.stock_reservation import StockReservation
+
+
+def _vencer_reservas(user_id):
+    db.session.query(StockReservation).filter_by(user_id=user_id).update(
+        {'expires_at': datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+    db.session.commit()
+
+
+def test_reserva_baixa_e_devolve_estoque(client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=10)
+
+    resposta = client.put(f'/cart/items/{produto}', json={'quantity': 4}, headers=auth(user_id))
+    assert resposta.status_code == 200
+    assert [(i['product_id'], i['quantity']) for i in resposta.json['items']] == [(produto, 4)]
+    assert estoque(produto) == 6
+
+    # só a diferença passa pelo estoque
+    client.put(f'/cart/items/{produto}', json={'quantity': 1}, headers=auth(user_id))
+    assert estoque(produto) == 9
+
+    assert client.delete(f'/cart/items/{produto}', headers=auth(user_id)).json['items'] == []
+    assert estoque(produto) == 10
+
+
+def test_reserva_sem_estoque_responde_409(client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=2)
+
+    resposta = client.put(f'/cart/items/{produto}', json={'quantity': 3}, headers=auth(user_id))
+
+    assert resposta.status_code == 409
+    assert resposta.json['code'] == 'LOW_STOCK'
+    assert estoque(produto) == 2
+    assert CartService.itens(user_id) == []
+
+
+def test_checkout_do_carrinho_vira_pedido(client, auth, user_id, novo_produto, estoque):
+    a, b = novo_produto(quantidade=5, preco=2.0), novo_produto(quantidade=5, preco=3.0)
+    client.put(f'/cart/items/{a}', json={'quantity': 2}, headers=auth(user_id))
+    client.put(f'/cart/items/{b}', json={'quantity': 1}, headers=auth(user_id))
+
+    resposta = client.post('/cart/checkout', headers=auth(user_id))
+
+    assert resposta.status_code == 201
+    order = db.session.get(Order, resposta.json['nota_fiscal']['order_id'])
+    assert (order.user_id, order.total) == (user_id, 7.0)
+    assert {(i.product_id, i.quantity) for i in db.session.query(OrderItem).filter_by(order_id=order.id)} == {
+        (a, 2), (b, 1)}
+    # o estoque já tinha baixado na reserva
+    assert (estoque(a), estoque(b)) == (3, 4)
+    assert CartService.itens(user_id) == []
+
+
+def test_checkout_recusa_produto_inativado_depois_da_reserva(client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=5)
+    client.put(f'/cart/items/{produto}', json={'quantity': 2}, headers=auth(user_id))
+    ProdutoService.inativar_produto(produto)
+
+    resposta = client.post('/cart/checkout', headers=auth(user_id))
+
+    assert resposta.status_code == 400
+    assert resposta.json['code'] == 'PRODUCT_INACTIVE'
+    assert db.session.query(Order).filter_by(user_id=user_id).count() == 0
+    # a reserva continua segurando o estoque até vencer ou ser removida
+    assert estoque(produto) == 3
+
+
+def test_reserva_vencida_recusa_checkout_e_volta_ao_estoque(client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=5)
+    client.put(f'/cart/items/{produto}', json={'quantity': 3}, headers=auth(user_id))
+    _vencer_reservas(user_id)
+
+    resposta = client.post('/cart/checkout', headers=auth(user_id))
+    assert resposta.status_code == 409
+    assert resposta.json['code'] == 'RESERVATION_EXPIRED'
+    assert resposta.json['product_ids'] == [produto]
+
+    assert CartService.liberar_expiradas() >= 1
+    assert estoque(produto) == 5
+    assert CartService.itens(user_id) == []
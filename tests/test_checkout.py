@@ -0,0 +1,95 @@
+import threading
+
+from src.Application.Service.checkout_service import CheckoutService
+from src.Application.Service.produto_service import ProdutoService
+from src.config.data_base import db
+from src.Infrastructure.Model.order import Order
+from src.Infrastructure.Model.order_item import OrderItem
+
+
+def _pedidos(user_id):
+    return db.session.query(Order).filter_by(user_id=user_id).all()
+
+
+def test_checkout_baixa_estoque_e_grava_pedido(client, auth, user_id, novo_produto, estoque):
+    a, b = novo_produto(quantidade=10, preco=2.5), novo_produto(quantidade=5, preco=4.0)
+
+    # linhas repetidas do mesmo produto são somadas
+    itens = [{'product_id': a, 'quantity': 2}, {'product_id': b, 'quantity': 1}, {'product_id': a, 'quantity': 1}]
+    resposta = client.post('/checkout', json={'items': itens}, headers=auth(user_id))
+
+    assert resposta.status_code == 201
+    assert (estoque(a), estoque(b)) == (7, 4)
+    order, = _pedidos(user_id)
+    assert order.total == 3 * 2.5 + 4.0
+    assert resposta.json['nota_fiscal']['order_id'] == order.id
+    linhas = {i.product_id: (i.quantity, i.line_total)
+              for i in db.session.query(OrderItem).filter_by(order_id=order.id)}
+    assert linhas == {a: (3, 7.5), b: (1, 4.0)}
+
+
+def test_checkout_sem_estoque_responde_409_sem_baixar_nada(client, auth, user_id, novo_produto, estoque):
+    a, b = novo_produto(quantidade=10), novo_produto(quantidade=2)
+
+    resposta = client.post('/checkout', headers=auth(user_id), json={'items': [
+        {'product_id': a, 'quantity': 1}, {'product_id': b, 'quantity': 1}, {'product_id': b, 'quantity': 2}]})
+
+    assert resposta.status_code == 409
+    assert resposta.json['code'] == 'LOW_STOCK'
+    assert (estoque(a), estoque(b)) == (10, 2)
+    assert _pedidos(user_id) == []
+
+
+def test_checkout_produto_inativo(client, auth, user_id, novo_produto, estoque):
+    a, b = novo_produto(quantidade=10), novo_produto(quantidade=10)
+    ProdutoService.inativar_produto(b)
+
+    resposta = client.post('/checkout', headers=auth(user_id), json={'items': [
+        {'product_id': a, 'quantity': 1}, {'product_id': b, 'quantity': 1}]})
+
+    assert resposta.status_code == 400
+    assert resposta.json['code'] == 'PRODUCT_INACTIVE'
+    assert estoque(a) == 10
+    assert _pedidos(user_id) == []
+
+
+def test_checkout_payload_invalido(client, auth, user_id, novo_produto):
+    a = novo_produto()
+    for itens, code in (([{'product_id': 'x'}], 'BAD_PRODUCT_ID'), ([{'product_id': a, 'quantity': 0}], 'BAD_QUANTITY')):
+        resposta = client.post('/checkout', headers=auth(user_id), json={'items': itens})
+        assert resposta.status_code == 400
+        assert resposta.json['code'] == code
+
+
+def test_checkouts_concorrentes_nao_vendem_alem_do_estoque(app, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=5)
+    resultados = []
+
+    def comprar():
+        with app.app_context():
+            try:
+                order, erro = CheckoutService.finalizar_compra(user_id, [{'product_id': produto, 'quantity': 2}])
+                resultados.append('ok' if order else erro['code'])
+            except Exception as e:  # SQLite pode recusar a escrita concorrente: a transação inteira volta
+                resultados.append(type(e).__name__)
+
+    threads = [threading.Thread(target=comprar) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    vendidos = resultados.count('ok')
+    assert vendidos == 2
+    assert estoque(produto) == 5 - 2 * vendidos
+    assert len(_pedidos(user_id)) == vendidos
+
+
+def test_venda_de_balcao_de_um_produto(novo_produto, estoque):
+    produto = novo_produto(quantidade=3)
+
+    vendido, erro = ProdutoService.vender_produto(produto, 2)
+    assert erro is None and vendido.quantidade == 1
+    assert ProdutoService.vender_produto(produto, 2) == (None, 'Estoque insuficiente!')
+    assert ProdutoService.vender_produto(10 ** 9, 1) == (None, 'Produto não encontrado')
+    assert estoque(produto) == 1
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from src.config.data_base import db
+from src.Infrastructure.http.idempotency import _hash
+from src.Infrastructure.Model.order import Order
+from src.Infrastructure.store import idempotency_store
+from src.Infrastructure.store.idempotency_store import DatabaseIdempotencyStore, MemoryIdempotencyStore
+
+JSON = 'application/json'
+
+
+@pytest.fixture(params=['memory', 'database'])
+def store(request, monkeypatch):
+    """Troca o store do processo por um novo de cada tipo, com espera curta para o 409."""
+    if request.param == 'database':
+        novo = DatabaseIdempotencyStore(espera=0.05, intervalo=0.01)
+    else:
+        novo = MemoryIdempotencyStore(espera=0.05)
+    monkeypatch.setattr(idempotency_store, '_store', novo)
+    return novo
+
+
+def _checkout(client, headers, chave, corpo):
+    return client.post('/checkout', data=json.dumps(corpo), content_type=JSON,
+                       headers={**headers, 'Idempotency-Key': chave})
+
+
+def _pedidos(user_id):
+    return db.session.query(Order).filter_by(user_id=user_id).count()
+
+
+def test_repeticao_devolve_a_mesma_resposta_sem_vender_de_novo(store, client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=10)
+    corpo = {'items': [{'product_id': produto, 'quantity': 2}]}
+
+    primeira = _checkout(client, auth(user_id), 'k-1', corpo)
+    # token novo, mesma identidade: a chave continua valendo
+    segunda = _checkout(client, auth(user_id), 'k-1', corpo)
+
+    assert primeira.status_code == segunda.status_code == 201
+    assert 'Idempotent-Replayed' not in primeira.headers
+    assert segunda.headers['Idempotent-Replayed'] == 'true'
+    assert segunda.json == primeira.json
+    assert estoque(produto) == 8
+    assert _pedidos(user_id) == 1
+
+
+def test_mesma_chave_com_outro_corpo_responde_422(store, client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=10)
+    _checkout(client, auth(user_id), 'k-2', {'items': [{'product_id': produto, 'quantity': 1}]})
+
+    resposta = _checkout(client, auth(user_id), 'k-2', {'items': [{'product_id': produto, 'quantity': 3}]})
+
+    assert resposta.status_code == 422
+    assert resposta.json['code'] == 'IDEMPOTENCY_MISMATCH'
+    assert estoque(produto) == 9
+
+
+def test_chave_em_andamento_responde_409(store, client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=10)
+    corpo = {'items': [{'product_id': produto, 'quantity': 1}]}
+    # a primeira requisição "ainda está rodando" em outro worker
+    store.iniciar(_hash(f'user:{user_id}', 'POST', '/checkout', 'k-3'), _hash(json.dumps(corpo).encode()))
+
+    resposta = _checkout(client, auth(user_id), 'k-3', corpo)
+
+    assert resposta.status_code == 409
+    assert resposta.json['code'] == 'IDEMPOTENCY_IN_PROGRESS'
+    assert resposta.headers['Retry-After'] == '1'
+    assert estoque(produto) == 10
+
+
+def test_chave_vale_por_usuario(store, client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=10)
+    corpo = {'items': [{'product_id': produto, 'quantity': 1}]}
+    outro = user_id + 10 ** 6
+
+    _checkout(client, auth(user_id), 'k-4', corpo)
+    resposta = _checkout(client, auth(outro), 'k-4', corpo)
+
+    assert resposta.status_code == 201
+    assert 'Idempotent-Replayed' not in resposta.headers
+    assert estoque(produto) == 8
+    assert (_pedidos(user_id), _pedidos(outro)) == (1, 1)
+
+
+def test_erro_de_negocio_tambem_fica_gravado(store, client, auth, user_id, novo_produto, estoque):
+    produto = novo_produto(quantidade=1)
+    corpo = {'items': [{'product_id': produto, 'quantity': 2}]}
+
+    primeira = _checkout(client, auth(user_id), 'k-5', corpo)
+    segunda = _checkout(client, auth(user_id), 'k-5', corpo)
+
+    assert primeira.status_code == segunda.status_code == 409
+    assert segunda.headers['Idempotent-Replayed'] == 'true'
+    assert segunda.json['code'] == 'LOW_STOCK'
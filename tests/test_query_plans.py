@@ -0,0 +1,21 @@
+from sqlalchemy import text
+
+from src.config.data_base import db
+from src.config.query_plans import consultas_quentes, verificar_planos
+
+
+def test_consultas_quentes_usam_indice(app_context):
+    falhas = {r['consulta']: r['plano'] for r in verificar_planos() if r['full_scan']}
+    assert not falhas
+
+
+def test_acusa_full_scan_sem_o_indice(app_context):
+    consultas = {'historico_pagina': consultas_quentes()['historico_pagina']}
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_orders_user_id_created_at"))
+    try:
+        resultado, = verificar_planos(consultas)
+        assert resultado['full_scan'] == ['orders']
+    finally:
+        with db.engine.begin() as conn:
+            conn.execute(text("CREATE INDEX ix_orders_user_id_created_at ON orders (user_id, created_at)"))
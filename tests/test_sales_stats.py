@@ -0,0 +1,59 @@
+from src.Application.Service.checkout_service import CheckoutService
+from src.Application.Service.produto_service import ProdutoService
+from src.Application.Service.stats_service import StatsService
+
+
+def _totais():
+    painel = StatsService.painel()
+    return {k: painel[k] for k in ('total_revenue', 'total_orders', 'total_items_sold', 'unique_customers')}
+
+
+def _vendas(painel, product_id):
+    linha, = [p for p in painel['per_product'] if p['id'] == product_id]
+    return linha['sold_qty'], linha['revenue'], linha['stock_remaining']
+
+
+def test_checkout_e_balcao_atualizam_os_agregados(user_id, novo_produto):
+    a, b = novo_produto(quantidade=20, preco=2.0), novo_produto(quantidade=20, preco=5.0)
+    antes = _totais()
+
+    CheckoutService.finalizar_compra(user_id, [{'product_id': a, 'quantity': 3}])
+    ProdutoService.vender_produto(b, 2)
+    ProdutoService.vender_lote([{'id': a, 'quantidade': 1}, {'id': b, 'quantidade': 1}])
+
+    depois = _totais()
+    assert depois['total_orders'] - antes['total_orders'] == 3
+    assert depois['total_items_sold'] - antes['total_items_sold'] == 7
+    assert depois['total_revenue'] - antes['total_revenue'] == 6.0 + 10.0 + 7.0
+    # venda de balcão não tem cliente: só o checkout conta
+    assert depois['unique_customers'] - antes['unique_customers'] == 1
+
+    painel = StatsService.painel()
+    assert _vendas(painel, a) == (4, 8.0, 16)
+    assert _vendas(painel, b) == (3, 15.0, 17)
+
+
+def test_venda_recusada_nao_conta(user_id, novo_produto):
+    produto = novo_produto(quantidade=1)
+    antes = _totais()
+
+    assert CheckoutService.finalizar_compra(user_id, [{'product_id': produto, 'quantity': 2}])[1]['code'] == 'LOW_STOCK'
+    assert ProdutoService.vender_produto(produto, 5)[1] == 'Estoque insuficiente!'
+
+    assert _totais() == antes
+    assert _vendas(StatsService.painel(), produto) == (0, 0.0, 1)
+
+
+def test_rebuild_reproduz_os_agregados_incrementais(user_id, novo_produto):
+    produto = novo_produto(quantidade=10, preco=3.0)
+    CheckoutService.finalizar_compra(user_id, [{'product_id': produto, 'quantity': 2}])
+    ProdutoService.vender_produto(produto, 1)
+    ProdutoService.vender_lote([{'id': produto, 'quantidade': 1}], user_id=user_id)
+
+    incremental = StatsService.painel()
+    StatsService.reconstruir()
+    reconstruido = StatsService.painel()
+
+    for chave in ('total_revenue', 'total_orders', 'total_items_sold', 'unique_customers', 'revenue_by_day'):
+        assert reconstruido[chave] == incremental[chave]
+    assert _vendas(reconstruido, produto) == _vendas(incremental, produto) == (4, 12.0, 6)
@@ -0,0 +1,102 @@
+import threading
+import uuid
+
+import pytest
+
+from src.Infrastructure.store.verification_code_store import (
+    CODIGO_EXPIRADO, CODIGO_INCORRETO, CODIGO_VERIFICADO, SEM_CODIGO, TENTATIVAS_EXCEDIDAS,
+    DatabaseCodeStore, MemoryCodeStore
+)
+
+
+@pytest.fixture(params=[MemoryCodeStore, DatabaseCodeStore])
+def criar_store(request, app_context):
+    """criar_store(ttl=600, max_tentativas=5) -> store do tipo parametrizado."""
+    return lambda **kwargs: request.param(**kwargs)
+
+
+@pytest.fixture
+def email():
+    return f'cliente-{uuid.uuid4().hex[:8]}@exemplo.com'
+
+
+def test_codigo_vale_uma_vez(criar_store, email):
+    store = criar_store()
+    store.emitir(email, '1234')
+
+    # mesma chave normalizada do /send-code
+    assert store.verificar(f'  {email.upper()} ', '1234') == (True, CODIGO_VERIFICADO)
+    assert store.verificar(email, '1234') == (False, SEM_CODIGO)
+
+
+def test_codigo_expirado(criar_store, email):
+    store = criar_store(ttl=-1)
+    store.emitir(email, '1234')
+
+    assert store.verificar(email, '1234') == (False, CODIGO_EXPIRADO)
+    assert store.verificar(email, '1234') == (False, SEM_CODIGO)
+
+
+def test_tentativas_esgotadas_consomem_o_codigo(criar_store, email):
+    store = criar_store(max_tentativas=3)
+    store.emitir(email, '1234')
+
+    assert store.verificar(email, '0000') == (False, CODIGO_INCORRETO)
+    assert store.verificar(email, '0000') == (False, CODIGO_INCORRETO)
+    assert store.verificar(email, '0000') == (False, TENTATIVAS_EXCEDIDAS)
+    # nem o código certo vale mais
+    assert store.verificar(email, '1234') == (False, SEM_CODIGO)
+
+
+def test_nova_emissao_substitui_o_codigo_e_zera_tentativas(criar_store, email):
+    store = criar_store(max_tentativas=2)
+    store.emitir(email, '1111')
+    assert store.verificar(email, '0000') == (False, CODIGO_INCORRETO)
+
+    store.emitir(email, '2222')
+
+    assert store.verificar(email, '1111') == (False, CODIGO_INCORRETO)
+    assert store.verificar(email, '2222') == (True, CODIGO_VERIFICADO)
+
+
+def test_emissoes_concorrentes_para_destinatario_novo(app, email):
+    # tentativas suficientes para conferir todos os códigos emitidos
+    store = DatabaseCodeStore(max_tentativas=10)
+    erros = []
+
+    def emitir(codigo):
+        with app.app_context():
+            try:
+                store.emitir(email, codigo)
+            except Exception as e:
+                erros.append(e)
+
+    threads = [threading.Thread(target=emitir, args=(str(1000 + i),)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert erros == []
+    with app.app_context():
+        # sobra um único código pendente, de uma das emissões
+        resultados = [store.verificar(email, str(1000 + i)) for i in range(6)]
+    assert resultados.count((True, CODIGO_VERIFICADO)) == 1
+
+
+def test_send_code_e_verify_code(client, app_context, email, monkeypatch):
+    monkeypatch.setattr('src.routes.novo_codigo', lambda: '4321')
+
+    assert client.post('/send-code', json={'email': email}).status_code == 202
+    errado = client.post('/verify-code', json={'email': email.upper(), 'code': '0000'})
+    certo = client.post('/verify-code', json={'email': email.upper(), 'code': '4321'})
+
+    assert (errado.status_code, errado.json['error']) == (400, CODIGO_INCORRETO)
+    assert certo.status_code == 200
+    assert client.post('/verify-code', json={'email': email, 'code': '4321'}).json['error'] == SEM_CODIGO
+
+
+def test_verifica_code_sem_email(client):
+    resposta = client.post('/verifica/code', json={'codigo_digitado': '1234'})
+
+    assert resposta.status_code == 400